@@ -1,4 +1,4 @@
-import React, { useState, useMemo, useEffect } from "react";
+import React, { useState, useEffect } from "react";
 import { Link } from "react-router-dom";
 import { Search, Star, Eye, Plus, Loader, X, Loader2 } from "lucide-react";
 import { useLocation, useNavigate } from "react-router-dom";
@@ -77,7 +77,48 @@ interface APIResponse {
   pagination?: PaginationInfo;
 }
 
+// Counts per value of each filter dimension over the current result set
+interface Facets {
+  brand?: Record<string, number>;
+  feature?: Record<string, number>;
+  price_bucket?: Record<string, number>;
+}
+
+interface CatalogProduct {
+  id: string;
+  model: string;
+  brand: string;
+  price: number;
+  rating?: number;
+  image_url?: string;
+  display_size?: string;
+  ram?: string;
+  storage?: string;
+}
+
+interface ProductsResponse {
+  success: boolean;
+  total_products: number;
+  products: CatalogProduct[];
+  facets?: Facets;
+  pagination?: {
+    page: number;
+    limit: number;
+    total_pages: number;
+  };
+  error?: string;
+}
+
 const SEARCH_API_URL = "http://localhost:5000/api/search";
+const PRODUCTS_API_URL = "http://localhost:5000/api/products";
+const PAGE_SIZE = 50;
+
+const PRICE_BUCKET_LABELS: Record<string, string> = {
+  budget: "Budget",
+  mid_range: "Mid-range",
+  premium: "Premium",
+  flagship: "Flagship",
+};
 
 const ProductList: React.FC = () => {
   const [products, setProducts] = useState<Product[]>([]);
@@ -93,11 +134,11 @@ const ProductList: React.FC = () => {
   const [showSearchResults, setShowSearchResults] = useState<boolean>(false);
 
   const [searchTerm, setSearchTerm] = useState<string>("");
+  const [debouncedSearchTerm, setDebouncedSearchTerm] = useState<string>("");
   const [selectedBrand, setSelectedBrand] = useState<string>("");
-  const [priceRange, setPriceRange] = useState<{ min: number; max: number }>({
-    min: 0,
-    max: Infinity,
-  });
+  const [selectedFeatures, setSelectedFeatures] = useState<string[]>([]);
+  const [priceBucket, setPriceBucket] = useState<string>("");
+  const [facets, setFacets] = useState<Facets>({});
 
   const [selectedProducts, setSelectedProducts] = useState<(string | number)[]>([]);
 
@@ -161,87 +202,101 @@ const ProductList: React.FC = () => {
     }
   };
 
+  // Any filter change starts again from the first page. The page is reset in
+  // the same handler as the filter, so both land in one render and one request
+  useEffect(() => {
+    // Wait for typing to pause before asking the server
+    const timeoutId = setTimeout(() => {
+      setDebouncedSearchTerm(searchTerm.trim());
+      setCurrentPage(1);
+    }, 300);
+    return () => clearTimeout(timeoutId);
+  }, [searchTerm]);
+
+  const selectBrand = (brand: string) => {
+    setSelectedBrand(brand);
+    setCurrentPage(1);
+  };
+
+  const selectPriceBucket = (bucket: string) => {
+    setPriceBucket(bucket);
+    setCurrentPage(1);
+  };
+
+  // Filtering, facet counts and pagination all happen server-side
   useEffect(() => {
+    const controller = new AbortController();
+    let cancelled = false;
+
     const fetchProducts = async () => {
       try {
         setLoading(true);
 
-        const apiBaseUrl = (window as any).API_BASE_URL || "http://localhost:3001";
-
-        const possibleUrls = [
-          `${apiBaseUrl}/api/products?page=${currentPage}&limit=50`,
-          `http://localhost:3001/api/products?page=${currentPage}&limit=50`,
-          `/api/products?page=${currentPage}&limit=50`,
-          `http://localhost:8000/api/products?page=${currentPage}&limit=50`,
-        ];
-
-        let lastError: Error | null = null;
-        let success = false;
-
-        for (const url of possibleUrls) {
-          try {
-            console.log(`Trying API URL: ${url}`);
-
-            const controller = new AbortController();
-            const timeoutId = setTimeout(() => controller.abort(), 5000);
-
-            const response = await fetch(url, {
-              method: "GET",
-              headers: {
-                Accept: "application/json",
-                "Content-Type": "application/json",
-              },
-              signal: controller.signal,
-            });
-
-            clearTimeout(timeoutId);
-
-            const contentType = response.headers.get("content-type");
-            if (contentType && contentType.includes("text/html")) {
-              throw new Error(`API returned HTML instead of JSON. Check if ${url} is the correct endpoint.`);
-            }
-
-            if (!response.ok) {
-              throw new Error(`HTTP ${response.status}: ${response.statusText}`);
-            }
-
-            const data: APIResponse = await response.json();
-            console.log("API Response:", data);
-
-            if (data.success && data.data) {
-              const processedData = data.data.map((product) => ({
-                ...product,
-                price: typeof product.price === "string" ? parseFloat(product.price) : product.price,
-                rating: typeof product.rating === "string" ? parseFloat(product.rating) : product.rating,
-              }));
-
-              setProducts(Array.isArray(processedData) ? processedData : []);
-              setPagination(data.pagination || null);
-              setError(null);
-              success = true;
-              break;
-            }
-          } catch (err) {
-            lastError = err instanceof Error ? err : new Error("Unknown error");
-            console.warn(`Failed to fetch from ${url}:`, err);
-          }
+        const params = new URLSearchParams({ page: String(currentPage), limit: String(PAGE_SIZE) });
+        if (debouncedSearchTerm) params.append("q", debouncedSearchTerm);
+        if (selectedBrand) params.append("brand", selectedBrand);
+        if (priceBucket) params.append("price_bucket", priceBucket);
+        selectedFeatures.forEach((feature) => params.append("feature", feature));
+
+        const timeoutId = setTimeout(() => controller.abort(), 5000);
+        const response = await fetch(`${PRODUCTS_API_URL}?${params.toString()}`, {
+          method: "GET",
+          headers: { Accept: "application/json" },
+          signal: controller.signal,
+        });
+        clearTimeout(timeoutId);
+
+        if (!response.ok) {
+          throw new Error(`HTTP ${response.status}: ${response.statusText}`);
         }
 
-        if (!success) {
-          throw lastError || new Error("All API endpoints failed");
+        const data: ProductsResponse = await response.json();
+        if (!data.success) {
+          throw new Error(data.error || "Failed to fetch products");
         }
+
+        setProducts(
+          data.products.map((product) => ({
+            id: product.id,
+            name: product.model,
+            brand: product.brand,
+            price: product.price,
+            rating: product.rating,
+            image_url: product.image_url,
+            display_size: product.display_size,
+            ram: product.ram,
+            storage: product.storage,
+          }))
+        );
+        setFacets(data.facets || {});
+
+        const totalPages = data.pagination?.total_pages || 1;
+        setPagination({
+          currentPage,
+          totalPages,
+          totalProducts: data.total_products,
+          hasNextPage: currentPage < totalPages,
+          hasPrevPage: currentPage > 1,
+        });
+        setError(null);
       } catch (err) {
+        // A newer request replaced this one
+        if (cancelled) return;
         console.error("Error fetching products:", err);
         const errorMessage = err instanceof Error ? err.message : "An unknown error occurred";
         setError(errorMessage);
         setProducts([]);
       } finally {
-        setLoading(false);
+        if (!cancelled) setLoading(false);
       }
     };
 
     fetchProducts();
-  }, [currentPage]);
+    return () => {
+      cancelled = true;
+      controller.abort();
+    };
+  }, [currentPage, debouncedSearchTerm, selectedBrand, selectedFeatures, priceBucket]);
 
   useEffect(() => {
     if (location.state?.selectedProductIds) {
@@ -251,21 +306,14 @@ const ProductList: React.FC = () => {
     }
   }, [location.state]);
 
-  const brands = Array.from(
-    new Set(products.map((product) => product.brand).filter(Boolean))
-  );
-
-  const filteredProducts = useMemo(() => {
-    return products.filter((product) => {
-      const matchesSearch =
-        product.name?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        product.brand?.toLowerCase().includes(searchTerm.toLowerCase());
-      const matchesBrand = !selectedBrand || product.brand === selectedBrand;
-      const matchesPrice = product.price >= priceRange.min && product.price <= priceRange.max;
+  const toggleFeature = (feature: string) => {
+    setSelectedFeatures((prev) =>
+      prev.includes(feature) ? prev.filter((f) => f !== feature) : [...prev, feature]
+    );
+    setCurrentPage(1);
+  };
 
-      return matchesSearch && matchesBrand && matchesPrice;
-    });
-  }, [products, searchTerm, selectedBrand, priceRange]);
+  const hasFilters = Boolean(debouncedSearchTerm || selectedBrand || priceBucket || selectedFeatures.length);
 
   const toggleProductSelection = (productId: string | number) => {
     setSelectedProducts((prev) =>
@@ -314,7 +362,7 @@ const ProductList: React.FC = () => {
     }).format(price);
   };
 
-  if (loading) {
+  if (loading && products.length === 0 && !hasFilters) {
     return (
       <div className="min-h-screen bg-gray-50 flex items-center justify-center">
         <div className="text-center">
@@ -325,7 +373,7 @@ const ProductList: React.FC = () => {
     );
   }
 
-  if (error && products.length === 0) {
+  if (error && products.length === 0 && !hasFilters) {
     return (
       <div className="min-h-screen bg-gray-50 flex items-center justify-center">
         <div className="text-center max-w-md">
@@ -361,8 +409,8 @@ const ProductList: React.FC = () => {
           )}
           {pagination && (
             <p className="text-sm text-gray-500 mt-1">
-              Showing {showSearchResults ? searchResults.length : filteredProducts.length} of{" "}
-              {showSearchResults ? searchResults.length : products.length} products
+              Showing {showSearchResults ? searchResults.length : products.length} of{" "}
+              {showSearchResults ? searchResults.length : pagination.totalProducts} products
               {pagination.totalPages > 1 && !showSearchResults && (
                 <>
                   {" "}(Page {pagination.currentPage} of {pagination.totalPages}) - Total: {pagination.totalProducts}
@@ -435,27 +483,40 @@ const ProductList: React.FC = () => {
           )}
         </div>
 
-        {/* Filters - removed since we're using natural language search only */}
+        {/* Filters - resolved by the ML API; each count is the number of results choosing it gives */}
         {!showSearchResults && (
           <div className="bg-white p-6 rounded-xl shadow-sm border border-gray-100 mb-8">
-            <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
+            <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
+              <select
+                value={selectedBrand}
+                onChange={(e) => selectBrand(e.target.value)}
+                className="w-full px-3 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent capitalize"
+              >
+                <option value="">All brands</option>
+                {Object.entries(facets.brand || {}).map(([brand, count]) => (
+                  <option key={brand} value={brand}>
+                    {brand} ({count})
+                  </option>
+                ))}
+              </select>
+
               <div className="relative">
-                <input
-                  type="number"
-                  placeholder="Max Price"
-                  value={priceRange.max === Infinity ? "" : priceRange.max}
-                  onChange={(e) =>
-                    setPriceRange((prev) => ({
-                      ...prev,
-                      max: e.target.value === "" ? Infinity : Number(e.target.value),
-                    }))
-                  }
+                <select
+                  value={priceBucket}
+                  onChange={(e) => selectPriceBucket(e.target.value)}
                   className="w-full px-3 py-2 pr-10 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent"
-                />
-                {priceRange.max !== Infinity && (
+                >
+                  <option value="">Any price</option>
+                  {Object.keys(PRICE_BUCKET_LABELS).map((bucket) => (
+                    <option key={bucket} value={bucket}>
+                      {PRICE_BUCKET_LABELS[bucket]} ({facets.price_bucket?.[bucket] || 0})
+                    </option>
+                  ))}
+                </select>
+                {priceBucket && (
                   <button
-                    onClick={() => setPriceRange((prev) => ({ ...prev, max: Infinity }))}
-                    className="absolute right-3 top-1/2 transform -translate-y-1/2 text-gray-400 hover:text-gray-600 focus:outline-none transition-colors duration-200"
+                    onClick={() => selectPriceBucket("")}
+                    className="absolute right-8 top-1/2 transform -translate-y-1/2 text-gray-400 hover:text-gray-600 focus:outline-none transition-colors duration-200"
                   >
                     <X className="w-4 h-4" />
                   </button>
@@ -478,6 +539,24 @@ const ProductList: React.FC = () => {
                 <span>Compare ({selectedProducts.length})</span>
               </button>
             </div>
+
+            {Object.keys(facets.feature || {}).length > 0 && (
+              <div className="flex flex-wrap gap-2 mt-4">
+                {Object.entries(facets.feature || {}).map(([feature, count]) => (
+                  <button
+                    key={feature}
+                    onClick={() => toggleFeature(feature)}
+                    className={`px-3 py-1 rounded-full text-sm capitalize transition-colors duration-200 ${
+                      selectedFeatures.includes(feature)
+                        ? "bg-blue-600 text-white"
+                        : "bg-gray-100 text-gray-700 hover:bg-gray-200"
+                    }`}
+                  >
+                    {feature} ({count})
+                  </button>
+                ))}
+              </div>
+            )}
           </div>
         )}
 
@@ -558,7 +637,7 @@ const ProductList: React.FC = () => {
         {!showSearchResults && (
           <>
             <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
-              {filteredProducts.map((product) => (
+              {products.map((product) => (
                 <div
                   key={product.id}
                   className="bg-white rounded-xl shadow-sm border border-gray-100 overflow-hidden hover:shadow-lg transition-all duration-200 group"
@@ -629,14 +708,14 @@ const ProductList: React.FC = () => {
               ))}
             </div>
 
-            {filteredProducts.length === 0 && !loading && (
+            {products.length === 0 && !loading && (
               <div className="text-center py-12">
                 <div className="text-gray-400 mb-4">
                   <Search className="h-16 w-16 mx-auto" />
                 </div>
                 <h3 className="text-lg font-medium text-gray-900 mb-2">No products found</h3>
                 <p className="text-gray-600">
-                  {products.length === 0 ? "No products in database" : "Try adjusting your search criteria"}
+                  {hasFilters ? "Try adjusting your search criteria" : "No products in database"}
                 </p>
               </div>
             )}
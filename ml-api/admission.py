@@ -0,0 +1,76 @@
+import math
+import threading
+import time
+
+
+class AdmissionPool:
+    """Concurrency limit with a bounded wait queue and a queueing deadline"""
+
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.service_time = 0.0  # moving average of seconds per admitted request
+        self.condition = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """Take a slot, waiting in the queue up to the deadline; False means reject"""
+        timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        with self.condition:
+            if self.active < self.max_concurrent and not self.waiting:
+                self.active += 1
+                self.admitted += 1
+                return True
+
+            # Fail fast instead of growing an unbounded backlog
+            if self.waiting >= self.max_queue or timeout <= 0:
+                self.rejected_full += 1
+                return False
+
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + timeout
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected_timeout += 1
+                        return False
+                    self.condition.wait(remaining)
+                self.active += 1
+                self.admitted += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self, elapsed=None):
+        with self.condition:
+            self.active -= 1
+            if elapsed is not None:
+                self.service_time = elapsed if not self.service_time else 0.9 * self.service_time + 0.1 * elapsed
+            self.condition.notify()
+
+    def retry_after(self):
+        """Seconds a rejected client should wait, from the backlog and recent service times"""
+        with self.condition:
+            backlog = self.active + self.waiting
+            return max(1, math.ceil(self.service_time * backlog / max(self.max_concurrent, 1)))
+
+    def stats(self):
+        with self.condition:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'queue_timeout': self.queue_timeout,
+                'active': self.active,
+                'waiting': self.waiting,
+                'admitted': self.admitted,
+                'rejected_full': self.rejected_full,
+                'rejected_timeout': self.rejected_timeout,
+                'avg_service_time': self.service_time
+            }
@@ -0,0 +1,173 @@
+"""Compare the legacy join-then-GROUP BY product queries with the pre-aggregated ones.
+
+Builds a throwaway schema with synthetic products carrying many features each,
+then reports planning and execution time from EXPLAIN ANALYZE for the full
+catalog read and for single-product lookups, and the per-call latency of a
+point lookup sent ad hoc versus as a prepared statement.
+
+The schema is dropped and recreated on every run, so point --dsn at a scratch
+database; the configured application database is refused without --force.
+
+    python benchmark_queries.py --dsn "dbname=bench_db user=postgres" --products 20000 --features 5,20,50
+"""
+import argparse
+import time
+
+import psycopg2
+
+from db_config import DATABASE_CONFIG
+from queries import LEGACY_PRODUCTS_QUERY, PREPARED_STATEMENTS, PRODUCTS_QUERY
+
+BENCH_SCHEMA = 'query_bench'
+
+LEGACY_PRODUCT_DETAILS = """
+SELECT p.*, ps.*, ARRAY_AGG(pf.feature_name) as features
+FROM products p
+LEFT JOIN product_specs ps ON p.id = ps.product_id
+LEFT JOIN product_features pf ON p.id = pf.product_id
+WHERE p.id = %s
+GROUP BY p.id, ps.id
+"""
+
+SCHEMA_SQL = f"""
+DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE;
+CREATE SCHEMA {BENCH_SCHEMA};
+SET search_path TO {BENCH_SCHEMA};
+CREATE TABLE products (
+    id UUID PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    brand VARCHAR(100) NOT NULL,
+    price DECIMAL(10, 2),
+    image_url TEXT,
+    rating DECIMAL(3, 2),
+    reviews INTEGER,
+    description TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE product_specs (
+    id UUID PRIMARY KEY,
+    product_id UUID REFERENCES products(id),
+    display_size VARCHAR(50),
+    processor VARCHAR(100),
+    ram VARCHAR(20),
+    storage VARCHAR(20),
+    camera VARCHAR(100),
+    battery VARCHAR(20),
+    operating_system VARCHAR(50),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE product_features (
+    id UUID PRIMARY KEY,
+    product_id UUID REFERENCES products(id),
+    feature_name VARCHAR(100) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX ON products(created_at);
+CREATE INDEX ON products(price);
+CREATE INDEX ON product_specs(product_id);
+CREATE INDEX ON product_features(product_id);
+"""
+
+POPULATE_SQL = """
+INSERT INTO products (id, name, brand, price, image_url, rating, reviews, description)
+SELECT md5(i::text)::uuid, 'Model ' || i, (ARRAY['Apple','Samsung','Google','Xiaomi','OnePlus'])[1 + i %% 5],
+       200 + (i %% 1300), 'https://example.com/' || i || '.jpg', 3 + (i %% 20) / 10.0, i %% 5000,
+       repeat('Long marketing description ', 10)
+FROM generate_series(1, %(products)s) i;
+
+INSERT INTO product_specs (id, product_id, display_size, processor, ram, storage, camera, battery, operating_system)
+SELECT md5('spec' || i)::uuid, md5(i::text)::uuid, '6.' || (i %% 9) || '"', 'Snapdragon 8 Gen ' || (i %% 3),
+       (4 + 4 * (i %% 3)) || 'GB', (64 * (1 + i %% 4)) || 'GB', (12 + i %% 100) || 'MP', (3000 + i %% 2000) || 'mAh', 'Android'
+FROM generate_series(1, %(products)s) i;
+
+INSERT INTO product_features (id, product_id, feature_name)
+SELECT md5('feature' || i || '-' || f)::uuid, md5(i::text)::uuid, 'feature_' || f
+FROM generate_series(1, %(products)s) i, generate_series(1, %(features)s) f;
+
+ANALYZE products;
+ANALYZE product_specs;
+ANALYZE product_features;
+"""
+
+
+def explain(cursor, query, params=None):
+    """Planning and execution time in ms from EXPLAIN ANALYZE"""
+    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}", params)
+    plan = cursor.fetchone()[0][0]
+    return plan['Planning Time'], plan['Execution Time']
+
+
+def time_calls(cursor, query, params, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        cursor.execute(query, params)
+        cursor.fetchall()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def run(connection, products, features, repeat):
+    cursor = connection.cursor()
+    cursor.execute(SCHEMA_SQL)
+    cursor.execute(POPULATE_SQL, {'products': products, 'features': features})
+    cursor.execute("SELECT id FROM products ORDER BY id LIMIT 1")
+    product_id = str(cursor.fetchone()[0])
+
+    results = {
+        'catalog legacy': explain(cursor, LEGACY_PRODUCTS_QUERY),
+        'catalog pre-aggregated': explain(cursor, PRODUCTS_QUERY),
+        'details legacy': explain(cursor, LEGACY_PRODUCT_DETAILS, (product_id,))
+    }
+
+    param_types, statement = PREPARED_STATEMENTS['product_details']
+    cursor.execute(f"PREPARE bench_details ({', '.join(param_types)}) AS {statement}")
+    results['details prepared'] = explain(cursor, "EXECUTE bench_details (%s::uuid)", (product_id,))
+
+    latencies = {
+        'details ad hoc': time_calls(cursor, LEGACY_PRODUCT_DETAILS, (product_id,), repeat),
+        'details prepared': time_calls(cursor, "EXECUTE bench_details (%s::uuid)", (product_id,), repeat)
+    }
+    cursor.execute("DEALLOCATE bench_details")
+    cursor.execute(f"DROP SCHEMA {BENCH_SCHEMA} CASCADE")
+    connection.commit()
+    cursor.close()
+    return results, latencies
+
+
+def is_application_database(connection):
+    """Whether the connection reached the database the API is configured for"""
+    info = connection.info
+    return (info.dbname, info.host, str(info.port)) == (
+        DATABASE_CONFIG['database'], DATABASE_CONFIG['host'], str(DATABASE_CONFIG['port'])
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark product queries with many features per product')
+    parser.add_argument('--dsn', help=f"Connection string of a scratch database; {BENCH_SCHEMA} is dropped and recreated there")
+    parser.add_argument('--force', action='store_true', help='Allow running against the application database')
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--features', default='5,20,50', help='Comma separated features per product')
+    parser.add_argument('--repeat', type=int, default=500, help='Calls per point lookup latency measurement')
+    args = parser.parse_args()
+    if not args.dsn and not args.force:
+        parser.error('pass --dsn for a scratch database, or --force to use the application database')
+
+    connection = psycopg2.connect(args.dsn) if args.dsn else psycopg2.connect(**DATABASE_CONFIG)
+    try:
+        if is_application_database(connection) and not args.force:
+            parser.error(f"{connection.info.dbname} is the application database; pass --force to use it")
+        for features in [int(value) for value in args.features.split(',')]:
+            results, latencies = run(connection, args.products, features, args.repeat)
+            print(f"\n{args.products} products x {features} features")
+            print(f"{'query':<26}{'planning ms':>14}{'execution ms':>15}")
+            for name, (planning, execution) in results.items():
+                print(f"{name:<26}{planning:>14.3f}{execution:>15.3f}")
+            for name, latency in latencies.items():
+                print(f"{name + ' per call':<26}{latency:>14.3f} ms")
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+import json
+import logging
+import os
+import select
+import threading
+import time
+from datetime import datetime
+
+import psycopg2
+import psycopg2.extensions
+
+from product_table import ProductTable
+from single_flight import CoalescingTimeout, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class ProductCatalog:
+    """In-memory product catalog kept in sync with the database row by row"""
+
+    def __init__(self, loader, row_loader, snapshot_path=None, reload_timeout=60.0):
+        # loader() returns every product, row_loader(ids) returns the given ones,
+        # both as a ProductTable
+        self.loader = loader
+        self.row_loader = row_loader
+        self.snapshot_path = snapshot_path
+        self.source = None  # 'database' or 'snapshot'
+        self.table = ProductTable()
+        self.positions = {}
+        self.indexes = []
+        self.version = 0
+        self.loaded_at = None
+        self.lock = threading.RLock()
+        # Requests arriving while the catalog is (re)loading share one database read
+        self.reloads = SingleFlight('catalog_reload', reload_timeout)
+
+    def register_index(self, index):
+        """Attach a derived structure maintained alongside the product rows"""
+        with self.lock:
+            self.indexes.append(index)
+            if self.loaded_at:
+                index.rebuild(self.table)
+
+    def ensure_loaded(self):
+        """Load the catalog on first use, from the snapshot if the database is unavailable"""
+        if self.loaded_at is None and not self.reload():
+            self.load_snapshot()
+
+    def reload(self):
+        """Replace the whole catalog with a fresh database read, shared by concurrent callers"""
+        try:
+            return self.reloads.do('reload', self._reload)
+        except CoalescingTimeout as e:
+            logger.warning(f"{str(e)}, keeping current catalog")
+            return False
+
+    def _reload(self):
+        table = self.loader()
+        if not table:
+            # An empty read usually means the database is unreachable, so keep
+            # what we have and retry on the next access if nothing was loaded yet
+            logger.warning("Catalog reload returned no products, keeping current catalog")
+            return False
+
+        self._replace(table, 'database')
+        logger.info(f"Catalog loaded with {len(self.table)} products (version {self.version})")
+
+        if self.snapshot_path:
+            self.save_snapshot()
+        return True
+
+    def _replace(self, table, source):
+        with self.lock:
+            self.table = table.compact()
+            self.positions = {product_id: row for row, product_id in enumerate(self.table.objects['id'])}
+            for index in self.indexes:
+                index.rebuild(self.table)
+            self.version += 1
+            self.loaded_at = datetime.now()
+            self.source = source
+
+    def save_snapshot(self, path=None):
+        """Write the current catalog to a columnar snapshot file"""
+        path = path or self.snapshot_path
+        try:
+            with self.lock:
+                table = self.table.compact()
+                version = self.version
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            # Write next to the target and rename so readers never see a partial file
+            tmp_path = f"{path}.tmp"
+            header = table.save_snapshot(tmp_path, {
+                'catalog_version': version,
+                'exported_at': datetime.now().isoformat()
+            })
+            os.replace(tmp_path, path)
+            logger.info(f"Catalog snapshot with {header['rows']} products written to {path}")
+            return header
+        except Exception as e:
+            logger.error(f"Catalog snapshot export error: {str(e)}")
+            return None
+
+    def load_snapshot(self, path=None):
+        """Replace the catalog with a snapshot file, used at startup or while the database is down"""
+        path = path or self.snapshot_path
+        if not path or not os.path.exists(path):
+            return False
+
+        try:
+            table, header = ProductTable.load_snapshot(path)
+        except Exception as e:
+            logger.error(f"Catalog snapshot import error: {str(e)}")
+            return False
+
+        self._replace(table, 'snapshot')
+        logger.info(
+            f"Catalog loaded with {len(self.table)} products from snapshot exported at "
+            f"{header.get('exported_at')} (version {self.version})"
+        )
+        return True
+
+    def snapshot(self):
+        """Return views over the live rows without holding the lock while scoring"""
+        self.ensure_loaded()
+        with self.lock:
+            return self.table.rows()
+
+    def get(self, product_id):
+        """Get a single product by id"""
+        self.ensure_loaded()
+        with self.lock:
+            row = self.positions.get(str(product_id))
+            return self.table.row(row) if row is not None else None
+
+    def apply_changes(self, product_ids):
+        """Re-read the given products and upsert or remove them in place"""
+        product_ids = {str(product_id) for product_id in product_ids}
+        if not product_ids:
+            return 0
+
+        if self.loaded_at is None:
+            return self.reload() and len(product_ids)
+
+        fresh = self.row_loader(sorted(product_ids))
+        if fresh is None:
+            logger.warning(f"Could not fetch {len(product_ids)} changed products, will retry on next delta")
+            return 0
+
+        fetched = {product['id']: product.to_dict() for product in fresh.rows()}
+
+        with self.lock:
+            for product_id in product_ids:
+                if product_id in fetched:
+                    self._upsert(fetched[product_id])
+                else:
+                    self._remove(product_id)
+            self.version += 1
+
+        logger.info(f"Applied {len(product_ids)} product changes (catalog version {self.version})")
+        return len(product_ids)
+
+    def _upsert(self, product):
+        row = self.positions.get(product['id'])
+        if row is None:
+            row = self.table.append(product)
+            self.positions[product['id']] = row
+        else:
+            previous = self.table.row(row).to_dict()
+            for index in self.indexes:
+                index.remove_row(row, previous)
+            self.table.update_row(row, product)
+
+        for index in self.indexes:
+            index.add_row(row, product)
+
+    def _remove(self, product_id):
+        # Rows are tombstoned rather than moved so row ids held by indexes and
+        # in-flight searches stay valid until the next full reload compacts them
+        row = self.positions.pop(product_id, None)
+        if row is None:
+            return
+
+        previous = self.table.row(row).to_dict()
+        for index in self.indexes:
+            index.remove_row(row, previous)
+        self.table.delete_row(row)
+
+
+class CatalogChangeListener(threading.Thread):
+    """Apply product change notifications, with a transaction id delta query as fallback"""
+
+    def __init__(self, catalog, db_config, channel='product_changes', delta_interval=30):
+        super().__init__(name='catalog-change-listener', daemon=True)
+        self.catalog = catalog
+        self.db_config = db_config
+        self.channel = channel
+        self.delta_interval = delta_interval
+        self.connection = None
+        self.watermark = None  # oldest transaction id still running at the last delta
+        self.last_delta = 0.0
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def connect(self):
+        """Open a dedicated autocommit connection and LISTEN on the change channel"""
+        try:
+            self.connection = psycopg2.connect(**self.db_config)
+            self.connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            cursor = self.connection.cursor()
+            cursor.execute(f"LISTEN {self.channel}")
+            if self.watermark is None:
+                self.watermark = self.oldest_running_txid(cursor)
+            cursor.close()
+            logger.info(f"Listening for product changes on '{self.channel}'")
+            return True
+        except Exception as e:
+            logger.error(f"Change listener connection error: {str(e)}")
+            self.connection = None
+            return False
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if self.connection is None and not self.connect():
+                self.stop_event.wait(self.delta_interval)
+                continue
+
+            try:
+                ready, _, _ = select.select([self.connection], [], [], 1.0)
+                if ready:
+                    self.connection.poll()
+                    self.apply_notifications()
+
+                if time.monotonic() - self.last_delta >= self.delta_interval:
+                    if self.catalog.source == 'snapshot':
+                        # Served from a snapshot while the database was down, so
+                        # reconcile with a full read rather than a delta
+                        self.last_delta = time.monotonic()
+                        self.catalog.reload()
+                    else:
+                        self.apply_delta()
+            except Exception as e:
+                logger.error(f"Change listener error: {str(e)}")
+                try:
+                    self.connection.close()
+                except Exception:
+                    pass
+                self.connection = None
+
+    def apply_notifications(self):
+        """Drain pending notifications and apply the distinct product ids at once"""
+        product_ids = set()
+        while self.connection.notifies:
+            notify = self.connection.notifies.pop(0)
+            try:
+                product_ids.add(json.loads(notify.payload)['product_id'])
+            except (ValueError, KeyError):
+                logger.warning(f"Ignoring malformed product change payload: {notify.payload}")
+
+        if product_ids:
+            self.catalog.apply_changes(product_ids)
+
+    @staticmethod
+    def oldest_running_txid(cursor):
+        # Transactions not committed yet have at least this id, however long
+        # they have been running, and later ones get higher ids
+        cursor.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+        return cursor.fetchone()[0]
+
+    def apply_delta(self):
+        """Pick up changes the notifications may have missed using the writers' transaction ids"""
+        self.last_delta = time.monotonic()
+
+        cursor = self.connection.cursor()
+        watermark = self.oldest_running_txid(cursor)
+        cursor.execute("SELECT id FROM products WHERE change_txid >= %s", (self.watermark,))
+        product_ids = {str(row[0]) for row in cursor.fetchall()}
+        cursor.execute("SELECT product_id FROM product_deletions WHERE change_txid >= %s", (self.watermark,))
+        product_ids.update(str(row[0]) for row in cursor.fetchall())
+        cursor.close()
+
+        if product_ids:
+            self.catalog.apply_changes(product_ids)
+        self.watermark = watermark
@@ -0,0 +1,11 @@
+import os
+
+# Database Configuration, shared by the API and the batch jobs so they can
+# connect without importing the API module
+DATABASE_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'database': os.getenv('DB_NAME', 'techcompare_db'),
+    'user': os.getenv('DB_USER', 'postgres'),
+    'password': os.getenv('DB_PASSWORD', '1234'),
+    'port': os.getenv('DB_PORT', 5432)
+}
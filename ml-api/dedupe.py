@@ -0,0 +1,295 @@
+"""Batch job finding near-duplicate products gathered from different sources.
+
+Products are compared only within their brand, and within a brand only when
+their model numbers agree or one of them has none. Each block is scored
+all-pairs in row chunks with a sparse product of character trigram TF-IDF
+vectors of the model names; pairs with similar names are then checked on
+their standardized specifications. Probable duplicates are grouped into
+clusters with union-find and written to duplicate_clusters and
+duplicate_cluster_members for admin review.
+
+    python dedupe.py
+    python dedupe.py --snapshot data/catalog_snapshot.npz --jobs 16
+    python dedupe.py --snapshot data/catalog_snapshot.npz --dry-run --output clusters.json
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+import uuid
+import zlib
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from db_config import DATABASE_CONFIG
+from product_table import ProductTable
+
+logger = logging.getLogger(__name__)
+
+# Specifications compared between name matches: (numeric column, raw column
+# telling whether the source provided the value at all)
+SPEC_COLUMNS = [
+    ('ram_numeric', 'ram'),
+    ('storage_numeric', 'storage'),
+    ('camera_numeric', 'camera'),
+    ('battery_numeric', 'battery'),
+    ('display_size_numeric', 'display_size'),
+    ('processor_score', 'processor')
+]
+
+TEXT_THRESHOLD = 0.75  # min cosine of the model name trigram vectors
+SPEC_MAX_DIFF = 0.5  # max difference of any known spec, in standard deviations
+TEXT_WEIGHT = 0.6
+DUPLICATE_THRESHOLD = 0.85
+CHUNK_ROWS = 512  # leading rows of a block scored against the block at once
+
+# Listing noise that says nothing about which model it is
+NAME_NOISE = re.compile(r'\b(\d+\s*(gb|tb)|[45]g|dual sim|unlocked|new)\b')
+
+
+def normalize_name(name, brand):
+    """Lowercased model name without the brand, capacities and listing noise"""
+    name = re.sub(r'[^a-z0-9+]+', ' ', (name or '').lower())
+    name = NAME_NOISE.sub(' ', name.replace(brand, ' ') if brand else name)
+    return ' '.join(name.split())
+
+
+def model_number_codes(names):
+    """Hash of the tokens holding digits, such as s23 or 13; 0 when a name has none"""
+    codes = np.zeros(len(names), dtype=np.int64)
+    for row, name in enumerate(names):
+        numbers = sorted(token for token in name.split() if any(char.isdigit() for char in token))
+        if numbers:
+            # crc32 rather than hash(), which is salted per process
+            codes[row] = zlib.crc32(' '.join(numbers).encode()) or 1
+    return codes
+
+
+def standardize_specs(table):
+    """Z-scored spec matrix and a mask of the values the source actually provided"""
+    values = np.column_stack([table.column(column).astype(np.float64) for column, _ in SPEC_COLUMNS])
+    known = np.column_stack([table.column(raw) != '' for _, raw in SPEC_COLUMNS])
+    for index in range(values.shape[1]):
+        provided = values[known[:, index], index]
+        if len(provided):
+            std = provided.std() or 1.0
+            values[:, index] = (values[:, index] - provided.mean()) / std
+    return values, known
+
+
+def score_block(rows, text, numbers, specs, known, start, stop):
+    """Duplicate pairs between rows[start:stop] and the later rows of one block"""
+    chunk = slice(start, stop)
+    similarity = (text[chunk] @ text.T).tocoo()
+
+    # Keep each unordered pair once, with enough name overlap
+    left = similarity.row + start
+    right = similarity.col
+    mask = (right > left) & (similarity.data >= TEXT_THRESHOLD)
+    left, right, text_score = left[mask], right[mask], similarity.data[mask]
+    if not len(left):
+        return []
+
+    # Names differing in their model number (S22 and S23) never match
+    same_number = (numbers[left] == numbers[right]) | (numbers[left] == 0) | (numbers[right] == 0)
+    left, right, text_score = left[same_number], right[same_number], text_score[same_number]
+
+    both = known[left] & known[right]
+    diff = np.where(both, np.abs(specs[left] - specs[right]), 0.0)
+    compared = both.sum(axis=1)
+
+    # Different variants (storage, RAM) of one model are not duplicates
+    consistent = diff.max(axis=1) <= SPEC_MAX_DIFF
+    spec_score = np.where(compared > 0, 1 - diff.sum(axis=1) / np.maximum(compared, 1) / SPEC_MAX_DIFF, text_score)
+    score = TEXT_WEIGHT * text_score + (1 - TEXT_WEIGHT) * spec_score
+
+    keep = consistent & (score >= DUPLICATE_THRESHOLD)
+    return list(zip(rows[left[keep]].tolist(), rows[right[keep]].tolist(), score[keep].tolist()))
+
+
+def blocks(brands, numbers):
+    """Yield (rows, leading rows) blocks; pairs start from a leading row and end at any later row"""
+    for brand in np.unique(brands):
+        rows = np.flatnonzero(brands == brand)
+        codes = numbers[rows]
+        # Names without a model number can match any name of their brand, so
+        # they trail every model number block and are scored among themselves once
+        unnumbered = rows[codes == 0]
+        for code in np.unique(codes[codes != 0]):
+            numbered = rows[codes == code]
+            if len(numbered) + len(unnumbered) >= 2:
+                yield np.concatenate([numbered, unnumbered]), len(numbered)
+        if len(unnumbered) >= 2:
+            yield unnumbered, len(unnumbered)
+
+
+def find_duplicate_pairs(table, jobs=1, chunk_rows=CHUNK_ROWS):
+    """(row, row, score) pairs of probable duplicates, compared within each brand"""
+    brands = table.column('brand')
+    names = [normalize_name(name, brand) for name, brand in zip(table.column('model'), brands)]
+    text = TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 3), sublinear_tf=True).fit_transform(names).tocsr()
+    numbers = model_number_codes(names)
+    specs, known = standardize_specs(table)
+
+    tasks = []
+    for rows, leading in blocks(brands, numbers):
+        block = (rows, text[rows], numbers[rows], specs[rows], known[rows])
+        for start in range(0, leading, chunk_rows):
+            tasks.append(delayed(score_block)(*block, start, min(start + chunk_rows, leading)))
+
+    logger.info(f"Scoring {len(tasks)} blocks over {len(np.unique(brands))} brands with {jobs} jobs")
+    pairs = []
+    for block_pairs in Parallel(n_jobs=jobs)(tasks):
+        pairs.extend(block_pairs)
+    return pairs
+
+
+def cluster_pairs(pairs, size):
+    """Connected components of the duplicate pairs; returns {root: [(row, best score)]}"""
+    parent = np.arange(size)
+
+    def find(row):
+        while parent[row] != row:
+            parent[row] = parent[parent[row]]
+            row = parent[row]
+        return row
+
+    best = {}
+    for left, right, score in pairs:
+        parent[find(left)] = find(right)
+        best[left] = max(best.get(left, 0.0), score)
+        best[right] = max(best.get(right, 0.0), score)
+
+    clusters = {}
+    for row, score in best.items():
+        clusters.setdefault(find(row), []).append((row, score))
+    return clusters
+
+
+def build_clusters(table, pairs):
+    """Cluster records with the most reviewed product as the canonical one"""
+    ids = table.objects['id']
+    brands = table.column('brand')
+    models = table.column('model')
+    reviews = table.column('reviews')
+
+    records = []
+    for members in cluster_pairs(pairs, len(ids)).values():
+        rows = sorted(row for row, _ in members)
+        scores = [score for _, score in members]
+        canonical = max(rows, key=lambda row: (reviews[row], -row))
+        records.append({
+            'brand': brands[rows[0]],
+            'canonical_product_id': ids[canonical],
+            'size': len(rows),
+            'min_similarity': round(min(scores), 4),
+            'max_similarity': round(max(scores), 4),
+            'members': [
+                {'product_id': ids[row], 'model': models[row], 'similarity': round(score, 4)}
+                for row, score in sorted(members)
+            ]
+        })
+    records.sort(key=lambda cluster: (-cluster['size'], -cluster['max_similarity']))
+    return records
+
+
+def drop_missing_products(clusters, existing_ids):
+    """Remove members that no longer exist, e.g. deleted since the snapshot was taken"""
+    kept = []
+    for cluster in clusters:
+        members = [member for member in cluster['members'] if member['product_id'] in existing_ids]
+        if len(members) < 2:
+            continue
+        canonical = cluster['canonical_product_id']
+        if canonical not in existing_ids:
+            canonical = members[0]['product_id']
+        kept.append(dict(cluster, canonical_product_id=canonical, size=len(members), members=members))
+    return kept
+
+
+def write_clusters(db_config, clusters):
+    """Replace the pending clusters with this run's; reviewed clusters are kept"""
+    import psycopg2
+    from psycopg2.extras import execute_values
+
+    run_id = str(uuid.uuid4())
+    connection = psycopg2.connect(**db_config)
+    try:
+        with connection, connection.cursor() as cursor:
+            # Lock the member products against deletion until the clusters are
+            # stored, and skip the ones already gone
+            product_ids = sorted({member['product_id'] for cluster in clusters for member in cluster['members']})
+            cursor.execute(
+                "SELECT id::text FROM products WHERE id = ANY(%s::uuid[]) FOR KEY SHARE",
+                (product_ids,)
+            )
+            existing_ids = {row[0] for row in cursor.fetchall()}
+            if len(existing_ids) < len(product_ids):
+                logger.warning(f"Skipping {len(product_ids) - len(existing_ids)} products no longer in the catalog")
+            clusters = drop_missing_products(clusters, existing_ids)
+
+            cursor.execute("DELETE FROM duplicate_clusters WHERE status = 'pending'")
+            for cluster in clusters:
+                cursor.execute("""
+                    INSERT INTO duplicate_clusters
+                        (run_id, brand, canonical_product_id, size, min_similarity, max_similarity)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    RETURNING id
+                """, (run_id, cluster['brand'], cluster['canonical_product_id'], cluster['size'],
+                      cluster['min_similarity'], cluster['max_similarity']))
+                cluster_id = cursor.fetchone()[0]
+                execute_values(cursor, """
+                    INSERT INTO duplicate_cluster_members (cluster_id, product_id, similarity) VALUES %s
+                """, [(cluster_id, member['product_id'], member['similarity']) for member in cluster['members']])
+    finally:
+        connection.close()
+    return run_id
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    parser = argparse.ArgumentParser(description='Find near-duplicate products and store clusters for review')
+    parser.add_argument('--snapshot', help='Read the catalog from a snapshot instead of the database')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--dry-run', action='store_true', help='Do not write clusters to the database')
+    parser.add_argument('--output', help='Also write the clusters to this JSON file')
+    args = parser.parse_args()
+
+    if args.snapshot:
+        table, header = ProductTable.load_snapshot(args.snapshot)
+        logger.info(f"Loaded snapshot {args.snapshot} exported at {header.get('exported_at')}")
+    else:
+        # The database catalog is enriched exactly as the API does it
+        import mobile_spec
+        table = mobile_spec.matcher.get_products_from_db()
+
+    table = table.compact()
+    if not len(table):
+        logger.error("Catalog is empty, nothing to compare")
+        return 1
+
+    start = time.perf_counter()
+    pairs = find_duplicate_pairs(table, args.jobs, args.chunk_rows)
+    clusters = build_clusters(table, pairs)
+    logger.info(
+        f"Found {len(pairs)} duplicate pairs in {len(clusters)} clusters among {len(table)} products "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(clusters, f, indent=2)
+    if not args.dry_run:
+        run_id = write_clusters(DATABASE_CONFIG, clusters)
+        logger.info(f"Stored clusters of run {run_id}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
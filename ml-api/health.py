@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+from datetime import datetime
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+
+class HealthProber:
+    """Probe dependencies in the background so liveness and readiness checks only read state"""
+
+    def __init__(self, db_config, catalog, model_loaded, pools=None, interval=5, db_timeout=2, max_load_backoff=300):
+        # model_loaded() reports whether a model bundle is in memory, pools maps
+        # names to AdmissionPools whose backlogs count against readiness
+        self.db_config = db_config
+        self.catalog = catalog
+        self.model_loaded = model_loaded
+        self.pools = pools or {}
+        self.interval = interval
+        self.db_timeout = db_timeout
+        self.max_load_backoff = max_load_backoff
+        self.load_thread = None
+        self.load_backoff = interval
+        self.next_load = 0.0
+        self.state = {'ready': False, 'reasons': ['not probed yet'], 'probed_at': None}
+        self.last_probe = None
+        self.thread = None
+        self.start_lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+    def ensure_started(self):
+        with self.start_lock:
+            if self.stop_event.is_set() or (self.thread is not None and self.thread.is_alive()):
+                return
+            # A thread runs once; one that died, or did not survive a fork, is replaced
+            self.thread = threading.Thread(target=self.run, name='health-prober', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.probe()
+            except Exception as e:
+                logger.error(f"Health probe error: {str(e)}")
+            self.stop_event.wait(self.interval)
+
+    def probe_database(self):
+        """Open a short-lived connection so the probe never shares the request connection"""
+        start = time.perf_counter()
+        try:
+            connection = psycopg2.connect(connect_timeout=self.db_timeout, **self.db_config)
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+            finally:
+                connection.close()
+            return {'reachable': True, 'latency_ms': (time.perf_counter() - start) * 1000, 'error': None}
+        except Exception as e:
+            return {'reachable': False, 'latency_ms': None, 'error': str(e).strip()}
+
+    def start_catalog_load(self):
+        """Load the catalog on its own thread so a slow or unreachable database never stalls probing"""
+        if self.catalog.loaded_at is not None or time.monotonic() < self.next_load:
+            return
+        if self.load_thread is not None and self.load_thread.is_alive():
+            return
+        self.load_thread = threading.Thread(target=self.load_catalog, name='catalog-initial-load', daemon=True)
+        self.load_thread.start()
+
+    def load_catalog(self):
+        try:
+            self.catalog.ensure_loaded()
+        except Exception as e:
+            logger.error(f"Catalog load error: {str(e)}")
+
+        if self.catalog.loaded_at is None:
+            # Back off while the database stays down instead of retrying every probe
+            logger.warning(f"Catalog not loaded, retrying in {self.load_backoff}s")
+            self.next_load = time.monotonic() + self.load_backoff
+            self.load_backoff = min(self.load_backoff * 2, self.max_load_backoff)
+        else:
+            self.load_backoff = self.interval
+
+    def probe(self):
+        # Loading starts here rather than in the first request after startup
+        self.start_catalog_load()
+
+        database = self.probe_database()
+        loaded_at = self.catalog.loaded_at
+        catalog = {
+            'loaded': loaded_at is not None,
+            'loading': self.load_thread is not None and self.load_thread.is_alive(),
+            'source': self.catalog.source,
+            'version': self.catalog.version,
+            'products': len(self.catalog.table),
+            'age_seconds': (datetime.now() - loaded_at).total_seconds() if loaded_at else None
+        }
+        queues = {name: pool.stats() for name, pool in self.pools.items()}
+        model_loaded = bool(self.model_loaded())
+
+        reasons = []
+        if not catalog['loaded']:
+            reasons.append('catalog not loaded')
+        if not model_loaded:
+            reasons.append('model not loaded')
+        for name, stats in queues.items():
+            if stats['max_queue'] and stats['waiting'] >= stats['max_queue']:
+                reasons.append(f"{name} queue full")
+
+        # A catalog served from a snapshot keeps the service ready while the
+        # database is down, but it is reported as degraded
+        self.state = {
+            'ready': not reasons,
+            'degraded': not database['reachable'],
+            'reasons': reasons,
+            'database': database,
+            'catalog': catalog,
+            'model_loaded': model_loaded,
+            'queues': {name: {'active': stats['active'], 'waiting': stats['waiting']} for name, stats in queues.items()},
+            'probed_at': datetime.now().isoformat()
+        }
+        self.last_probe = time.monotonic()
+
+    def live(self):
+        """The prober keeps running and has probed recently"""
+        if self.thread is None or not self.thread.is_alive():
+            return False
+        return self.last_probe is None or time.monotonic() - self.last_probe < 3 * self.interval + self.db_timeout
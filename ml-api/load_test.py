@@ -0,0 +1,404 @@
+"""Load generator replaying a configurable traffic mix against a running ml-api.
+
+Examples:
+    python load_test.py --url http://localhost:5000 --concurrency 8 --duration 30
+    python load_test.py --sweep 1,2,4,8,16,32 --threshold search:p99=250 --threshold error_rate=0.01
+    python load_test.py --seed-from-db --mix search=60,products=10,compare=10,recommendations=10,suggest=10
+    python load_test.py --start-server --snapshot data/catalog_snapshot.npz --sweep 1,4,16
+
+With --start-server the API is launched locally from a catalog snapshot and the
+trained model in model/ (or MODEL_BUNDLE_DIR). Search, suggest, products and
+predict are then served without Postgres; product, compare and recommendations
+read Postgres on every request, so they are dropped from the mix. Queries come
+from --queries-file or the built-in set.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter, defaultdict
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_URL = 'http://localhost:5000'
+DEFAULT_MIX = {
+    'search': 50,
+    'products': 10,
+    'product': 10,
+    'compare': 10,
+    'recommendations': 10,
+    'suggest': 10,
+    'predict': 0
+}
+REQUEST_TIMEOUT = 30
+# Traffic classes whose endpoints query Postgres on every request
+DATABASE_CLASSES = ('product', 'compare', 'recommendations')
+# Page size used to collect product ids; the API caps it at PRODUCTS_MAX_LIMIT
+PRODUCT_ID_PAGE_SIZE = 500
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model', 'specification_matching_models.joblib')
+# A concurrency level saturates the service when it adds less throughput than this
+SATURATION_GAIN = 0.05
+
+DEFAULT_QUERIES = [
+    'samsung 8gb ram 128gb storage',
+    'iphone 256gb storage 48mp camera',
+    'phone with 5000mah battery under $400',
+    'google pixel 12gb ram',
+    'xiaomi 6.7 inch 108mp camera',
+    'oneplus 16gb ram 512gb storage 5000mah',
+    'budget phone 4gb ram 64gb storage',
+    'snapdragon 8 gen 2 12gb ram'
+]
+
+PREDICTIONS_QUERY = """
+SELECT brand, display_size, processor, ram, storage, camera, battery
+FROM predictions
+ORDER BY created_at DESC
+LIMIT %s
+"""
+
+
+class TrafficMix:
+    """Builds requests for each traffic class from seed queries and catalog ids"""
+
+    def __init__(self, weights, queries, predict_payloads, product_ids, rng):
+        self.classes = [name for name, weight in weights.items() if weight > 0]
+        self.weights = [weights[name] for name in self.classes]
+        self.queries = queries
+        self.predict_payloads = predict_payloads
+        self.product_ids = product_ids
+        self.rng = rng
+
+    def next_request(self):
+        """Return (traffic class, method, path, json body)"""
+        name = self.rng.choices(self.classes, self.weights)[0]
+        return (name,) + getattr(self, f"_{name}")()
+
+    def _search(self):
+        return 'POST', '/api/search', {'specification': self.rng.choice(self.queries), 'top_k': 10}
+
+    def _predict(self):
+        return 'POST', '/api/predict', self.rng.choice(self.predict_payloads)
+
+    def _products(self):
+        return 'GET', '/api/products', None
+
+    def _product(self):
+        return 'GET', f"/api/products/{self.rng.choice(self.product_ids)}", None
+
+    def _compare(self):
+        count = min(len(self.product_ids), self.rng.randint(2, 4))
+        return 'POST', '/api/compare', {'product_ids': self.rng.sample(self.product_ids, count)}
+
+    def _recommendations(self):
+        return 'GET', f"/api/recommendations/{self.rng.choice(self.product_ids)}", None
+
+    def _suggest(self):
+        query = self.rng.choice(self.queries)
+        return 'GET', f"/api/suggest?q={urllib.parse.quote(query[:self.rng.randint(1, 6)])}", None
+
+
+def send(base_url, method, path, body):
+    """Issue one request and return (ok, status, latency in seconds)"""
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base_url + path, data=data, method=method, headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=REQUEST_TIMEOUT) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    return 200 <= status < 300, status, time.perf_counter() - start
+
+
+def run_level(base_url, mix_factory, concurrency, duration, warmup):
+    """Run closed-loop workers for duration seconds and collect per-request samples"""
+    samples = defaultdict(list)  # traffic class -> [(latency, ok, status)]
+    lock = threading.Lock()
+    start = time.monotonic()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    def worker(seed):
+        mix = mix_factory(seed)
+        local = defaultdict(list)
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            name, method, path, body = mix.next_request()
+            ok, status, latency = send(base_url, method, path, body)
+            if now >= measure_from:
+                local[name].append((latency, ok, status))
+        with lock:
+            for name, values in local.items():
+                samples[name].extend(values)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(samples, duration, concurrency)
+
+
+def summarize(samples, duration, concurrency):
+    """Throughput, error rate and latency percentiles per traffic class and overall"""
+    def stats(values):
+        latencies = np.array([latency for latency, _, _ in values]) * 1000
+        errors = sum(1 for _, ok, _ in values if not ok)
+        if not len(latencies):
+            return {'requests': 0, 'throughput': 0.0, 'error_rate': 0.0, 'p50': None, 'p95': None, 'p99': None, 'statuses': {}}
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        return {
+            'requests': len(values),
+            'throughput': len(values) / duration,
+            'error_rate': errors / len(values),
+            'p50': float(p50),
+            'p95': float(p95),
+            'p99': float(p99),
+            'statuses': {str(status): count for status, count in sorted(Counter(s for _, _, s in values).items())}
+        }
+
+    endpoints = {name: stats(values) for name, values in sorted(samples.items())}
+    overall = stats([sample for values in samples.values() for sample in values])
+    return {'concurrency': concurrency, 'duration': duration, 'overall': overall, 'endpoints': endpoints}
+
+
+def check_thresholds(report, thresholds):
+    """Return a list of failed threshold descriptions"""
+    failures = []
+    for scope, metric, limit in thresholds:
+        result = report['overall'] if scope is None else report['endpoints'].get(scope)
+        if result is None or result.get(metric) is None:
+            continue
+        if result[metric] > limit:
+            failures.append(f"{scope or 'overall'} {metric} {result[metric]:.3f} > {limit}")
+    return failures
+
+
+def find_saturation(reports, thresholds):
+    """Highest concurrency that still adds throughput and passes every threshold"""
+    best = None
+    for report in reports:
+        if check_thresholds(report, thresholds):
+            break
+        throughput = report['overall']['throughput']
+        if best is not None and throughput < best['overall']['throughput'] * (1 + SATURATION_GAIN):
+            break
+        best = report
+    return best['concurrency'] if best else None
+
+
+def print_report(report):
+    print(f"\nconcurrency={report['concurrency']} duration={report['duration']}s")
+    print(f"{'endpoint':<18}{'requests':>10}{'req/s':>10}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = list(report['endpoints'].items()) + [('overall', report['overall'])]
+    for name, result in rows:
+        if not result['requests']:
+            continue
+        print(
+            f"{name:<18}{result['requests']:>10}{result['throughput']:>10.1f}{result['error_rate']:>9.2%}"
+            f"{result['p50']:>10.1f}{result['p95']:>10.1f}{result['p99']:>10.1f}"
+        )
+
+
+def parse_mix(value):
+    weights = dict.fromkeys(DEFAULT_MIX, 0)
+    for part in value.split(','):
+        name, weight = part.split('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown traffic class '{name}'")
+        weights[name] = float(weight)
+    return weights
+
+
+def parse_threshold(value):
+    """'search:p99=250' limits one endpoint, 'error_rate=0.01' limits the overall result"""
+    target, limit = value.split('=')
+    scope, metric = target.split(':') if ':' in target else (None, target)
+    if metric not in ('p50', 'p95', 'p99', 'error_rate'):
+        raise argparse.ArgumentTypeError(f"Unknown threshold metric '{metric}'")
+    return scope, metric, float(limit)
+
+
+def load_seed_from_db(limit):
+    """Turn recent rows of the predictions table into search texts and predict payloads"""
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    from db_config import DATABASE_CONFIG
+
+    connection = psycopg2.connect(**DATABASE_CONFIG)
+    try:
+        with connection.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(PREDICTIONS_QUERY, (limit,))
+            rows = cursor.fetchall()
+    finally:
+        connection.close()
+
+    queries = []
+    payloads = []
+    for row in rows:
+        parts = [row['brand'], row['ram'] and f"{row['ram']} ram", row['storage'] and f"{row['storage']} storage",
+                 row['camera'] and f"{row['camera']} camera", row['battery'], row['display_size']]
+        queries.append(' '.join(str(part) for part in parts if part))
+        payloads.append({key: row[key] or 'Unknown' for key in ('brand', 'display_size', 'processor', 'ram', 'storage', 'camera', 'battery')})
+    logger.info(f"Seeded {len(queries)} requests from the predictions table")
+    return queries, payloads
+
+
+def queries_to_payloads(queries, rng):
+    """Synthetic predict payloads when no prediction history is available"""
+    brands = ['samsung', 'apple', 'google', 'xiaomi', 'oneplus']
+    return [{
+        'brand': rng.choice(brands),
+        'display_size': f"{rng.choice([6.1, 6.4, 6.7])} inch",
+        'processor': 'Unknown',
+        'ram': f"{rng.choice([4, 6, 8, 12])}GB",
+        'storage': f"{rng.choice([64, 128, 256, 512])}GB",
+        'camera': f"{rng.choice([12, 48, 50, 108])}MP",
+        'battery': f"{rng.choice([4000, 4500, 5000])}mAh"
+    } for _ in queries]
+
+
+def fetch_product_ids(base_url):
+    """Every catalog id, read page by page"""
+    product_ids = []
+    page, total_pages = 1, 1
+    while page <= total_pages:
+        query = urllib.parse.urlencode({'fields': 'id', 'limit': PRODUCT_ID_PAGE_SIZE, 'page': page})
+        req = urllib.request.Request(f"{base_url}/api/products?{query}")
+        with urllib.request.urlopen(req, timeout=REQUEST_TIMEOUT) as response:
+            body = json.loads(response.read())
+        product_ids.extend(product['id'] for product in body['products'])
+        total_pages = body['pagination']['total_pages']
+        page += 1
+    return product_ids
+
+
+def start_server(port, snapshot):
+    """Launch mobile_spec.py serving from a catalog snapshot with change listening off"""
+    # Without a trained model the API would train one from Postgres on startup
+    if not os.path.exists(MODEL_PATH) and not os.getenv('MODEL_BUNDLE_DIR'):
+        raise RuntimeError('--start-server needs a trained model in model/ or MODEL_BUNDLE_DIR; run train.py first')
+    env = dict(os.environ, PORT=str(port), CATALOG_LISTEN='false', DEBUG='false')
+    if snapshot:
+        env['CATALOG_SNAPSHOT_PATH'] = os.path.abspath(snapshot)
+    process = subprocess.Popen(
+        [sys.executable, 'mobile_spec.py'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://localhost:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        ok, _, _ = send(base_url, 'GET', '/api/health', None)
+        if ok:
+            return process, base_url
+        if process.poll() is not None:
+            break
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError('ml-api did not become healthy')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a traffic mix against the ml-api')
+    parser.add_argument('--url', default=DEFAULT_URL)
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX, help='e.g. search=60,products=20,compare=20')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--sweep', help='Comma separated concurrency levels, e.g. 1,2,4,8,16')
+    parser.add_argument('--duration', type=float, default=20, help='Measured seconds per level')
+    parser.add_argument('--warmup', type=float, default=3, help='Unmeasured seconds before each level')
+    parser.add_argument('--threshold', type=parse_threshold, action='append', default=[],
+                        help='Latency limits in ms, e.g. search:p99=250, or error_rate=0.01')
+    parser.add_argument('--seed-from-db', action='store_true', help='Build queries from the predictions table')
+    parser.add_argument('--seed-limit', type=int, default=1000)
+    parser.add_argument('--queries-file', help='One specification text per line')
+    parser.add_argument('--random-seed', type=int, default=42)
+    parser.add_argument('--start-server', action='store_true', help='Start a local ml-api for the run')
+    parser.add_argument('--snapshot', help='Catalog snapshot used by --start-server')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--output', help='Write the JSON report here')
+    args = parser.parse_args()
+
+    rng = random.Random(args.random_seed)
+    if args.seed_from_db:
+        queries, payloads = load_seed_from_db(args.seed_limit)
+    elif args.queries_file:
+        with open(args.queries_file) as f:
+            queries = [line.strip() for line in f if line.strip()]
+        payloads = queries_to_payloads(queries, rng)
+    else:
+        queries = DEFAULT_QUERIES
+        payloads = queries_to_payloads(queries, rng)
+    if not queries:
+        parser.error('No seed queries available')
+
+    mix = dict(args.mix)
+    if args.start_server:
+        dropped = [name for name in DATABASE_CLASSES if mix.get(name)]
+        if dropped:
+            logger.warning(f"Dropping {', '.join(dropped)} from the mix: they need Postgres")
+        mix = {name: 0 if name in DATABASE_CLASSES else weight for name, weight in mix.items()}
+    if not any(weight > 0 for weight in mix.values()):
+        parser.error('The traffic mix is empty')
+
+    process = None
+    base_url = args.url.rstrip('/')
+    try:
+        if args.start_server:
+            process, base_url = start_server(args.port, args.snapshot)
+
+        product_ids = fetch_product_ids(base_url)
+        if len(product_ids) < 2 and any(mix.get(name) for name in DATABASE_CLASSES):
+            parser.error('The catalog needs at least two products')
+
+        def mix_factory(worker_seed):
+            return TrafficMix(mix, queries, payloads, product_ids, random.Random(args.random_seed + worker_seed))
+
+        levels = [int(level) for level in args.sweep.split(',')] if args.sweep else [args.concurrency]
+        reports = []
+        for level in levels:
+            report = run_level(base_url, mix_factory, level, args.duration, args.warmup)
+            report['failures'] = check_thresholds(report, args.threshold)
+            reports.append(report)
+            print_report(report)
+            for failure in report['failures']:
+                print(f"FAIL {failure}")
+
+        result = {'levels': reports}
+        if args.sweep:
+            result['saturation_concurrency'] = find_saturation(reports, args.threshold)
+            print(f"\nSaturation point: concurrency {result['saturation_concurrency']}")
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(result, f, indent=2)
+
+        # A single run is gated by its thresholds, a sweep fails when no level passes them
+        if args.sweep:
+            return 1 if result['saturation_concurrency'] is None else 0
+        return 1 if reports[0]['failures'] else 0
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
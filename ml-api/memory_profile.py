@@ -0,0 +1,174 @@
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+def rss_peak_mb():
+    """High-water mark of the process resident set, which also covers allocations tracemalloc cannot see"""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class MemoryProfiler:
+    """Opt-in per-stage memory accounting and tracemalloc snapshots"""
+
+    def __init__(self, enabled=False, frames=1, max_snapshots=5):
+        self.frames = frames
+        self.max_snapshots = max_snapshots
+        self.latest = {}  # stage name -> stats of its last run
+        self.snapshots = []  # (id, taken_at, snapshot), oldest first
+        self.next_snapshot_id = 1
+        self.threads = threading.local()  # the stages open on each thread, innermost last
+        self.open_stages = {}  # thread id -> its open stages, so every peak fold reaches them
+        self.collectors = threading.local()
+        self.lock = threading.Lock()
+        self.enabled = False
+        if enabled:
+            self.start()
+
+    def start(self, frames=None):
+        with self.lock:
+            self.frames = frames or self.frames
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+            self.enabled = True
+        logger.info(f"Memory profiling started with {self.frames} frame(s) per allocation")
+
+    def stop(self):
+        with self.lock:
+            self.enabled = False
+            self.open_stages = {}
+            self.snapshots = []
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+        logger.info("Memory profiling stopped")
+
+    def _fold_peak(self):
+        # tracemalloc keeps a single process-wide peak, so fold it into the open
+        # stages of every thread before a stage on any of them resets it
+        _, peak = tracemalloc.get_traced_memory()
+        for stages in self.open_stages.values():
+            for stage in stages:
+                stage['peak'] = max(stage['peak'], peak)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def stage(self, name):
+        """Record net allocated and peak traced memory of the enclosed block"""
+        if not self.enabled or not tracemalloc.is_tracing():
+            yield
+            return
+
+        stages = getattr(self.threads, 'stages', None)
+        if stages is None:
+            stages = self.threads.stages = []
+        with self.lock:
+            self._fold_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            stage = {'start': current, 'peak': current}
+            stages.append(stage)
+            self.open_stages[threading.get_ident()] = stages
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self._fold_peak()
+                current, _ = tracemalloc.get_traced_memory()
+                # Stages nest on a thread, so this one is the innermost
+                stages.pop()
+                if not stages:
+                    self.open_stages.pop(threading.get_ident(), None)
+            stats = {
+                'allocated_mb': round((current - stage['start']) / MB, 2),
+                'peak_mb': round((stage['peak'] - stage['start']) / MB, 2),
+                'traced_peak_mb': round(stage['peak'] / MB, 2),
+                'rss_peak_mb': rss_peak_mb(),
+                'seconds': round(time.perf_counter() - start_time, 3),
+                'recorded_at': datetime.now().isoformat()
+            }
+            self.latest[name] = stats
+            collected = getattr(self.collectors, 'stages', None)
+            if collected is not None:
+                collected[name] = stats
+
+    def begin_run(self):
+        """Start gathering the stages this thread records, e.g. for one training run"""
+        self.collectors.stages = {}
+
+    def run_stages(self):
+        return dict(getattr(self.collectors, 'stages', None) or {})
+
+    def take_snapshot(self):
+        """Capture a tracemalloc snapshot and keep the newest max_snapshots of them"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError('Memory profiling is not enabled')
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>')
+        ])
+        with self.lock:
+            snapshot_id = self.next_snapshot_id
+            self.next_snapshot_id += 1
+            self.snapshots.append((snapshot_id, datetime.now().isoformat(), snapshot))
+            del self.snapshots[:-self.max_snapshots]
+        return snapshot_id, snapshot
+
+    def last_snapshot(self):
+        with self.lock:
+            return self.snapshots[-1] if self.snapshots else None
+
+    def get_snapshot(self, snapshot_id):
+        with self.lock:
+            for entry in self.snapshots:
+                if entry[0] == snapshot_id:
+                    return entry
+        return None
+
+    @staticmethod
+    def format_stats(stats, limit):
+        return [
+            {
+                'location': str(stat.traceback),
+                'size_mb': round(stat.size / MB, 3),
+                'size_diff_mb': round(getattr(stat, 'size_diff', 0) / MB, 3),
+                'count': stat.count,
+                'count_diff': getattr(stat, 'count_diff', 0)
+            }
+            for stat in stats[:limit]
+        ]
+
+    def top(self, snapshot, limit=20, key_type='lineno'):
+        return self.format_stats(snapshot.statistics(key_type), limit)
+
+    def diff(self, old_snapshot, new_snapshot, limit=20, key_type='lineno'):
+        """Largest allocation changes between two snapshots"""
+        return self.format_stats(new_snapshot.compare_to(old_snapshot, key_type), limit)
+
+    def status(self):
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        with self.lock:
+            snapshots = [{'id': snapshot_id, 'taken_at': taken_at} for snapshot_id, taken_at, _ in self.snapshots]
+        return {
+            'enabled': self.enabled,
+            'frames': self.frames,
+            'traced_current_mb': round(current / MB, 2),
+            'traced_peak_mb': round(peak / MB, 2),
+            'rss_peak_mb': rss_peak_mb(),
+            'snapshots': snapshots,
+            'stages': dict(self.latest)
+        }
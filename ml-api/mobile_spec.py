@@ -2,26 +2,56 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression, Ridge, Lasso
+from sklearn.linear_model import LinearRegression, Ridge, Lasso, SGDRegressor
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.tree import DecisionTreeRegressor
+from sklearn.neural_network import MLPRegressor
 from sklearn.svm import SVR
 from sklearn.preprocessing import LabelEncoder, StandardScaler, MinMaxScaler, RobustScaler
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+from sklearn.model_selection import train_test_split, cross_validate
 from sklearn.metrics import mean_absolute_error, r2_score, mean_squared_error
-from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.feature_selection import SelectKBest, f_regression
 from sklearn.pipeline import Pipeline
+from sklearn.base import clone
+from sklearn.model_selection import ParameterGrid
+from concurrent.futures import wait, FIRST_COMPLETED
+from joblib.externals.loky import ProcessPoolExecutor
+from contextlib import contextmanager
 import joblib
+import copy
+import heapq
+import itertools
+import time
+import threading
 import os
 import logging
 from datetime import datetime
 import json
 import re
+import hashlib
+import shutil
 from difflib import SequenceMatcher
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import uuid
+from catalog import ProductCatalog, CatalogChangeListener
+from search_index import BitmapIndex, CandidateIndex, FuzzyTermIndex, SuggestionIndex
+from product_table import ProductTable
+from result_cache import ResultCache
+from single_flight import CoalescingTimeout, SingleFlight
+from admission import AdmissionPool
+from health import HealthProber
+from memory_profile import MemoryProfiler
+from training_telemetry import TrainingTelemetry, compare_latest, history_entry
+from streaming_training import StandardizedTargetRegressor, StreamingRegressionMetrics, chunk_bounds, holdout_mask
+from shard_search import ShardCoordinator, load_manifest
+import search_worker
+from queries import PRODUCTS_QUERY, PREPARED_STATEMENTS
+from db_config import DATABASE_CONFIG
+from serialization import json_response, parse_fields, project
+from product_table import PRODUCT_FIELDS
+from model_bundle import ModelBundleWatcher, latest_version, read_bundle, write_bundle
+from functools import wraps
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -37,28 +67,185 @@ MODEL_PATH = 'model/specification_matching_models.joblib'
 SCALER_PATH = 'model/feature_scaler.joblib'
 ENCODERS_PATH = 'model/label_encoders.joblib'
 FEATURE_SELECTOR_PATH = 'model/feature_selector.joblib'
+BRAND_POPULARITY_PATH = 'model/brand_popularity.joblib'
+TRAINING_STATE_PATH = 'model/training_state.joblib'
+
+# Shared directory of versioned model bundles published by train.py; serving
+# processes load the newest one and poll for later ones
+MODEL_BUNDLE_DIR = os.getenv('MODEL_BUNDLE_DIR')
+MODEL_BUNDLE_POLL_INTERVAL = float(os.getenv('MODEL_BUNDLE_POLL_INTERVAL', 10))
+MODEL_BUNDLE_KEEP = int(os.getenv('MODEL_BUNDLE_KEEP', 5))
+TRAINING_CACHE_DIR = 'model/cache'
+TRAINING_CACHE_KEEP = int(os.getenv('TRAINING_CACHE_KEEP', 3))  # newest cached training matrices kept on disk
 MODEL_VERSION = '3.0.0'
 MIN_TRAINING_SAMPLES = 25000
+SYNTHETIC_SEED = 42
+FEATURE_CODE_VERSION = '2'  # bump whenever feature engineering changes
+TRAINING_TELEMETRY_HISTORY = 20  # past runs' stage timings kept in model_info for comparison
+
+# Out-of-core streaming training: real and synthetic rows are generated and
+# featurized chunk by chunk and fed to incremental regressors
+STREAM_TRAINING_SAMPLES = int(os.getenv('STREAM_TRAINING_SAMPLES', 10000000))
+STREAM_TRAINING_CHUNK_SIZE = int(os.getenv('STREAM_TRAINING_CHUNK_SIZE', 50000))
+STREAM_TRAINING_EPOCHS = int(os.getenv('STREAM_TRAINING_EPOCHS', 2))
+STREAM_TRAINING_HOLDOUT = 0.2
+
+# Incremental retraining
+INCREMENTAL_REPLAY_SIZE = 2000
+INCREMENTAL_EXTRA_ESTIMATORS = 10
+INCREMENTAL_DRIFT_THRESHOLD = 0.25  # max shift of a feature mean, in standard deviations
+INCREMENTAL_MAX_CHANGED_FRACTION = 0.2
+INCREMENTAL_MAX_UPDATES = 10
+
+# Hyperparameter search with successive halving
+HYPERPARAMETER_SPACE = {
+    'ridge': {'alpha': [0.1, 1.0, 10.0, 100.0]},
+    'lasso': {'alpha': [0.1, 1.0, 10.0, 100.0]},
+    'random_forest': {
+        'n_estimators': [100, 200],
+        'max_depth': [10, 15, None],
+        'min_samples_leaf': [1, 2, 5]
+    },
+    'gradient_boosting': {
+        'n_estimators': [100, 200],
+        'learning_rate': [0.05, 0.1, 0.2],
+        'max_depth': [4, 6]
+    },
+    'decision_tree': {
+        'max_depth': [10, 15, 20, None],
+        'min_samples_leaf': [2, 5, 10]
+    }
+}
+SEARCH_MIN_RESOURCES = 1000
+SEARCH_HALVING_FACTOR = 3
+SEARCH_BUDGET_SECONDS = int(os.getenv('SEARCH_BUDGET_SECONDS', 300))
+SEARCH_N_JOBS = int(os.getenv('SEARCH_N_JOBS', os.cpu_count() or 1))
+
+# Catalog sync configuration
+CATALOG_CHANGE_CHANNEL = 'product_changes'
+CATALOG_LISTEN = os.getenv('CATALOG_LISTEN', 'True').lower() == 'true'
+CATALOG_DELTA_INTERVAL = int(os.getenv('CATALOG_DELTA_INTERVAL', 30))
+# Columnar snapshot of the enriched catalog, refreshed after every full reload
+# and used for fast startup or while the database is unreachable
+CATALOG_SNAPSHOT_PATH = os.getenv('CATALOG_SNAPSHOT_PATH', 'data/catalog_snapshot.npz')
+
+# Sharded search: a shard process serves one partition of the catalog snapshot
+# (see shard_search.py), the coordinator sends searches to every shard URL
+SEARCH_SHARD_SNAPSHOT = os.getenv('SEARCH_SHARD_SNAPSHOT')
+SEARCH_SHARD_URLS = [url.strip() for url in os.getenv('SEARCH_SHARD_URLS', '').split(',') if url.strip()]
+SEARCH_SHARD_MANIFEST = os.getenv('SEARCH_SHARD_MANIFEST')
+SEARCH_SHARD_TIMEOUT = float(os.getenv('SEARCH_SHARD_TIMEOUT', 2))
+# Shard processes only score searches, so they neither load nor train models
+# and never write to the model directory they share with the coordinator
+MODEL_SERVING = not SEARCH_SHARD_SNAPSHOT
+
+# Largest page size of /api/products; without a limit every product is returned
+PRODUCTS_MAX_LIMIT = int(os.getenv('PRODUCTS_MAX_LIMIT', 500))
 
-# Database Configuration
-DATABASE_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'database': os.getenv('DB_NAME', 'techcompare_db'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', '1234'),
-    'port': os.getenv('DB_PORT', 5432)
+# Search candidate pre-filtering
+SEARCH_PRICE_TOLERANCE = 0.3
+SEARCH_MAX_PRICE_TOLERANCE = 1.0
+SEARCH_MIN_CANDIDATES = 20
+
+# Labels of the price_range codes from determine_price_range, used as the
+# price_bucket filter and facet values
+PRICE_BUCKETS = {1: 'budget', 2: 'mid_range', 3: 'premium', 4: 'flagship'}
+
+# Common query words that should never be corrected into a brand or model name
+FUZZY_IGNORED_TOKENS = {
+    'phone', 'phones', 'smartphone', 'mobile', 'with', 'and', 'under', 'around', 'for',
+    'camera', 'battery', 'storage', 'ram', 'memory', 'display', 'screen', 'inch', 'inches',
+    'price', 'dollars', 'usd', 'mah', 'internal', 'main', 'good', 'best', 'cheap', 'budget',
+    'flagship', 'pro', 'max', 'plus', 'ultra', 'lite', 'mini', 'bionic', 'snapdragon',
+    'mediatek', 'exynos', 'kirin', 'megapixel', 'lpddr', 'ufs'
+}
+
+# Autocomplete: spec columns offered as suggestions, with the label appended to each value
+SUGGEST_SPEC_LABELS = {
+    'ram': 'RAM',
+    'storage': 'storage',
+    'camera': 'camera',
+    'battery': 'battery',
+    'processor': '',
+    'operating_system': ''
 }
+SUGGEST_DEFAULT_LIMIT = 10
+SUGGEST_MAX_LIMIT = 50
+
+# Weight factors for different specifications when scoring a phone
+SIMILARITY_WEIGHTS = {
+    'brand': 0.25,
+    'ram': 0.20,
+    'storage': 0.15,
+    'camera': 0.15,
+    'battery': 0.10,
+    'display_size': 0.10,
+    'price': 0.05
+}
+TEXT_SIMILARITY_WEIGHT = 0.1
+NUMERIC_SPEC_COLUMNS = {
+    'ram': 'ram_numeric',
+    'storage': 'storage_numeric',
+    'camera': 'camera_numeric',
+    'battery': 'battery_numeric',
+    'display_size': 'display_size_numeric',
+    'price': 'price'
+}
+
+# Batch search
+SEARCH_BATCH_MAX_QUERIES = 10000
+
+# Search result cache
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 1024))
+SEARCH_CACHE_MAX_BYTES = int(os.getenv('SEARCH_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+
+# Request coalescing: concurrent identical catalog reloads, searches and
+# recommendation lookups wait for the call in flight instead of repeating it,
+# for at most these many seconds
+CATALOG_RELOAD_TIMEOUT = float(os.getenv('CATALOG_RELOAD_TIMEOUT', 60))
+COALESCE_TIMEOUT = float(os.getenv('COALESCE_TIMEOUT', 10))
+
+# Opt-in tracemalloc accounting of training and catalog load stages; tracing
+# slows allocations down, so it is off unless enabled here or via the admin API
+MEMORY_PROFILING = os.getenv('MEMORY_PROFILING', 'False').lower() == 'true'
+MEMORY_PROFILING_FRAMES = int(os.getenv('MEMORY_PROFILING_FRAMES', 1))
+MEMORY_SNAPSHOT_KEY_TYPES = ('lineno', 'filename', 'traceback')
+# The /api/admin/memory endpoints expose source locations and can slow the
+# process down, so they answer 404 unless enabled here
+MEMORY_ADMIN_ENDPOINTS = os.getenv('MEMORY_ADMIN_ENDPOINTS', 'False').lower() == 'true'
+
+# Seconds between background health probes of the database, catalog and queues
+HEALTH_PROBE_INTERVAL = float(os.getenv('HEALTH_PROBE_INTERVAL', 5))
+
+# Admission control: (max concurrent, max queued, seconds a request may wait in
+# the queue) per pool of expensive endpoints; cheap endpoints are not limited
+ADMISSION_POOLS = {
+    'search': (int(os.getenv('ADMISSION_SEARCH_CONCURRENCY', 8)), int(os.getenv('ADMISSION_SEARCH_QUEUE', 32)), 2.0),
+    'products': (int(os.getenv('ADMISSION_PRODUCTS_CONCURRENCY', 4)), int(os.getenv('ADMISSION_PRODUCTS_QUEUE', 16)), 2.0),
+    'database': (int(os.getenv('ADMISSION_DATABASE_CONCURRENCY', 8)), int(os.getenv('ADMISSION_DATABASE_QUEUE', 32)), 2.0),
+    # Training gets its own pool and never queues behind another run
+    'training': (1, 0, 0.0)
+}
+
+# Server-side cursor streaming: rows fetched per network round trip, and rows
+# handed to the consumer at a time
+STREAM_ITERSIZE = int(os.getenv('STREAM_ITERSIZE', 2000))
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 2000))
 
 class DatabaseManager:
     """Handle PostgreSQL database operations"""
     
     def __init__(self):
         self.connection = None
+        self.prepared = set()  # statements prepared on the current connection
+        # Request threads share the connection and its prepared statements
+        self.lock = threading.RLock()
     
     def connect(self):
         """Connect to PostgreSQL database"""
         try:
             self.connection = psycopg2.connect(**DATABASE_CONFIG)
+            self.prepared = set()
             logger.info("Database connected successfully")
             return True
         except Exception as e:
@@ -94,6 +281,77 @@ class DatabaseManager:
             if self.connection:
                 self.connection.rollback()
             return None
+    
+    def execute_prepared(self, name, params=()):
+        """Execute a named prepared statement, preparing it on first use per connection"""
+        param_types, statement = PREPARED_STATEMENTS[name]
+        with self.lock:
+            preparing = False
+            try:
+                if not self.connection:
+                    self.connect()
+                
+                cursor = self.connection.cursor(cursor_factory=RealDictCursor)
+                if name not in self.prepared:
+                    preparing = True
+                    types = f"({', '.join(param_types)})" if param_types else ''
+                    cursor.execute(f"PREPARE {name} {types} AS {statement}")
+                    self.prepared.add(name)
+                    preparing = False
+                
+                # Casts let list parameters arrive as typed arrays rather than text[]
+                arguments = f"({', '.join(f'%s::{param_type}' for param_type in param_types)})" if param_types else ''
+                cursor.execute(f"EXECUTE {name} {arguments}", tuple(params))
+                result = cursor.fetchall()
+                cursor.close()
+                return result
+                
+            except Exception as e:
+                logger.error(f"Prepared statement {name} error: {str(e)}")
+                self.recover_prepared(name if preparing else None)
+                return None
+    
+    def recover_prepared(self, failed=None):
+        """Roll back after a failed statement, dropping only a statement whose PREPARE failed"""
+        if not self.connection:
+            return
+        try:
+            self.connection.rollback()
+            if failed:
+                # PREPARE is not transactional, so make sure nothing half done stays behind
+                with self.connection.cursor() as cursor:
+                    cursor.execute("SELECT 1 FROM pg_prepared_statements WHERE name = %s", (failed,))
+                    if cursor.fetchone():
+                        cursor.execute(f"DEALLOCATE {failed}")
+                self.connection.commit()
+        except Exception:
+            # The connection itself is gone; the next call reconnects and prepares afresh
+            self.connection = None
+            self.prepared = set()
+    
+    def stream_query(self, query, params=None, chunk_size=STREAM_CHUNK_SIZE, itersize=STREAM_ITERSIZE, columnar=False):
+        """Yield (columns, rows) chunks from a named server-side cursor, as tuples or column lists"""
+        # The cursor keeps a transaction open for the whole stream, so it gets
+        # its own connection; errors propagate to the consumer
+        connection = psycopg2.connect(**DATABASE_CONFIG)
+        try:
+            with connection.cursor(name=f"stream_{uuid.uuid4().hex}") as cursor:
+                cursor.itersize = itersize
+                cursor.execute(query, params)
+                columns = None
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    if columns is None:
+                        columns = [column.name for column in cursor.description]
+                    if columnar:
+                        yield columns, {name: list(values) for name, values in zip(columns, zip(*rows))}
+                    else:
+                        yield columns, rows
+            connection.rollback()
+        finally:
+            connection.close()
 
 class SpecificationParser:
     """Parse natural language specifications into structured data"""
@@ -128,6 +386,32 @@ class SpecificationParser:
             'price': r'\$(\d+)|price\s*(\d+)|(\d+)\s*dollars?|₹(\d+)|rs\.?\s*(\d+)|(\d+)\s*usd',
             'processor': r'snapdragon\s*(\d+)|mediatek\s*(\d+)|exynos\s*(\d+)|a(\d+)\s*bionic|kirin\s*(\d+)'
         }
+        
+        # Trigram index over brand aliases and catalog model names, attached by
+        # the matcher, used when no brand alias appears verbatim in the text
+        self.fuzzy_index = None
+    
+    def brand_aliases(self):
+        """Map every brand alias to its brand"""
+        return {alias: brand for brand, patterns in self.brand_patterns.items() for alias in patterns}
+    
+    def resolve_brand(self, text):
+        """Resolve misspelled brand or model tokens to the nearest brand"""
+        if self.fuzzy_index is None:
+            return None
+        
+        best = None
+        for token in re.findall(r'[a-z][a-z0-9+]*', text):
+            if len(token) < 3 or token in FUZZY_IGNORED_TOKENS:
+                continue
+            match = self.fuzzy_index.resolve(token)
+            if match and (best is None or match[2] < best[2]):
+                best = match
+        
+        if best:
+            logger.debug(f"Resolved brand '{best[1]}' from fuzzy match on '{best[0]}' (distance {best[2]})")
+            return best[1]
+        return None
     
     def parse_specification(self, text):
         """Parse specification text into structured format"""
@@ -144,6 +428,9 @@ class SpecificationParser:
             if brand_found:
                 break
         
+        if not brand_found:
+            brand_found = self.resolve_brand(text)
+        
         parsed_spec['brand'] = brand_found or 'unknown'
         
         # Extract specifications
@@ -164,12 +451,36 @@ class SpecificationParser:
 class AdvancedMobileSpecificationMatcher:
     def __init__(self):
         self.models = {}
+        self.model = None
         self.best_model_name = None
         self.scaler = None
+        self.scalers = {}
+        self.training_state = None
+        self.brand_popularity_map = None
         self.feature_selector = None
         self.encoders = {}
         self.db_manager = DatabaseManager()
         self.parser = SpecificationParser()
+        self.memory = MemoryProfiler(MEMORY_PROFILING, MEMORY_PROFILING_FRAMES)
+        self.telemetry = TrainingTelemetry()
+        if SEARCH_SHARD_SNAPSHOT:
+            # A shard serves its partition only and never reads the database catalog
+            self.catalog = ProductCatalog(lambda: None, lambda product_ids: None, SEARCH_SHARD_SNAPSHOT)
+        else:
+            self.catalog = ProductCatalog(
+                self.get_products_from_db, self.get_products_by_ids, CATALOG_SNAPSHOT_PATH, CATALOG_RELOAD_TIMEOUT
+            )
+        self.candidate_index = CandidateIndex()
+        self.catalog.register_index(self.candidate_index)
+        self.bitmap_index = BitmapIndex(PRICE_BUCKETS)
+        self.catalog.register_index(self.bitmap_index)
+        self.term_index = FuzzyTermIndex(self.parser.brand_aliases())
+        self.catalog.register_index(self.term_index)
+        self.parser.fuzzy_index = self.term_index
+        self.suggestion_index = None
+        self.change_listener = None
+        self.model_lock = threading.RLock()
+        self.bundle_watcher = None
         
         # Enhanced feature columns
         self.feature_columns = [
@@ -190,89 +501,102 @@ class AdvancedMobileSpecificationMatcher:
         # Connect to database
         self.db_manager.connect()
     
+    def start_catalog_sync(self):
+        """Load the catalog and keep it updated from product change notifications"""
+        if SEARCH_SHARD_SNAPSHOT:
+            # Shards are refreshed by partitioning a new snapshot and restarting
+            self.catalog.load_snapshot()
+            return
+        
+        if self.catalog.loaded_at is None and self.catalog.load_snapshot():
+            # Serve the snapshot right away; the listener reconciles it with a
+            # full database read, or a one-off reload does when not listening
+            if not CATALOG_LISTEN:
+                threading.Thread(target=self.catalog.reload, name='catalog-reconcile', daemon=True).start()
+        else:
+            self.catalog.ensure_loaded()
+        
+        if CATALOG_LISTEN and self.change_listener is None:
+            self.change_listener = CatalogChangeListener(
+                self.catalog, DATABASE_CONFIG, CATALOG_CHANGE_CHANNEL,
+                CATALOG_DELTA_INTERVAL
+            )
+            self.change_listener.start()
+    
     def get_products_from_db(self):
         """Fetch products with specifications from PostgreSQL database"""
         try:
-            query = """
-            SELECT 
-                p.id,
-                p.name as model,
-                p.brand,
-                p.price,
-                p.rating,
-                p.reviews,
-                p.description,
-                p.image_url,
-                ps.display_size,
-                ps.processor,
-                ps.ram,
-                ps.storage,
-                ps.camera,
-                ps.battery,
-                ps.operating_system,
-                ARRAY_AGG(pf.feature_name) as features
-            FROM products p
-            LEFT JOIN product_specs ps ON p.id = ps.product_id
-            LEFT JOIN product_features pf ON p.id = pf.product_id
-            GROUP BY p.id, ps.id
-            ORDER BY p.created_at DESC
-            """
+            # Rows are enriched chunk by chunk straight into the columnar table
+            # instead of materializing the whole joined result first
+            products = ProductTable()
+            with self.training_stage('get_products_from_db'):
+                for columns, rows in self.db_manager.stream_query(PRODUCTS_QUERY):
+                    for row in rows:
+                        products.append(self.build_product(dict(zip(columns, row))))
             
-            results = self.db_manager.execute_query(query)
-            
-            if results:
-                products = []
-                for row in results:
-                    # Extract numeric values from specifications
-                    display_size_numeric = self.extract_numeric_value(row['display_size'], 6.0)
-                    ram_numeric = self.extract_numeric_value(row['ram'], 4)
-                    storage_numeric = self.extract_numeric_value(row['storage'], 64)
-                    camera_numeric = self.extract_numeric_value(row['camera'], 12)
-                    battery_numeric = self.extract_numeric_value(row['battery'], 3000)
-                    
-                    # Enhanced features
-                    processor_score = self.calculate_processor_score(row['processor'])
-                    price_range = self.determine_price_range(row['price']) if row['price'] else 2
-                    reviews_count_log = np.log1p(row['reviews'] or 0)
-                    
-                    product = {
-                        'id': str(row['id']),
-                        'brand': row['brand'].lower() if row['brand'] else 'unknown',
-                        'model': row['model'],
-                        'price': float(row['price']) if row['price'] else 0.0,
-                        'rating': float(row['rating']) if row['rating'] else 0.0,
-                        'reviews': row['reviews'] or 0,
-                        'description': row['description'] or '',
-                        'image_url': row['image_url'] or '',
-                        'display_size': row['display_size'] or '',
-                        'display_size_numeric': display_size_numeric,
-                        'processor': row['processor'] or '',
-                        'processor_score': processor_score,
-                        'ram': row['ram'] or '',
-                        'ram_numeric': ram_numeric,
-                        'storage': row['storage'] or '',
-                        'storage_numeric': storage_numeric,
-                        'camera': row['camera'] or '',
-                        'camera_numeric': camera_numeric,
-                        'battery': row['battery'] or '',
-                        'battery_numeric': battery_numeric,
-                        'operating_system': row['operating_system'] or '',
-                        'price_range': price_range,
-                        'reviews_count_log': reviews_count_log,
-                        'features': [f for f in (row['features'] or []) if f is not None],
-                        'specifications': f"{row['brand']} {row['model']} with {row['display_size']} {row['ram']} {row['storage']} {row['camera']} {row['battery']}"
-                    }
-                    products.append(product)
-                
+            if products:
                 logger.info(f"Loaded {len(products)} products from database")
                 return products
             else:
                 logger.warning("No products found in database")
-                return []
+                return ProductTable()
                 
         except Exception as e:
             logger.error(f"Error fetching products from database: {str(e)}")
-            return []
+            return ProductTable()
+    
+    def get_products_by_ids(self, product_ids):
+        """Fetch the given products, returning None when the query fails"""
+        try:
+            results = self.db_manager.execute_prepared('products_by_ids', (list(product_ids),))
+            if results is None:
+                return None
+            return ProductTable.from_products(self.build_product(row) for row in results)
+        except Exception as e:
+            logger.error(f"Error fetching changed products: {str(e)}")
+            return None
+    
+    def build_product(self, row):
+        """Build an enriched product record from a joined database row"""
+        # Extract numeric values from specifications
+        display_size_numeric = self.extract_numeric_value(row['display_size'], 6.0)
+        ram_numeric = self.extract_numeric_value(row['ram'], 4)
+        storage_numeric = self.extract_numeric_value(row['storage'], 64)
+        camera_numeric = self.extract_numeric_value(row['camera'], 12)
+        battery_numeric = self.extract_numeric_value(row['battery'], 3000)
+        
+        # Enhanced features
+        processor_score = self.calculate_processor_score(row['processor'])
+        price_range = self.determine_price_range(row['price']) if row['price'] else 2
+        reviews_count_log = np.log1p(row['reviews'] or 0)
+        
+        return {
+            'id': str(row['id']),
+            'brand': row['brand'].lower() if row['brand'] else 'unknown',
+            'model': row['model'],
+            'price': float(row['price']) if row['price'] else 0.0,
+            'rating': float(row['rating']) if row['rating'] else 0.0,
+            'reviews': row['reviews'] or 0,
+            'description': row['description'] or '',
+            'image_url': row['image_url'] or '',
+            'display_size': row['display_size'] or '',
+            'display_size_numeric': display_size_numeric,
+            'processor': row['processor'] or '',
+            'processor_score': processor_score,
+            'ram': row['ram'] or '',
+            'ram_numeric': ram_numeric,
+            'storage': row['storage'] or '',
+            'storage_numeric': storage_numeric,
+            'camera': row['camera'] or '',
+            'camera_numeric': camera_numeric,
+            'battery': row['battery'] or '',
+            'battery_numeric': battery_numeric,
+            'operating_system': row['operating_system'] or '',
+            'price_range': price_range,
+            'reviews_count_log': reviews_count_log,
+            'features': [f for f in (row['features'] or []) if f is not None],
+            'specifications': f"{row['brand']} {row['model']} with {row['display_size']} {row['ram']} {row['storage']} {row['camera']} {row['battery']}"
+        }
     
     def calculate_processor_score(self, processor_text):
         """Calculate processor performance score based on processor name"""
@@ -325,15 +649,32 @@ class AdvancedMobileSpecificationMatcher:
         
         return 50  # Default score
     
-    def generate_synthetic_data(self, base_products, target_count=25000):
+    def generate_synthetic_data(self, base_products, target_count=25000, seed=SYNTHETIC_SEED):
         """Generate synthetic data to reach minimum training samples"""
         if len(base_products) >= target_count:
             return base_products
         
+        if not isinstance(base_products, ProductTable):
+            base_products = ProductTable.from_products(base_products)
+        base_products = base_products.compact()
+        
+        rng = np.random.RandomState(seed)
+        
         logger.info(f"Generating synthetic data to reach {target_count} samples from {len(base_products)} base products")
         
-        synthetic_products = []
         needed_samples = target_count - len(base_products)
+        synthetic = self.synthesize_products(base_products, 0, needed_samples, rng)
+        
+        all_products = base_products.concat(synthetic)
+        logger.info(f"Generated {needed_samples} synthetic products. Total: {len(all_products)}")
+        
+        return all_products
+    
+    def synthesize_products(self, base_products, start, count, rng):
+        """Synthetic products start to start + count, cycling through the compacted base rows"""
+        synthetic = base_products.take(np.arange(start, start + count) % len(base_products))
+        synthetic.objects['id'] = np.array([f"synthetic_{i}" for i in range(start, start + count)], dtype=object)
+        numeric = synthetic.numeric
         
         # Define realistic ranges for each specification
         spec_ranges = {
@@ -345,70 +686,56 @@ class AdvancedMobileSpecificationMatcher:
             'processor_score': list(range(30, 101, 5))
         }
         
-        brands = list(self.parser.brand_patterns.keys())
+        # Randomly select from realistic ranges instead of adding noise:
+        # 70% chance to keep original, 30% chance to change
+        for spec, possible_values in spec_ranges.items():
+            changed = rng.random_sample(count) < 0.3
+            numeric[spec][changed] = rng.choice(possible_values, size=int(changed.sum()))
+        
+        # Adjust price based on specifications
+        price_factors = {
+            'ram_numeric': 10,
+            'storage_numeric': 0.5,
+            'camera_numeric': 5,
+            'processor_score': 8,
+            'battery_numeric': 0.05
+        }
         
-        for i in range(needed_samples):
-            # Select a base product to modify
-            base_product = base_products[i % len(base_products)].copy()
-            
-            # Add some variation to create synthetic sample
-            noise_factor = 0.15  # 15% variation
-            
-            synthetic_product = base_product.copy()
-            synthetic_product['id'] = f"synthetic_{i}"
-            
-            # Randomly select from realistic ranges instead of adding noise
-            for spec, possible_values in spec_ranges.items():
-                if spec in synthetic_product:
-                    # 70% chance to keep original, 30% chance to change
-                    if np.random.random() < 0.3:
-                        synthetic_product[spec] = np.random.choice(possible_values)
-            
-            # Adjust price based on specifications
-            price_factors = {
-                'ram_numeric': 10,
-                'storage_numeric': 0.5,
-                'camera_numeric': 5,
-                'processor_score': 8,
-                'battery_numeric': 0.05
-            }
-            
-            base_price = 200  # Base price
-            for spec, factor in price_factors.items():
-                if spec in synthetic_product:
-                    base_price += synthetic_product[spec] * factor
-            
-            # Add brand premium
-            brand_premiums = {
-                'apple': 200, 'samsung': 100, 'google': 50, 
-                'oneplus': 30, 'sony': 80, 'lg': 20
-            }
-            
-            brand_premium = brand_premiums.get(synthetic_product['brand'], 0)
-            synthetic_product['price'] = base_price + brand_premium + np.random.normal(0, 50)
-            synthetic_product['price'] = max(100, synthetic_product['price'])  # Minimum price
-            
-            # Recalculate price range
-            synthetic_product['price_range'] = self.determine_price_range(synthetic_product['price'])
-            
-            # Generate realistic rating and reviews
-            synthetic_product['rating'] = np.clip(np.random.normal(4.0, 0.5), 1.0, 5.0)
-            synthetic_product['reviews'] = max(0, int(np.random.exponential(100)))
-            synthetic_product['reviews_count_log'] = np.log1p(synthetic_product['reviews'])
-            
-            synthetic_products.append(synthetic_product)
+        base_price = np.full(count, 200.0)  # Base price
+        for spec, factor in price_factors.items():
+            base_price += numeric[spec].astype(float) * factor
         
-        all_products = base_products + synthetic_products
-        logger.info(f"Generated {len(synthetic_products)} synthetic products. Total: {len(all_products)}")
+        # Add brand premium
+        brand_premiums = {
+            'apple': 200, 'samsung': 100, 'google': 50, 
+            'oneplus': 30, 'sony': 80, 'lg': 20
+        }
         
-        return all_products
+        premium_by_code = np.array([brand_premiums.get(brand, 0) for brand in synthetic.dictionaries['brand'].values], dtype=float)
+        brand_premium = premium_by_code[synthetic.categorical['brand']]
+        price = base_price + brand_premium + rng.normal(0, 50, count)
+        numeric['price'] = np.maximum(100, price)  # Minimum price
+        
+        # Recalculate price range
+        numeric['price_range'] = (np.digitize(numeric['price'], [300, 700, 1000]) + 1).astype(np.int8)
+        
+        # Generate realistic rating and reviews
+        numeric['rating'] = np.clip(rng.normal(4.0, 0.5, count), 1.0, 5.0)
+        numeric['reviews'] = np.maximum(0, rng.exponential(100, count).astype(np.int64))
+        numeric['reviews_count_log'] = np.log1p(numeric['reviews'])
+        
+        return synthetic
     
-    def calculate_brand_popularity(self, products_df):
-        """Calculate brand popularity score based on number of products"""
-        brand_counts = products_df['brand'].value_counts()
-        max_count = brand_counts.max()
-        brand_popularity_map = (brand_counts / max_count * 100).to_dict()
-        return products_df['brand'].map(brand_popularity_map).fillna(10)  # Default popularity
+    def calculate_brand_popularity(self, phones):
+        """Calculate brand popularity based on number of products"""
+        if not isinstance(phones, ProductTable):
+            phones = ProductTable.from_products(phones)
+        brand_codes = phones.categorical['brand'][phones.alive_rows()]
+        brand_values = np.array(phones.dictionaries['brand'].values, dtype=object)
+        brand_counts = np.bincount(brand_codes, minlength=len(brand_values))
+        max_count = max(brand_counts.max(initial=0), 1)
+        present = brand_counts > 0
+        return dict(zip(brand_values[present], brand_counts[present] / max_count * 100))
     
     def extract_numeric_value(self, text, default=0):
         """Extract numeric value from text (e.g., '8GB' -> 8, '6.1 inches' -> 6.1)"""
@@ -433,59 +760,88 @@ class AdvancedMobileSpecificationMatcher:
         else:
             return 4  # Flagship
     
-    def preprocess_features(self, phones):
+    def preprocess_features(self, phones, brand_popularity_map=None, encoders=None):
         """Enhanced preprocessing with feature engineering"""
-        df = pd.DataFrame(phones)
+        encoders = self.encoders if encoders is None else encoders
+        if not isinstance(phones, ProductTable):
+            phones = ProductTable.from_products(phones)
+        rows = phones.alive_rows()
+        
+        # Work on the brand dictionary once instead of once per row
+        brand_codes = phones.categorical['brand'][rows]
+        brand_values = pd.Series(phones.dictionaries['brand'].values, dtype=object)
         
-        # Calculate brand popularity
-        df['brand_popularity'] = self.calculate_brand_popularity(df)
+        # Calculate brand popularity, reusing a stored map for partial batches
+        if brand_popularity_map is None:
+            brand_popularity_map = self.calculate_brand_popularity(phones)
+        popularity_by_code = brand_values.map(brand_popularity_map).fillna(10).to_numpy()  # Default popularity
         
         # Encode categorical variables
-        if 'brand' not in self.encoders:
-            self.encoders['brand'] = LabelEncoder()
-            unique_brands = df['brand'].unique()
-            self.encoders['brand'].fit(unique_brands)
+        if 'brand' not in encoders:
+            encoders['brand'] = LabelEncoder()
+            unique_brands = brand_values.iloc[np.unique(brand_codes)]
+            encoders['brand'].fit(unique_brands)
         
-        # Handle unseen brands
-        df['brand'] = df['brand'].apply(
-            lambda x: x if x in self.encoders['brand'].classes_ else 'unknown'
-        )
+        if 'unknown' not in encoders['brand'].classes_:
+            encoders['brand'].classes_ = np.append(encoders['brand'].classes_, 'unknown')
         
-        if 'unknown' not in self.encoders['brand'].classes_:
-            self.encoders['brand'].classes_ = np.append(self.encoders['brand'].classes_, 'unknown')
+        # Handle unseen brands
+        known_brands = brand_values.where(brand_values.isin(encoders['brand'].classes_), 'unknown')
+        encoded_by_code = encoders['brand'].transform(known_brands) if len(known_brands) else np.array([], dtype=int)
         
-        df['brand_encoded'] = self.encoders['brand'].transform(df['brand'])
+        columns = {name: phones.numeric[name][rows].astype(float) for name in self.feature_columns if name in phones.numeric}
+        columns['brand_encoded'] = encoded_by_code[brand_codes]
+        columns['brand_popularity'] = popularity_by_code[brand_codes]
         
         # Select and return features
-        feature_df = df[self.feature_columns].fillna(0)
+        feature_df = pd.DataFrame(columns, columns=self.feature_columns).fillna(0)
         
         # Handle infinite values
         feature_df = feature_df.replace([np.inf, -np.inf], 0)
         
         return feature_df
     
-    def train_multiple_models(self):
+    @contextmanager
+    def training_stage(self, stage, model_name=None):
+        """Time a training stage and, when memory profiling is on, account its memory"""
+        memory_name = f'{stage}:{model_name}' if model_name else stage
+        with self.memory.stage(memory_name), self.telemetry.stage(stage, model_name) as record:
+            yield record
+    
+    def finish_telemetry(self):
+        """Close the run's stage timings and append them to the history of past runs"""
+        telemetry = self.telemetry.end_run()
+        history = list(self.model_info.get('telemetry_history') or [])
+        if telemetry:
+            history = (history + [history_entry(telemetry)])[-TRAINING_TELEMETRY_HISTORY:]
+        return {'telemetry': telemetry, 'telemetry_history': history}
+    
+    def close_failed_run(self):
+        """Close a run that returned or raised before finishing, keeping its timings as the last failure"""
+        telemetry = self.telemetry.end_run()
+        if telemetry:
+            last_stage = telemetry['stages'][-1]['stage'] if telemetry['stages'] else None
+            logger.warning(f"{telemetry['mode']} training failed after {telemetry['total_seconds']}s (last stage: {last_stage})")
+            self.model_info['last_failed_run'] = telemetry
+    
+    def train_multiple_models(self, search=False, base_products=None):
         """Train multiple ML models and select the best one"""
         try:
             logger.info("Training multiple models for specification matching...")
+            self.memory.begin_run()
+            self.telemetry.begin_run('full')
             
-            # Get products from database
-            base_products = self.get_products_from_db()
+            # Get products from database unless the caller supplies them
+            if base_products is None:
+                base_products = self.get_products_from_db()
             if not base_products:
                 logger.error("No training data available from database")
                 return False
             
-            # Generate synthetic data if needed
-            all_products = self.generate_synthetic_data(base_products, MIN_TRAINING_SAMPLES)
-            
-            # Prepare training data
-            X = self.preprocess_features(all_products)
-            y = np.array([phone.get('price', 0) for phone in all_products])
-            
-            # Remove products with no price data
-            valid_indices = y > 0
-            X = X[valid_indices]
-            y = y[valid_indices]
+            # Synthetic data, features and split, reused from cache when unchanged
+            training_data = self.prepare_training_data(base_products)
+            X, y, row_ids = training_data['X'], training_data['y'], training_data['row_ids']
+            train_rows, test_rows = training_data['train_rows'], training_data['test_rows']
             
             if len(X) < 1000:  # Minimum viable dataset
                 logger.error(f"Insufficient training data: {len(X)} samples")
@@ -493,11 +849,8 @@ class AdvancedMobileSpecificationMatcher:
             
             logger.info(f"Training with {len(X)} samples")
             
-            # Split data with stratification on price ranges
-            price_ranges = [self.determine_price_range(price) for price in y]
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42, stratify=price_ranges
-            )
+            X_train, X_test = X[train_rows], X[test_rows]
+            y_train, y_test = y[train_rows], y[test_rows]
             
             # Feature scaling with multiple scalers
             scalers = {
@@ -507,7 +860,7 @@ class AdvancedMobileSpecificationMatcher:
             }
             
             # Feature selection
-            self.feature_selector = SelectKBest(score_func=f_regression, k=min(10, X_train.shape[1]))
+            feature_selector = SelectKBest(score_func=f_regression, k=min(10, X_train.shape[1]))
             
             # Define models with hyperparameters
             models_config = {
@@ -554,6 +907,14 @@ class AdvancedMobileSpecificationMatcher:
                 }
             }
             
+            # Optionally tune hyperparameters before the final fits
+            search_info = None
+            if search:
+                with self.training_stage('hyperparameter_search'):
+                    selected_params, search_info = self.search_hyperparameters(models_config, X_train, y_train)
+                for model_name, params in selected_params.items():
+                    models_config[model_name]['model'].set_params(**params)
+            
             # Train and evaluate models
             model_results = {}
             
@@ -562,25 +923,31 @@ class AdvancedMobileSpecificationMatcher:
                     logger.info(f"Training {model_name}...")
                     
                     # Select scaler
-                    scaler = scalers[config['scaler']]
-                    X_train_scaled = scaler.fit_transform(X_train)
-                    X_test_scaled = scaler.transform(X_test)
+                    with self.training_stage('scale', model_name):
+                        scaler = scalers[config['scaler']]
+                        X_train_scaled = scaler.fit_transform(X_train)
+                        X_test_scaled = scaler.transform(X_test)
                     
                     # Feature selection for linear models
                     if model_name in ['linear_regression', 'ridge', 'lasso']:
-                        X_train_selected = self.feature_selector.fit_transform(X_train_scaled, y_train)
-                        X_test_selected = self.feature_selector.transform(X_test_scaled)
+                        with self.training_stage('select_features', model_name):
+                            X_train_selected = feature_selector.fit_transform(X_train_scaled, y_train)
+                            X_test_selected = feature_selector.transform(X_test_scaled)
                     else:
                         X_train_selected = X_train_scaled
                         X_test_selected = X_test_scaled
                     
                     # Train model
                     model = config['model']
-                    model.fit(X_train_selected, y_train)
+                    with self.training_stage('fit', model_name) as record:
+                        model.fit(X_train_selected, y_train)
+                        record['samples'] = len(X_train_selected)
                     
                     # Predictions
-                    y_pred_train = model.predict(X_train_selected)
-                    y_pred_test = model.predict(X_test_selected)
+                    with self.training_stage('predict', model_name) as record:
+                        y_pred_train = model.predict(X_train_selected)
+                        y_pred_test = model.predict(X_test_selected)
+                        record['samples'] = len(X_train_selected) + len(X_test_selected)
                     
                     # Evaluation metrics
                     train_r2 = r2_score(y_train, y_pred_train)
@@ -594,7 +961,20 @@ class AdvancedMobileSpecificationMatcher:
                     test_mape = np.mean(np.abs((y_test - y_pred_test) / y_test)) * 100
                     
                     # Cross-validation score
-                    cv_scores = cross_val_score(model, X_train_selected, y_train, cv=5, scoring='r2')
+                    with self.training_stage('cross_validate', model_name) as record:
+                        cv_results = cross_validate(model, X_train_selected, y_train, cv=5, scoring='r2')
+                        cv_scores = cv_results['test_score']
+                        record['folds'] = [
+                            {
+                                'fold': fold,
+                                'fit_seconds': round(float(fit_time), 4),
+                                'score_seconds': round(float(score_time), 4),
+                                'r2': float(score)
+                            }
+                            for fold, (fit_time, score_time, score) in enumerate(
+                                zip(cv_results['fit_time'], cv_results['score_time'], cv_scores)
+                            )
+                        ]
                     
                     # Calculate composite score (higher is better)
                     composite_score = (
@@ -633,13 +1013,41 @@ class AdvancedMobileSpecificationMatcher:
             best_model_name = max(model_results.keys(), key=lambda k: model_results[k]['composite_score'])
             best_result = model_results[best_model_name]
             
-            self.best_model_name = best_model_name
-            self.models = {name: result['model'] for name, result in model_results.items()}
-            self.scaler = best_result['scaler']
+            # Keep the feature matrix so later incremental runs only train on changes
+            test_mask = np.zeros(len(X), dtype=bool)
+            test_mask[test_rows] = True
+            real_rows = ~np.char.startswith(row_ids.astype(str), 'synthetic_')
+            X_values = np.array(X, dtype=float)
+            training_state = {
+                'X': X_values,
+                'y': np.array(y, dtype=float),
+                'row_ids': row_ids.astype(str),
+                'test_mask': test_mask,
+                'brand_popularity': training_data['brand_popularity'],
+                'real_mean': X_values[real_rows].mean(axis=0),
+                'real_std': X_values[real_rows].std(axis=0),
+                'real_price_mean': float(y[real_rows].mean()),
+                'real_price_std': float(y[real_rows].std()),
+                'incremental_updates': 0
+            }
+            
+            # Swap in the models with the preprocessing they were trained with
+            with self.model_lock:
+                self.best_model_name = best_model_name
+                self.models = {name: result['model'] for name, result in model_results.items()}
+                self.model = best_result['model']
+                self.scaler = best_result['scaler']
+                self.scalers = {name: result['scaler'] for name, result in model_results.items()}
+                self.feature_selector = feature_selector
+                self.encoders = training_data['encoders']
+                self.brand_popularity_map = training_data['brand_popularity']
+                self.training_state = training_state
             
             # Store performance metrics
+            self.model_info.update(self.finish_telemetry())
             self.model_info.update({
                 'trained_at': datetime.now().isoformat(),
+                'training_mode': 'full',
                 'best_model': best_model_name,
                 'models_performance': {
                     name: {
@@ -652,8 +1060,12 @@ class AdvancedMobileSpecificationMatcher:
                     for name, result in model_results.items()
                 },
                 'training_samples': len(X),
+                'incremental': None,
+                'hyperparameter_search': search_info,
                 'original_samples': len(base_products),
-                'synthetic_samples': len(all_products) - len(base_products)
+                'synthetic_samples': training_data['synthetic_samples'],
+                'training_cache': {'key': training_data['cache_key'], 'hit': training_data['cache_hit']},
+                'memory': self.memory.run_stages() if self.memory.enabled else None
             })
             
             # Feature importance for tree-based models
@@ -675,34 +1087,807 @@ class AdvancedMobileSpecificationMatcher:
         except Exception as e:
             logger.error(f"Training error: {str(e)}")
             return False
+        finally:
+            # Finished runs closed their telemetry already
+            self.close_failed_run()
+    
+    def training_cache_key(self, base_products):
+        """Hash the catalog contents with everything else that shapes the training matrix"""
+        digest = hashlib.sha256()
+        digest.update(json.dumps({
+            'feature_code_version': FEATURE_CODE_VERSION,
+            'seed': SYNTHETIC_SEED,
+            'target_count': MIN_TRAINING_SAMPLES,
+            'feature_columns': self.feature_columns
+        }, sort_keys=True).encode())
+        for product in sorted(base_products.rows(), key=lambda p: p['id']):
+            digest.update(json.dumps(product.to_dict(), sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+    
+    def prepare_training_data(self, base_products):
+        """Build X/y and the train/test split, or memory-map them from the on-disk cache"""
+        with self.training_stage('training_cache_key'):
+            cache_key = self.training_cache_key(base_products)
+        cache_dir = os.path.join(TRAINING_CACHE_DIR, cache_key)
+        
+        if os.path.exists(os.path.join(cache_dir, 'meta.json')):
+            try:
+                with self.training_stage('load_training_cache'):
+                    with open(os.path.join(cache_dir, 'meta.json'), 'r') as f:
+                        meta = json.load(f)
+                    arrays = {
+                        name: np.load(os.path.join(cache_dir, f'{name}.npy'), mmap_mode='r')
+                        for name in ['X', 'y', 'row_ids', 'train_rows', 'test_rows']
+                    }
+                    encoders = joblib.load(os.path.join(cache_dir, 'encoders.joblib'))
+                os.utime(cache_dir)  # keeps recently used entries from eviction
+                logger.info(f"Loaded preprocessed training matrix from cache {cache_key[:12]}")
+                return dict(
+                    arrays, encoders={'brand': encoders['brand']}, brand_popularity=encoders['brand_popularity'],
+                    synthetic_samples=meta['synthetic_samples'], cache_key=cache_key, cache_hit=True
+                )
+            except Exception as e:
+                logger.error(f"Error reading training cache {cache_key[:12]}: {str(e)}")
+                # Drop the broken entry so the rebuilt matrix can take its place
+                shutil.rmtree(cache_dir, ignore_errors=True)
+        
+        # Generate synthetic data if needed
+        with self.training_stage('generate_synthetic_data'):
+            all_products = self.generate_synthetic_data(base_products, MIN_TRAINING_SAMPLES)
+        
+        # Prepare training data
+        # The brand encoder is fitted on this catalog alone, so the matrix only
+        # depends on what the cache key covers; the caller swaps it in with the models
+        encoders = {}
+        with self.training_stage('preprocess_features'):
+            brand_popularity_map = self.calculate_brand_popularity(all_products)
+            X = self.preprocess_features(all_products, brand_popularity_map, encoders).to_numpy(dtype=float)
+        y = all_products.column('price').astype(float)
+        row_ids = all_products.column('id').astype(str)
+        
+        # Remove products with no price data
+        valid_indices = y > 0
+        X, y, row_ids = X[valid_indices], y[valid_indices], row_ids[valid_indices]
+        
+        # Split data with stratification on price ranges
+        train_rows, test_rows = np.arange(len(X)), np.array([], dtype=int)
+        if len(X) >= 1000:
+            with self.training_stage('split'):
+                price_ranges = [self.determine_price_range(price) for price in y]
+                train_rows, test_rows = train_test_split(
+                    np.arange(len(X)), test_size=0.2, random_state=42, stratify=price_ranges
+                )
+        
+        training_data = {
+            'X': X,
+            'y': y,
+            'row_ids': row_ids,
+            'train_rows': train_rows,
+            'test_rows': test_rows
+        }
+        synthetic_samples = len(all_products) - len(base_products)
+        
+        # Write to a temporary directory and rename so readers never see partial files
+        try:
+            tmp_dir = f"{cache_dir}.{uuid.uuid4().hex}.tmp"
+            os.makedirs(tmp_dir, exist_ok=True)
+            for name, array in training_data.items():
+                np.save(os.path.join(tmp_dir, f'{name}.npy'), array)
+            joblib.dump({
+                'brand': encoders['brand'],
+                'brand_popularity': brand_popularity_map
+            }, os.path.join(tmp_dir, 'encoders.joblib'))
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+                json.dump({
+                    'created_at': datetime.now().isoformat(),
+                    'feature_code_version': FEATURE_CODE_VERSION,
+                    'seed': SYNTHETIC_SEED,
+                    'samples': len(X),
+                    'synthetic_samples': synthetic_samples
+                }, f, indent=2)
+            if os.path.exists(cache_dir):
+                shutil.rmtree(tmp_dir)
+            else:
+                os.rename(tmp_dir, cache_dir)
+            self.evict_training_cache()
+        except Exception as e:
+            logger.error(f"Error writing training cache: {str(e)}")
+        
+        return dict(
+            training_data, encoders=encoders, brand_popularity=brand_popularity_map,
+            synthetic_samples=synthetic_samples, cache_key=cache_key, cache_hit=False
+        )
+    
+    def evict_training_cache(self, keep=TRAINING_CACHE_KEEP):
+        """Remove all but the newest keep cached training matrices"""
+        entries = [
+            os.path.join(TRAINING_CACHE_DIR, name) for name in os.listdir(TRAINING_CACHE_DIR)
+            if not name.endswith('.tmp')
+        ]
+        entries.sort(key=os.path.getmtime, reverse=True)
+        for path in entries[keep:]:
+            shutil.rmtree(path, ignore_errors=True)
+            logger.info(f"Evicted training cache {os.path.basename(path)[:12]}")
+    
+    def search_hyperparameters(self, models_config, X_train, y_train):
+        """Pick hyperparameters per model family with budgeted successive halving"""
+        started = time.monotonic()
+        deadline = started + SEARCH_BUDGET_SECONDS
+        X_train = np.asarray(X_train, dtype=float)
+        y_train = np.asarray(y_train, dtype=float)
+        
+        # Hold out part of the training split for scoring the candidates
+        X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=0.2, random_state=42)
+        sample_order = np.random.default_rng(42).permutation(len(X_fit))
+        
+        scaler_types = {'standard': StandardScaler, 'minmax': MinMaxScaler, 'robust': RobustScaler}
+        candidates = []
+        for model_name, space in HYPERPARAMETER_SPACE.items():
+            if model_name not in models_config:
+                continue
+            for params in ParameterGrid(space):
+                steps = [('scaler', scaler_types[models_config[model_name]['scaler']]())]
+                if model_name in ['linear_regression', 'ridge', 'lasso']:
+                    steps.append(('select', SelectKBest(score_func=f_regression, k=min(10, X_train.shape[1]))))
+                steps.append(('model', clone(models_config[model_name]['model']).set_params(**params)))
+                candidates.append({'model': model_name, 'params': params, 'pipeline': Pipeline(steps), 'score': None})
+        
+        trace = []
+        survivors = candidates
+        n_samples = min(SEARCH_MIN_RESOURCES, len(X_fit))
+        budget_exhausted = False
+        logger.info(f"Hyperparameter search over {len(candidates)} configurations, budget {SEARCH_BUDGET_SECONDS}s")
+        
+        # Worker processes rather than threads, so fits still running at the
+        # deadline can be killed instead of competing with serving for CPU;
+        # loky workers do not re-import the API module the way spawn does
+        executor = ProcessPoolExecutor(
+            max_workers=SEARCH_N_JOBS, initializer=search_worker.init_worker,
+            initargs=(X_fit, y_fit, X_val, y_val, sample_order)
+        )
+        try:
+            while survivors:
+                # No more submitted than there are workers, so nothing sits in the
+                # executor's queue when it is killed at the deadline
+                queued = iter(survivors)
+                futures, pending = {}, set()
+                rung = {'rung': len(trace), 'n_samples': int(n_samples), 'candidates': []}
+                
+                while True:
+                    for candidate in itertools.islice(queued, SEARCH_N_JOBS - len(pending)):
+                        future = executor.submit(search_worker.evaluate, candidate['pipeline'], n_samples)
+                        futures[future] = candidate
+                        pending.add(future)
+                    if not pending:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        candidate = futures[future]
+                        try:
+                            score, fit_time = future.result()
+                        except Exception as e:
+                            logger.error(f"Search candidate {candidate['model']} {candidate['params']} failed: {str(e)}")
+                            score, fit_time = float('-inf'), None
+                        candidate['score'], candidate['n_samples'] = score, n_samples
+                        rung['candidates'].append({
+                            'model': candidate['model'],
+                            'params': candidate['params'],
+                            'score': score if np.isfinite(score) else None,
+                            'fit_time': fit_time
+                        })
+                
+                trace.append(rung)
+                if pending:
+                    # Out of time: unfinished fits are killed below, keep the scores we have
+                    budget_exhausted = True
+                    break
+                
+                if n_samples >= len(X_fit):
+                    break
+                
+                # Keep the best 1/factor of each family, at least one per family
+                next_survivors = []
+                for model_name in {candidate['model'] for candidate in survivors}:
+                    family = sorted(
+                        (c for c in survivors if c['model'] == model_name),
+                        key=lambda c: c['score'], reverse=True
+                    )
+                    if len(family) > 1:
+                        next_survivors.extend(family[:max(1, len(family) // SEARCH_HALVING_FACTOR)])
+                if not next_survivors:
+                    break
+                survivors = next_survivors
+                n_samples = min(n_samples * SEARCH_HALVING_FACTOR, len(X_fit))
+        finally:
+            # Kill fits still running past the deadline along with the idle workers
+            executor.shutdown(wait=False, kill_workers=True)
+        
+        # Scores on different numbers of rows are not comparable, so the best
+        # of each family is taken from the furthest rung it reached
+        selected = {}
+        for candidate in candidates:
+            if candidate['score'] is None or not np.isfinite(candidate['score']):
+                continue
+            best = selected.get(candidate['model'])
+            if best is None or (candidate['n_samples'], candidate['score']) > (best['n_samples'], best['score']):
+                selected[candidate['model']] = candidate
+        
+        search_info = {
+            'method': 'successive_halving',
+            'budget_seconds': SEARCH_BUDGET_SECONDS,
+            'elapsed_seconds': time.monotonic() - started,
+            'budget_exhausted': budget_exhausted,
+            'halving_factor': SEARCH_HALVING_FACTOR,
+            'configurations': len(candidates),
+            'selected': {
+                name: {'params': candidate['params'], 'validation_r2': candidate['score']}
+                for name, candidate in selected.items()
+            },
+            'trace': trace
+        }
+        logger.info(f"Hyperparameter search finished in {search_info['elapsed_seconds']:.1f}s"
+                    f"{' (budget exhausted)' if budget_exhausted else ''}")
+        
+        return {name: candidate['params'] for name, candidate in selected.items()}, search_info
+    
+    def iter_training_chunks(self, base_products, bounds, brand_popularity_map, encoders, seed=SYNTHETIC_SEED):
+        """Yield (chunk, X, y, holdout) for each chunk of real and synthetic rows, the same on every pass"""
+        for chunk, (real_start, real_stop, synthetic_start, synthetic_stop) in enumerate(bounds):
+            # Seeded per chunk so every pass regenerates exactly the same rows
+            rng = np.random.RandomState([seed, chunk])
+            synthetic = self.synthesize_products(base_products, synthetic_start, synthetic_stop - synthetic_start, rng)
+            products = base_products.take(np.arange(real_start, real_stop)).concat(synthetic)
+            
+            X = self.preprocess_features(products, brand_popularity_map, encoders).to_numpy(dtype=float)
+            y = products.column('price').astype(float)
+            holdout = holdout_mask(len(y), STREAM_TRAINING_HOLDOUT, seed, chunk)
+            
+            # Remove products with no price data
+            priced = y > 0
+            yield chunk, X[priced], y[priced], holdout[priced]
+    
+    def train_streaming(self, base_products=None, target_count=STREAM_TRAINING_SAMPLES,
+                        chunk_size=STREAM_TRAINING_CHUNK_SIZE, epochs=STREAM_TRAINING_EPOCHS):
+        """Train incremental models out of core, one chunk of rows in memory at a time"""
+        try:
+            logger.info(f"Streaming training on {target_count} samples in chunks of {chunk_size}...")
+            self.memory.begin_run()
+            self.telemetry.begin_run('streaming')
+            
+            # Get products from database unless the caller supplies them
+            if base_products is None:
+                base_products = self.get_products_from_db()
+            if not base_products:
+                logger.error("No training data available from database")
+                return False
+            
+            if not isinstance(base_products, ProductTable):
+                base_products = ProductTable.from_products(base_products)
+            base_products = base_products.compact()
+            total_count = max(target_count, len(base_products))
+            bounds = chunk_bounds(len(base_products), total_count, chunk_size)
+            
+            # Synthetic rows cycle through the base rows, so the brand mix of the
+            # base rows is the brand popularity of the whole stream
+            encoders = {}
+            with self.training_stage('preprocess_features'):
+                brand_popularity_map = self.calculate_brand_popularity(base_products)
+                self.preprocess_features(base_products, brand_popularity_map, encoders)
+            stream = (base_products, bounds, brand_popularity_map, encoders)
+            
+            # First pass: feature and price statistics of the training rows
+            scaler = StandardScaler()
+            price_scaler = StandardScaler()
+            train_samples = holdout_samples = 0
+            with self.training_stage('stream:statistics'):
+                for _, X, y, holdout in self.iter_training_chunks(*stream):
+                    if (~holdout).any():
+                        scaler.partial_fit(X[~holdout])
+                        price_scaler.partial_fit(y[~holdout].reshape(-1, 1))
+                    train_samples += int((~holdout).sum())
+                    holdout_samples += int(holdout.sum())
+            
+            if train_samples < 1000:  # Minimum viable dataset
+                logger.error(f"Insufficient training data: {train_samples} samples")
+                return False
+            
+            # Models supporting partial_fit, trained on the standardized price
+            models_config = {
+                'sgd_regressor': SGDRegressor(
+                    alpha=1e-5,
+                    learning_rate='invscaling',
+                    eta0=0.01,
+                    random_state=42
+                ),
+                'sgd_huber': SGDRegressor(
+                    loss='huber',
+                    epsilon=1.0,
+                    alpha=1e-5,
+                    learning_rate='invscaling',
+                    eta0=0.01,
+                    random_state=42
+                ),
+                'mlp_regressor': MLPRegressor(
+                    hidden_layer_sizes=(64, 32),
+                    batch_size=256,
+                    learning_rate_init=0.001,
+                    random_state=42
+                )
+            }
+            price_mean, price_std = float(price_scaler.mean_[0]), float(price_scaler.scale_[0])
+            models = {
+                name: StandardizedTargetRegressor(model, price_mean, price_std)
+                for name, model in models_config.items()
+            }
+            
+            # Training passes, shuffling the rows of each chunk anew every epoch
+            for epoch in range(epochs):
+                with self.training_stage(f'stream:epoch_{epoch + 1}') as record:
+                    # Chunk generation and scaling are shared, so only the
+                    # partial_fit calls are timed per model
+                    fit_seconds = dict.fromkeys(models, 0.0)
+                    for chunk, X, y, holdout in self.iter_training_chunks(*stream):
+                        rows = np.random.RandomState([SYNTHETIC_SEED, chunk, epoch + 2]).permutation(np.flatnonzero(~holdout))
+                        if not len(rows):
+                            continue
+                        X_train = scaler.transform(X[rows])
+                        for model_name in list(models):
+                            fit_started = time.perf_counter()
+                            try:
+                                models[model_name].partial_fit(X_train, y[rows])
+                            except Exception as e:
+                                logger.error(f"Error training {model_name}: {str(e)}")
+                                del models[model_name]
+                            fit_seconds[model_name] += time.perf_counter() - fit_started
+                    record['fit_seconds'] = {name: round(seconds, 4) for name, seconds in fit_seconds.items()}
+                logger.info(f"Streaming epoch {epoch + 1}/{epochs} done")
+            
+            # Evaluate on the held-out stream
+            metrics = {model_name: StreamingRegressionMetrics() for model_name in models}
+            with self.training_stage('stream:evaluate'):
+                for _, X, y, holdout in self.iter_training_chunks(*stream):
+                    if not holdout.any():
+                        continue
+                    X_test = scaler.transform(X[holdout])
+                    for model_name, model in models.items():
+                        metrics[model_name].update(y[holdout], model.predict(X_test))
+            
+            model_results = {}
+            for model_name, accumulator in metrics.items():
+                result = accumulator.result()
+                if result is None or not all(np.isfinite(value) for value in result.values()):
+                    logger.error(f"No usable held-out metrics for {model_name}")
+                    continue
+                
+                # There is no cross-validation score, so its weight goes to R2
+                result['composite_score'] = (
+                    result['test_r2'] * 0.7 +
+                    (1 - result['test_mape']/100) * 0.3
+                )
+                model_results[model_name] = result
+                logger.info(f"{model_name} - Test R2: {result['test_r2']:.3f}, Test MAE: {result['test_mae']:.2f}, MAPE: {result['test_mape']:.1f}%")
+            
+            if not model_results:
+                logger.error("No models trained successfully")
+                return False
+            
+            # Select best model based on composite score
+            best_model_name = max(model_results.keys(), key=lambda k: model_results[k]['composite_score'])
+            best_result = model_results[best_model_name]
+            
+            with self.model_lock:
+                self.best_model_name = best_model_name
+                self.models = {name: models[name] for name in model_results}
+                self.model = self.models[best_model_name]
+                self.scaler = scaler
+                self.scalers = {name: scaler for name in model_results}
+                self.encoders = encoders
+                self.brand_popularity_map = brand_popularity_map
+                # Incremental updates patch the feature matrix of a full run,
+                # which a streaming run never builds
+                self.training_state = None
+            
+            if os.path.exists(TRAINING_STATE_PATH):
+                os.remove(TRAINING_STATE_PATH)
+            
+            # Store performance metrics
+            self.model_info.update(self.finish_telemetry())
+            self.model_info.update({
+                'trained_at': datetime.now().isoformat(),
+                'training_mode': 'streaming',
+                'best_model': best_model_name,
+                'models_performance': {
+                    name: {
+                        'test_r2': result['test_r2'],
+                        'test_mae': result['test_mae'],
+                        'test_mape': result['test_mape'],
+                        'cv_score_mean': None,
+                        'composite_score': result['composite_score']
+                    }
+                    for name, result in model_results.items()
+                },
+                'training_samples': train_samples + holdout_samples,
+                'incremental': None,
+                'hyperparameter_search': None,
+                'original_samples': len(base_products),
+                'synthetic_samples': total_count - len(base_products),
+                'training_cache': None,
+                'streaming': {
+                    'chunk_size': chunk_size,
+                    'chunks': len(bounds),
+                    'epochs': epochs,
+                    'train_samples': train_samples,
+                    'holdout_samples': holdout_samples
+                },
+                'feature_importance': {},
+                'memory': self.memory.run_stages() if self.memory.enabled else None
+            })
+            
+            # Save models
+            self.save_models()
+            
+            logger.info(f"Best model: {best_model_name} with composite score: {best_result['composite_score']:.3f}")
+            logger.info(f"Best model performance - R2: {best_result['test_r2']:.3f}, MAE: ${best_result['test_mae']:.2f}, MAPE: {best_result['test_mape']:.1f}%")
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Streaming training error: {str(e)}")
+            return False
+        finally:
+            # Finished runs closed their telemetry already
+            self.close_failed_run()
+    
+    def train_incremental(self):
+        """Update trained models with changed catalog rows, falling back to a full retrain on drift"""
+        try:
+            self.memory.begin_run()
+            if self.model_info.get('training_mode') == 'streaming':
+                # A streaming run keeps no feature matrix to patch, and silently
+                # rerunning it would turn a quick update into a full streaming run
+                logger.error("Incremental updates are not available after a streaming run, retrain in streaming mode instead")
+                return False
+            
+            state = self.training_state or self.load_training_state()
+            if state is None or not self.models:
+                logger.info("No previous training state, running full retrain")
+                return self.train_multiple_models()
+            
+            if state['incremental_updates'] >= INCREMENTAL_MAX_UPDATES:
+                logger.info(f"{INCREMENTAL_MAX_UPDATES} incremental updates since last full retrain, running full retrain")
+                return self.train_multiple_models()
+            
+            self.telemetry.begin_run('incremental')
+            base_products = self.get_products_from_db()
+            if not base_products:
+                logger.error("No training data available from database")
+                return False
+            
+            # Featurize the current catalog with the stored encoders and brand popularity
+            with self.training_stage('preprocess_features'):
+                X_current = self.preprocess_features(base_products, state['brand_popularity']).to_numpy(dtype=float)
+            y_current = base_products.column('price').astype(float)
+            current_ids = base_products.column('id').tolist()
+            
+            positions = {row_id: row for row, row_id in enumerate(state['row_ids'])}
+            priced_ids = {current_ids[i] for i in range(len(current_ids)) if y_current[i] > 0}
+            changed = [
+                i for i, product_id in enumerate(current_ids)
+                if y_current[i] > 0 and (
+                    product_id not in positions
+                    or state['y'][positions[product_id]] != y_current[i]
+                    or not np.allclose(state['X'][positions[product_id]], X_current[i])
+                )
+            ]
+            removed = [
+                row for row_id, row in positions.items()
+                if not row_id.startswith('synthetic_') and row_id not in priced_ids
+            ]
+            
+            # Decide whether the catalog moved too far for an incremental update
+            real_count = max(1, int(np.sum(~np.char.startswith(state['row_ids'], 'synthetic_'))))
+            changed_fraction = (len(changed) + len(removed)) / real_count
+            priced = y_current > 0
+            feature_drift = np.abs(X_current[priced].mean(axis=0) - state['real_mean']) / (state['real_std'] + 1e-9)
+            price_drift = abs(y_current[priced].mean() - state['real_price_mean']) / (state['real_price_std'] + 1e-9)
+            drift = float(max(feature_drift.max(), price_drift))
+            
+            if changed_fraction > INCREMENTAL_MAX_CHANGED_FRACTION or drift > INCREMENTAL_DRIFT_THRESHOLD:
+                logger.info(f"Catalog drift {drift:.3f} ({changed_fraction:.1%} rows changed) exceeds thresholds, running full retrain")
+                return self.train_multiple_models()
+            
+            if not changed and not removed:
+                logger.info("No catalog changes since last training, models are up to date")
+                # Nothing was trained, so the run is not kept
+                self.telemetry.end_run()
+                return True
+            
+            # Apply the changes to the stored feature matrix
+            X_all, y_all = state['X'].copy(), state['y'].copy()
+            row_ids, test_mask = state['row_ids'].copy(), state['test_mask'].copy()
+            appended = []
+            changed_rows = []
+            for i in changed:
+                row = positions.get(current_ids[i])
+                if row is None:
+                    appended.append(i)
+                else:
+                    X_all[row], y_all[row] = X_current[i], y_current[i]
+                    changed_rows.append(row)
+            
+            keep = np.ones(len(X_all), dtype=bool)
+            keep[removed] = False
+            changed_mask = np.zeros(len(X_all), dtype=bool)
+            changed_mask[changed_rows] = True
+            X_all = np.vstack([X_all[keep], X_current[appended]]) if appended else X_all[keep]
+            y_all = np.concatenate([y_all[keep], y_current[appended]])
+            row_ids = np.concatenate([row_ids[keep], np.array([current_ids[i] for i in appended], dtype=str)])
+            test_mask = np.concatenate([test_mask[keep], np.zeros(len(appended), dtype=bool)])
+            changed_mask = np.concatenate([changed_mask[keep], np.ones(len(appended), dtype=bool)])
+            
+            # Changed training rows plus a replay sample of untouched ones
+            train_changed = np.flatnonzero(changed_mask & ~test_mask)
+            replay_pool = np.flatnonzero(~changed_mask & ~test_mask)
+            rng = np.random.default_rng([SYNTHETIC_SEED, state['incremental_updates']])
+            replay = rng.choice(replay_pool, size=min(INCREMENTAL_REPLAY_SIZE, len(replay_pool)), replace=False)
+            sample = np.concatenate([train_changed, replay])
+            X_sample, y_sample = X_all[sample], y_all[sample]
+            X_train, y_train = X_all[~test_mask], y_all[~test_mask]
+            X_test, y_test = X_all[test_mask], y_all[test_mask]
+            
+            logger.info(f"Incremental training with {len(train_changed)} changed rows and {len(replay)} replay rows")
+            
+            # Train copies so requests keep predicting with the current models,
+            # and a failed fit leaves that model as it was
+            with self.model_lock:
+                current_models = dict(self.models)
+                scalers = dict(self.scalers)
+                feature_selector = self.feature_selector
+            updated_models = dict(current_models)
+            performance = copy.deepcopy(self.model_info['models_performance'])
+            
+            for model_name, current_model in current_models.items():
+                try:
+                    model = copy.deepcopy(current_model)
+                    scaler = scalers[model_name]
+                    feature_selected = performance.get(model_name, {}).get(
+                        'feature_selected', model_name in ['linear_regression', 'ridge', 'lasso']
+                    )
+                    
+                    def transform(features):
+                        scaled = scaler.transform(features)
+                        return feature_selector.transform(scaled) if feature_selected else scaled
+                    
+                    with self.training_stage('fit', model_name):
+                        if hasattr(model, 'partial_fit'):
+                            model.partial_fit(transform(X_sample), y_sample)
+                        elif isinstance(model, RandomForestRegressor):
+                            # Replace the oldest trees with new ones grown on the sample
+                            model.set_params(warm_start=True)
+                            model.estimators_ = model.estimators_[INCREMENTAL_EXTRA_ESTIMATORS:]
+                            model.fit(transform(X_sample), y_sample)
+                        elif isinstance(model, GradientBoostingRegressor):
+                            # Add boosting stages fitted to the residuals on the sample
+                            model.set_params(warm_start=True, n_estimators=model.n_estimators + INCREMENTAL_EXTRA_ESTIMATORS)
+                            model.fit(transform(X_sample), y_sample)
+                        else:
+                            # Linear models and single trees are cheap to refit on the stored matrix
+                            if 'warm_start' in model.get_params():
+                                model.set_params(warm_start=True)
+                            model.fit(transform(X_train), y_train)
+                    
+                    with self.training_stage('predict', model_name):
+                        y_pred_test = model.predict(transform(X_test))
+                    test_r2 = r2_score(y_test, y_pred_test)
+                    test_mape = np.mean(np.abs((y_test - y_pred_test) / y_test)) * 100
+                    model_performance = performance.setdefault(model_name, {})
+                    cv_score_mean = model_performance.get('cv_score_mean', test_r2)
+                    model_performance.update({
+                        'test_r2': test_r2,
+                        'test_mae': mean_absolute_error(y_test, y_pred_test),
+                        'test_mape': test_mape,
+                        'cv_score_mean': cv_score_mean,
+                        'composite_score': test_r2 * 0.4 + (1 - test_mape/100) * 0.3 + cv_score_mean * 0.3
+                    })
+                    
+                    updated_models[model_name] = model
+                    logger.info(f"{model_name} - Test R2: {test_r2:.3f}, MAPE: {test_mape:.1f}% (incremental)")
+                    
+                except Exception as e:
+                    logger.error(f"Error updating {model_name}: {str(e)}")
+                    continue
+            
+            best_model_name = max(
+                (name for name in updated_models if name in performance),
+                key=lambda name: performance[name]['composite_score']
+            )
+            best_model = updated_models[best_model_name]
+            
+            state = dict(state, **{
+                'X': X_all,
+                'y': y_all,
+                'row_ids': row_ids,
+                'test_mask': test_mask,
+                'incremental_updates': state['incremental_updates'] + 1
+            })
+            
+            model_info = dict(self.model_info, models_performance=performance, **self.finish_telemetry())
+            model_info.update({
+                'trained_at': datetime.now().isoformat(),
+                'training_mode': 'incremental',
+                'best_model': best_model_name,
+                'training_samples': len(X_all),
+                'original_samples': len(base_products),
+                'incremental': {
+                    'changed_rows': len(changed),
+                    'removed_rows': len(removed),
+                    'replay_rows': len(replay),
+                    'drift': drift,
+                    'changed_fraction': changed_fraction,
+                    'updates_since_full': state['incremental_updates']
+                },
+                'memory': self.memory.run_stages() if self.memory.enabled else None
+            })
+            if hasattr(best_model, 'feature_importances_'):
+                model_info['feature_importance'] = dict(zip(self.feature_columns, best_model.feature_importances_))
+            
+            # Swap the updated models in together
+            with self.model_lock:
+                self.models = updated_models
+                self.best_model_name = best_model_name
+                self.model = best_model
+                self.scaler = scalers[best_model_name]
+                self.model_info = model_info
+                self.training_state = state
+            
+            self.save_models()
+            
+            logger.info(f"Incremental update done, best model: {best_model_name}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Incremental training error: {str(e)}")
+            return False
+        finally:
+            # Finished runs closed their telemetry already
+            self.close_failed_run()
     
-    def predict_with_best_model(self, features):
+    def predict_price(self, specs):
+        """Predict the price of a phone from its brand and specification strings"""
+        # Take one consistent set of references so a bundle swap mid-request
+        # cannot mix new encoders with an old model
+        with self.model_lock:
+            encoders = self.encoders
+            brand_popularity_map = self.brand_popularity_map
+            model_info = self.model_info
+            references = (self.best_model_name, self.models, self.scaler, self.feature_selector)
+        if 'brand' not in encoders:
+            return None
+        
+        # Rating and reviews are unknown for a phone being priced, so use the
+        # averages the synthetic training rows are drawn around
+        product = self.build_product(dict(
+            specs, id='prediction', model='', price=None, rating=4.0, reviews=100,
+            description=None, image_url=None, operating_system=None, features=None
+        ))
+        features = self.preprocess_features([product], brand_popularity_map or {}, encoders).to_numpy(dtype=float)
+        prediction = self.predict_with_best_model(features, references)
+        if prediction is None:
+            return None
+        
+        performance = model_info.get('models_performance', {}).get(references[0], {})
+        return {
+            'predicted_price': round(max(float(prediction[0]), 0.0), 2),
+            'confidence_score': round(min(max(performance.get('test_r2') or 0.0, 0.0), 1.0), 4),
+            'model_name': references[0],
+            'model_version': model_info.get('bundle_version') or model_info.get('version')
+        }
+    
+    def predict_with_best_model(self, features, references=None):
         """Make prediction using the best performing model"""
-        if not self.best_model_name or self.best_model_name not in self.models:
+        # Take one consistent set of references so a bundle swap mid-request
+        # cannot mix a new scaler with an old model
+        if references is None:
+            with self.model_lock:
+                references = (self.best_model_name, self.models, self.scaler, self.feature_selector)
+        best_model_name, models, scaler, feature_selector = references
+        model = models.get(best_model_name) if best_model_name else None
+        
+        if model is None:
             return None
         
         # Scale features
-        features_scaled = self.scaler.transform(features)
+        features_scaled = scaler.transform(features)
         
         # Apply feature selection if needed
-        if self.best_model_name in ['linear_regression', 'ridge', 'lasso'] and self.feature_selector:
-            features_scaled = self.feature_selector.transform(features_scaled)
+        if best_model_name in ['linear_regression', 'ridge', 'lasso'] and feature_selector:
+            features_scaled = feature_selector.transform(features_scaled)
         
         # Make prediction
-        prediction = self.models[self.best_model_name].predict(features_scaled)
+        prediction = model.predict(features_scaled)
         return prediction
     
-    def find_matching_phones(self, specification_text, top_k=10):
-        """Find matching phones based on specification text"""
+    def select_candidates(self, parsed_spec, min_candidates=SEARCH_MIN_CANDIDATES):
+        """Narrow the catalog by brand and price band, widening when too few remain"""
+        self.catalog.ensure_loaded()
+        brand = parsed_spec.get('brand')
+        price = parsed_spec.get('price')
+        
+        with self.catalog.lock:
+            tolerance = SEARCH_PRICE_TOLERANCE
+            rows = self.candidate_index.candidates(brand, price, tolerance)
+            
+            # Widen the price band first, then drop the price filter entirely
+            while rows is not None and price and len(rows) < min_candidates and tolerance < SEARCH_MAX_PRICE_TOLERANCE:
+                tolerance = min(tolerance * 2, SEARCH_MAX_PRICE_TOLERANCE)
+                rows = self.candidate_index.candidates(brand, price, tolerance)
+            if rows is not None and price and len(rows) < min_candidates:
+                rows = self.candidate_index.candidates(brand)
+            if rows is not None and len(rows) < min_candidates:
+                rows = None
+            
+            if rows is None:
+                return self.catalog.table.rows()
+            return [self.catalog.table.row(row) for row in sorted(rows)]
+    
+    def select_filtered(self, filters, predicate=None, with_facets=False):
+        """Catalog rows matching brand, feature and price bucket filters, resolved on the bitmap index"""
+        self.catalog.ensure_loaded()
+        with self.catalog.lock:
+            # Rows, their table and the facets all come from the same catalog state
+            table = self.catalog.table
+            phones = [table.row(row) for row in self.bitmap_index.rows(self.bitmap_index.select(filters))]
+            if predicate is not None:
+                phones = [phone for phone in phones if predicate(phone)]
+            if with_facets:
+                restrict = None
+                if predicate is not None:
+                    # Facets also count rows a disjunctive filter excludes, so
+                    # the predicate runs over every row the other filters keep
+                    wider = self.bitmap_index.select({
+                        dimension: values for dimension, values in filters.items()
+                        if dimension not in BitmapIndex.DISJUNCTIVE
+                    })
+                    restrict = self.bitmap_index.pack([
+                        row for row in self.bitmap_index.rows(wider).tolist() if predicate(table.row(row))
+                    ])
+                return phones, self.bitmap_index.disjunctive_facets(filters, restrict)
+            return phones
+    
+    def facet_counts(self, phones):
+        """Brand, feature and price bucket counts over the given phones"""
+        with self.catalog.lock:
+            table = self.catalog.table
+            if all(phone.table is table for phone in phones):
+                rows = [phone.index for phone in phones]
+            else:
+                # A full reload replaced the table the phones were read from, so
+                # their row ids mean nothing to the index; look them up by id
+                positions = self.catalog.positions
+                rows = [positions[phone['id']] for phone in phones if phone['id'] in positions]
+            return self.bitmap_index.facets(self.bitmap_index.pack(rows))
+    
+    def candidate_phones(self, parsed_spec, top_k, prefilter=True, min_candidates=None, filters=None):
+        """Catalog rows a search scores; explicit filters are exact, so they replace the heuristic pre-filter"""
+        if filters:
+            return self.select_filtered(filters)
+        if prefilter:
+            return self.select_candidates(parsed_spec, max(top_k, min_candidates or SEARCH_MIN_CANDIDATES))
+        return self.catalog.snapshot()
+    
+    def find_matching_phones(self, specification_text, top_k=10, prefilter=True, min_candidates=None, filters=None, with_facets=False):
+        """Find matching phones based on specification text; with_facets also returns facet counts of all matches"""
         try:
             # Parse the specification text
             parsed_spec = self.parser.parse_specification(specification_text)
             logger.info(f"Parsed specification: {parsed_spec}")
             
-            # Get products from database
-            mobile_dataset = self.get_products_from_db()
+            mobile_dataset = self.candidate_phones(parsed_spec, top_k, prefilter, min_candidates, filters)
             if not mobile_dataset:
-                return []
+                return ([], {}) if with_facets else []
             
             matches = []
             
@@ -721,27 +1906,149 @@ class AdvancedMobileSpecificationMatcher:
             matches.sort(key=lambda x: x['similarity_score'], reverse=True)
             
             # Return top K matches
+            if with_facets:
+                return matches[:top_k], self.facet_counts([match['phone'] for match in matches])
             return matches[:top_k]
             
         except Exception as e:
+            # Raised rather than answered with no matches, which the search
+            # cache would keep serving for the rest of the catalog version
             logger.error(f"Error finding matches: {str(e)}")
+            raise
+    
+    def get_suggestion_index(self):
+        """Autocomplete index over model names, brand aliases and spec values, built per catalog version"""
+        self.catalog.ensure_loaded()
+        suggestion_index = self.suggestion_index
+        if suggestion_index is not None and suggestion_index['version'] == self.catalog.version:
+            return suggestion_index['index']
+        
+        with self.catalog.lock:
+            version = self.catalog.version
+            table = self.catalog.table
+            rows = table.alive_rows()
+            popularity = table.numeric['rating'][rows] * table.numeric['reviews_count_log'][rows]
+            ids = table.objects['id'][rows]
+            models = table.objects['model'][rows]
+            brand_values = table.dictionaries['brand'].values
+            brand_codes = table.categorical['brand'][rows].copy()
+            spec_columns = {
+                name: (table.dictionaries[name].values, table.categorical[name][rows].copy())
+                for name in SUGGEST_SPEC_LABELS
+            }
+        
+        # Models keep their most popular product, brands and spec values
+        # accumulate the popularity of every product that has them
+        best_models = {}
+        for product_id, model, brand_code, score in zip(ids, models, brand_codes.tolist(), popularity.tolist()):
+            key = (brand_code, model)
+            if key not in best_models or score > best_models[key][1]:
+                best_models[key] = (product_id, score)
+        
+        brand_scores = np.bincount(brand_codes, weights=popularity, minlength=len(brand_values))
+        entries = [
+            (model, 'model', score, {'product_id': product_id, 'brand': brand_values[brand_code]})
+            for (brand_code, model), (product_id, score) in best_models.items() if model
+        ]
+        
+        aliases = self.parser.brand_aliases()
+        aliases.update({brand: brand for brand in brand_values})
+        for alias, brand in aliases.items():
+            code = table.dictionaries['brand'].codes.get(brand)
+            if code is not None and brand_scores[code] > 0:
+                entries.append((alias, 'brand', brand_scores[code], {'brand': brand}))
+        
+        for name, (values, codes) in spec_columns.items():
+            scores = np.bincount(codes, weights=popularity, minlength=len(values))
+            for code, value in enumerate(values):
+                if scores[code] > 0 and value:
+                    label = f"{value} {SUGGEST_SPEC_LABELS[name]}".strip()
+                    entries.append((label, 'spec', scores[code], {'spec': name}))
+        
+        index = SuggestionIndex(entries)
+        self.suggestion_index = {'version': version, 'index': index}
+        return index
+    
+    def find_matching_phones_batch(self, specification_texts, top_k=10, prefilter=True, min_candidates=None, filters=None, parsed_specs=None):
+        """Rank many specification texts exactly as find_matching_phones does; returns (matches per text, parsed specs)"""
+        if parsed_specs is None:
+            parsed_specs = [self.parser.parse_specification(text) for text in specification_texts]
+        # Without the per-query pre-filter every query scores the same rows
+        shared_phones = None if prefilter and not filters else self.candidate_phones({}, top_k, prefilter, min_candidates, filters)
+        
+        results = []
+        for specification_text, parsed_spec in zip(specification_texts, parsed_specs):
+            phones = shared_phones
+            if phones is None:
+                phones = self.candidate_phones(parsed_spec, top_k, prefilter, min_candidates)
+            results.append(self.rank_phones(parsed_spec, specification_text, phones, top_k))
+        return results, parsed_specs
+    
+    def similarity_bounds(self, parsed_spec, table, rows):
+        """Brand and numeric similarity of each row, and the total weight calculate_similarity divides it by"""
+        similarity = np.zeros(len(rows))
+        total_weight = np.full(len(rows), TEXT_SIMILARITY_WEIGHT)
+        
+        if 'brand' in parsed_spec and parsed_spec['brand'] != 'unknown':
+            code = table.dictionaries['brand'].codes.get(parsed_spec['brand'].lower(), -1)
+            similarity += SIMILARITY_WEIGHTS['brand'] * (table.categorical['brand'][rows] == code)
+            total_weight += SIMILARITY_WEIGHTS['brand']
+        
+        for spec, column in NUMERIC_SPEC_COLUMNS.items():
+            parsed_value = parsed_spec.get(spec, 0)
+            if parsed_value <= 0:
+                continue
+            phone_values = table.numeric[column][rows].astype(float)
+            valid = phone_values > 0
+            with np.errstate(divide='ignore', invalid='ignore'):
+                diff_ratio = np.abs(phone_values - parsed_value) / np.maximum(phone_values, parsed_value)
+            similarity += np.where(valid, SIMILARITY_WEIGHTS[spec] * np.maximum(0, 1 - diff_ratio), 0)
+            total_weight += SIMILARITY_WEIGHTS[spec] * valid
+        
+        return similarity, total_weight
+    
+    def rank_phones(self, parsed_spec, specification_text, phones, top_k):
+        """Top k matches among phones, as find_matching_phones ranks them"""
+        if not phones or top_k < 1:
             return []
+        
+        # Brand and numeric specs bound each score from above, so the costly
+        # text similarity only runs for phones that can still make the top k
+        rows = np.fromiter((phone.index for phone in phones), dtype=np.int64, count=len(phones))
+        similarity, total_weight = self.similarity_bounds(parsed_spec, phones[0].table, rows)
+        upper = (similarity + TEXT_SIMILARITY_WEIGHT) / total_weight
+        
+        # Highest bound first, candidate order among equal bounds
+        order = np.lexsort((np.arange(len(phones)), -upper))
+        scored, best = [], []  # best is a min-heap of the top k scores so far
+        for position in order.tolist():
+            # Bounds are recomputed in vectorized floating point, so allow for rounding
+            if upper[position] <= 0.1 - 1e-9 or (len(best) == top_k and upper[position] < best[0] - 1e-9):
+                break
+            similarity_score = self.calculate_similarity(parsed_spec, phones[position], specification_text)
+            if similarity_score > 0.1:  # Minimum similarity threshold
+                scored.append((similarity_score, position))
+                if len(best) < top_k:
+                    heapq.heappush(best, similarity_score)
+                else:
+                    heapq.heappushpop(best, similarity_score)
+        
+        # Ties keep candidate order, like the stable sort of find_matching_phones
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [
+            {
+                'phone': phones[position],
+                'similarity_score': similarity_score,
+                'matched_features': self.get_matched_features(parsed_spec, phones[position])
+            }
+            for similarity_score, position in scored[:top_k]
+        ]
     
     def calculate_similarity(self, parsed_spec, phone, specification_text):
         """Calculate similarity between parsed specification and phone"""
         similarity = 0.0
         total_weight = 0.0
-        
-        # Weight factors for different specifications
-        weights = {
-            'brand': 0.25,
-            'ram': 0.20,
-            'storage': 0.15,
-            'camera': 0.15,
-            'battery': 0.10,
-            'display_size': 0.10,
-            'price': 0.05
-        }
+        weights = SIMILARITY_WEIGHTS
         
         # Brand matching (exact match)
         if 'brand' in parsed_spec and parsed_spec['brand'] != 'unknown':
@@ -778,8 +2085,8 @@ class AdvancedMobileSpecificationMatcher:
             phone.get('specifications', '').lower()
         ).ratio()
         
-        similarity += 0.1 * text_similarity
-        total_weight += 0.1
+        similarity += TEXT_SIMILARITY_WEIGHT * text_similarity
+        total_weight += TEXT_SIMILARITY_WEIGHT
         
         # Normalize similarity
         return similarity / total_weight if total_weight > 0 else 0
@@ -848,14 +2155,7 @@ class AdvancedMobileSpecificationMatcher:
     def get_user_predictions(self, user_id, limit=10):
         """Get user's prediction history"""
         try:
-            query = """
-            SELECT * FROM predictions 
-            WHERE user_id = %s 
-            ORDER BY created_at DESC 
-            LIMIT %s
-            """
-            
-            results = self.db_manager.execute_query(query, (user_id, limit))
+            results = self.db_manager.execute_prepared('user_predictions', (user_id, limit))
             return [dict(row) for row in results] if results else []
             
         except Exception as e:
@@ -866,23 +2166,111 @@ class AdvancedMobileSpecificationMatcher:
         """Save the trained model"""
         os.makedirs('model', exist_ok=True)
         
-        if self.model:
-            joblib.dump(self.model, MODEL_PATH)
+        if self.models:
+            joblib.dump({
+                'models': self.models,
+                'best_model_name': self.best_model_name,
+                'scalers': self.scalers
+            }, MODEL_PATH)
         if self.scaler:
             joblib.dump(self.scaler, SCALER_PATH)
+        if self.feature_selector:
+            joblib.dump(self.feature_selector, FEATURE_SELECTOR_PATH)
         joblib.dump(self.encoders, ENCODERS_PATH)
+        if self.brand_popularity_map is not None:
+            joblib.dump(self.brand_popularity_map, BRAND_POPULARITY_PATH)
+        if self.training_state:
+            joblib.dump(self.training_state, TRAINING_STATE_PATH)
         
         # Save model info
         with open('model/model_info.json', 'w') as f:
             json.dump(self.model_info, f, indent=2)
     
+    def load_training_state(self):
+        """Load the feature matrix kept from the last full training run"""
+        if not os.path.exists(TRAINING_STATE_PATH):
+            return None
+        try:
+            self.training_state = joblib.load(TRAINING_STATE_PATH)
+            return self.training_state
+        except Exception as e:
+            logger.error(f"Error loading training state: {str(e)}")
+            return None
+    
+    def bundle_payload(self):
+        """Everything a serving process needs from a training run"""
+        with self.model_lock:
+            return {
+                'models': self.models,
+                'best_model_name': self.best_model_name,
+                'scalers': self.scalers,
+                'scaler': self.scaler,
+                'feature_selector': self.feature_selector,
+                'encoders': self.encoders,
+                'brand_popularity_map': self.brand_popularity_map,
+                'training_state': self.training_state,
+                'model_info': self.model_info
+            }
+    
+    def apply_bundle(self, version, payload):
+        """Swap in a model bundle; requests already running keep the references they took"""
+        model_info = dict(payload['model_info'], bundle_version=version)
+        with self.model_lock:
+            self.models = payload['models']
+            self.best_model_name = payload['best_model_name']
+            self.scalers = payload['scalers']
+            self.scaler = payload['scaler']
+            self.feature_selector = payload['feature_selector']
+            self.encoders = payload['encoders']
+            self.brand_popularity_map = payload['brand_popularity_map']
+            # Older bundles carry no training state; never patch another run's matrix
+            self.training_state = payload.get('training_state')
+            self.model = self.models.get(self.best_model_name)
+            self.model_info = model_info
+    
+    def publish_bundle(self, directory=MODEL_BUNDLE_DIR):
+        """Write the current models to the shared bundle directory"""
+        return write_bundle(directory, self.bundle_payload(), self.model_info, MODEL_BUNDLE_KEEP)
+    
+    def start_bundle_watch(self):
+        """Follow the shared bundle directory when one is configured"""
+        if not MODEL_BUNDLE_DIR or self.bundle_watcher is not None:
+            return
+        self.bundle_watcher = ModelBundleWatcher(
+            MODEL_BUNDLE_DIR, self.apply_bundle, MODEL_BUNDLE_POLL_INTERVAL,
+            self.model_info.get('bundle_version')
+        )
+        self.bundle_watcher.start()
+    
     def load_model(self):
         """Load the trained model"""
+        if MODEL_BUNDLE_DIR:
+            version = latest_version(MODEL_BUNDLE_DIR)
+            if version:
+                try:
+                    self.apply_bundle(version, read_bundle(MODEL_BUNDLE_DIR, version))
+                    logger.info(f"Model bundle {version} loaded from {MODEL_BUNDLE_DIR}")
+                    return True
+                except Exception as e:
+                    logger.error(f"Error loading model bundle {version}: {str(e)}")
+        
         try:
             if os.path.exists(MODEL_PATH):
-                self.model = joblib.load(MODEL_PATH)
+                saved = joblib.load(MODEL_PATH)
                 self.scaler = joblib.load(SCALER_PATH)
                 self.encoders = joblib.load(ENCODERS_PATH)
+                if os.path.exists(FEATURE_SELECTOR_PATH):
+                    self.feature_selector = joblib.load(FEATURE_SELECTOR_PATH)
+                if os.path.exists(BRAND_POPULARITY_PATH):
+                    self.brand_popularity_map = joblib.load(BRAND_POPULARITY_PATH)
+                
+                if isinstance(saved, dict):
+                    self.models = saved['models']
+                    self.best_model_name = saved['best_model_name']
+                    self.scalers = saved.get('scalers', {})
+                    self.model = self.models.get(self.best_model_name)
+                else:
+                    self.model = saved
                 
                 if os.path.exists('model/model_info.json'):
                     with open('model/model_info.json', 'r') as f:
@@ -899,14 +2287,142 @@ class AdvancedMobileSpecificationMatcher:
 
 # Initialize the matcher
 matcher = AdvancedMobileSpecificationMatcher()
+search_cache = ResultCache(SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_MAX_BYTES)
+search_flight = SingleFlight('search', COALESCE_TIMEOUT)
+recommendation_flight = SingleFlight('recommendations', COALESCE_TIMEOUT)
+shard_coordinator = ShardCoordinator(
+    SEARCH_SHARD_URLS, SEARCH_SHARD_TIMEOUT,
+    load_manifest(SEARCH_SHARD_MANIFEST) if SEARCH_SHARD_MANIFEST else None,
+    SEARCH_MIN_CANDIDATES
+) if SEARCH_SHARD_URLS else None
+
+def search_cache_key(specification_text, parsed_spec, top_k, prefilter, min_candidates, filters=None):
+    """Cache key from the normalized text, parsed specification and filters"""
+    normalized_text = ' '.join(specification_text.lower().split())
+    return (
+        normalized_text, json.dumps(parsed_spec, sort_keys=True), top_k, bool(prefilter), min_candidates,
+        json.dumps(filters or {}, sort_keys=True)
+    )
+
+admission_pools = {
+    name: AdmissionPool(name, max_concurrent, max_queue, queue_timeout)
+    for name, (max_concurrent, max_queue, queue_timeout) in ADMISSION_POOLS.items()
+}
+
+health_prober = HealthProber(
+    DATABASE_CONFIG, matcher.catalog, lambda: not MODEL_SERVING or matcher.model is not None,
+    admission_pools, HEALTH_PROBE_INTERVAL
+)
+
+# Fields a search result may be projected to with ?fields=
+SEARCH_RESULT_FIELDS = PRODUCT_FIELDS + ['similarity_score', 'matched_features']
+
+def fast_json(payload, status=200):
+    """Serialize a response with the fast encoder and negotiated compression"""
+    return json_response(payload, status, request.headers.get('Accept-Encoding'))
+
+def parse_filters(source):
+    """Brand, feature and price_bucket filters from query arguments or a JSON object; returns (filters, unknown buckets)"""
+    filters = {}
+    for dimension in BitmapIndex.DIMENSIONS:
+        raw = source.getlist(dimension) if hasattr(source, 'getlist') else source.get(dimension) or []
+        if isinstance(raw, str):
+            raw = [raw]
+        # Repeated parameters and comma separated lists are both accepted
+        values = sorted({value.strip().lower() for item in raw for value in str(item).split(',') if value.strip()})
+        if values:
+            filters[dimension] = values
+    unknown = [bucket for bucket in filters.get('price_bucket', []) if bucket not in PRICE_BUCKETS.values()]
+    return filters, unknown
+
+def unknown_buckets_error(unknown):
+    return jsonify({
+        'success': False,
+        'error': f"Unknown price buckets: {', '.join(unknown)}, expected one of {', '.join(PRICE_BUCKETS.values())}"
+    }), 400
+
+def unknown_fields_error(unknown):
+    return jsonify({
+        'success': False,
+        'error': f"Unknown fields: {', '.join(unknown)}"
+    }), 400
+
+def invalid_ids(ids):
+    """The given ids that are not UUIDs, so they are rejected before reaching the database"""
+    invalid = []
+    for value in ids:
+        try:
+            uuid.UUID(str(value))
+        except ValueError:
+            invalid.append(str(value))
+    return invalid
+
+def invalid_ids_error(invalid):
+    return jsonify({
+        'success': False,
+        'error': f"Invalid ids: {', '.join(invalid)}"
+    }), 400
+
+def admit(pool_name):
+    """Run the endpoint inside an admission pool, answering 503 when it is saturated"""
+    pool = admission_pools[pool_name]
+    
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Clients may shorten the queueing deadline with X-Request-Timeout (seconds)
+            timeout = request.headers.get('X-Request-Timeout', type=float)
+            if not pool.acquire(timeout):
+                response = jsonify({
+                    'success': False,
+                    'error': f'Service busy, too many {pool_name} requests'
+                })
+                response.headers['Retry-After'] = str(pool.retry_after())
+                return response, 503
+            
+            start = time.perf_counter()
+            try:
+                return view(*args, **kwargs)
+            finally:
+                pool.release(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def memory_admin(view):
+    """Hide the memory profiling endpoints unless MEMORY_ADMIN_ENDPOINTS is set"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not MEMORY_ADMIN_ENDPOINTS:
+            return jsonify({
+                'success': False,
+                'error': 'Not found'
+            }), 404
+        return view(*args, **kwargs)
+    return wrapper
 
 # API Endpoints
 
+@app.route('/livez', methods=['GET'])
+def liveness():
+    """Liveness probe answered from the background prober's state"""
+    health_prober.ensure_started()
+    live = health_prober.live()
+    return jsonify({'live': live}), 200 if live else 503
+
+@app.route('/readyz', methods=['GET'])
+def readiness():
+    """Readiness probe answered from the background prober's state"""
+    health_prober.ensure_started()
+    state = health_prober.state
+    return jsonify(state), 200 if state['ready'] else 503
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    db_status = "connected" if matcher.db_manager.connection else "disconnected"
-    products_count = len(matcher.get_products_from_db())
+    health_prober.ensure_started()
+    database = health_prober.state.get('database')
+    db_status = "unknown" if database is None else "connected" if database['reachable'] else "disconnected"
+    products_count = len(matcher.catalog.table)
     
     return jsonify({
         'status': 'healthy',
@@ -914,10 +2430,36 @@ def health_check():
         'version': MODEL_VERSION,
         'timestamp': datetime.now().isoformat(),
         'database_status': db_status,
-        'products_count': products_count
+        'products_count': products_count,
+        'catalog_source': matcher.catalog.source
     })
 
+def score_search(specification_text, top_k, prefilter, min_candidates, filters, catalog_version, cache_key):
+    """Score a search against the local catalog and cache the formatted results"""
+    # Find matching phones and facet counts over all of them in one pass
+    matches, facets = matcher.find_matching_phones(
+        specification_text, top_k, prefilter, min_candidates, filters, with_facets=True
+    )
+    
+    # Format response
+    results = []
+    for match in matches:
+        phone = match['phone'].copy()
+        phone['similarity_score'] = match['similarity_score']
+        phone['matched_features'] = match['matched_features']
+        results.append(phone)
+    
+    search_cache.put(catalog_version, cache_key, {'results': results, 'facets': facets})
+    return results, facets
+
+def coalescing_timeout_error(error):
+    return jsonify({
+        'success': False,
+        'error': str(error)
+    }), 503
+
 @app.route('/api/search', methods=['POST'])
+@admit('search')
 def search_phones():
     """Search for phones based on specification text"""
     try:
@@ -931,7 +2473,15 @@ def search_phones():
         
         specification_text = data['specification'].strip()
         top_k = data.get('top_k', 10)
+        prefilter = data.get('prefilter', True)
+        min_candidates = data.get('min_candidates')
         user_id = data.get('user_id')  # Optional user tracking
+        fields, unknown = parse_fields(request.args.get('fields') or data.get('fields'), SEARCH_RESULT_FIELDS)
+        if unknown:
+            return unknown_fields_error(unknown)
+        filters, unknown = parse_filters(data.get('filters') or request.args)
+        if unknown:
+            return unknown_buckets_error(unknown)
         
         if not specification_text:
             return jsonify({
@@ -939,34 +2489,60 @@ def search_phones():
                 'error': 'Specification text cannot be empty'
             }), 400
         
-        # Find matching phones
-        matches = matcher.find_matching_phones(specification_text, top_k)
+        parsed_spec = matcher.parser.parse_specification(specification_text)
+        shards = None
         
-        # Format response
-        results = []
-        for match in matches:
-            phone = match['phone'].copy()
-            phone['similarity_score'] = match['similarity_score']
-            phone['matched_features'] = match['matched_features']
-            results.append(phone)
+        if shard_coordinator is not None:
+            # Scored by the shard processes; results are not cached here since
+            # a partial answer must not outlive the shard outage
+            results, facets, shards = shard_coordinator.search(
+                specification_text, parsed_spec, top_k, prefilter, min_candidates, filters
+            )
+            if not shards['responded']:
+                return jsonify({
+                    'success': False,
+                    'error': 'Search shards unavailable'
+                }), 503
+        else:
+            # Popular searches are answered from the cache for the current catalog version
+            matcher.catalog.ensure_loaded()
+            catalog_version = matcher.catalog.version
+            cache_key = search_cache_key(specification_text, parsed_spec, top_k, prefilter, min_candidates, filters)
+            cached = search_cache.get(catalog_version, cache_key)
+            results, facets = (cached['results'], cached['facets']) if cached else (None, None)
+        
+        if results is None:
+            # A burst of the same query is scored once; the others wait for it
+            results, facets = search_flight.do(
+                (catalog_version, cache_key), score_search,
+                specification_text, top_k, prefilter, min_candidates, filters, catalog_version, cache_key
+            )
         
         # Save search query if user_id provided
         if user_id and results:
             search_data = {
-                'brand': matcher.parser.parse_specification(specification_text).get('brand'),
+                'brand': parsed_spec.get('brand'),
                 'predicted_price': results[0]['price'] if results else 0,
                 'confidence_score': results[0]['similarity_score'] if results else 0
             }
             matcher.save_prediction_to_db(user_id, search_data)
         
-        return jsonify({
+        response = {
             'success': True,
             'query': specification_text,
-            'parsed_specification': matcher.parser.parse_specification(specification_text),
+            'parsed_specification': parsed_spec,
             'total_matches': len(results),
-            'results': results
-        })
+            'results': [project(phone, fields) for phone in results],
+            'filters': filters,
+            'facets': facets
+        }
+        if shards is not None:
+            response['partial'] = shards['partial']
+            response['shards'] = shards
+        return fast_json(response)
         
+    except CoalescingTimeout as e:
+        return coalescing_timeout_error(e)
     except Exception as e:
         logger.error(f"Search endpoint error: {str(e)}")
         return jsonify({
@@ -974,15 +2550,164 @@ def search_phones():
             'error': 'Search failed'
         }), 500
 
+@app.route('/api/search/cache', methods=['GET'])
+def get_search_cache_stats():
+    """Get search result cache statistics"""
+    return jsonify({
+        'success': True,
+        'cache': search_cache.stats()
+    })
+
+@app.route('/api/search/shards', methods=['GET'])
+def get_search_shard_stats():
+    """Get per-shard request counts, timeouts and latency of the search coordinator"""
+    if shard_coordinator is None:
+        return jsonify({
+            'success': False,
+            'error': 'Sharded search is not enabled'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'timeout_seconds': shard_coordinator.timeout,
+        'shards': shard_coordinator.stats()
+    })
+
+@app.route('/api/coalescing', methods=['GET'])
+def coalescing_stats():
+    """Calls executed and coalesced by each single-flight group"""
+    return jsonify({
+        'success': True,
+        'groups': {
+            flight.name: flight.stats()
+            for flight in (matcher.catalog.reloads, search_flight, recommendation_flight)
+        }
+    })
+
+@app.route('/api/admission', methods=['GET'])
+def admission_stats():
+    """Concurrency, queue and rejection counters of each admission pool"""
+    return jsonify({
+        'success': True,
+        'pools': {name: pool.stats() for name, pool in admission_pools.items()}
+    })
+
+@app.route('/api/search/batch', methods=['POST'])
+@admit('search')
+def search_phones_batch():
+    """Search for phones for many specification texts in one call"""
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('specifications'), list):
+            return jsonify({
+                'success': False,
+                'error': 'A list of specification texts is required'
+            }), 400
+        
+        specification_texts = [str(text).strip() for text in data['specifications']]
+        top_k = data.get('top_k', 10)
+        prefilter = data.get('prefilter', True)
+        min_candidates = data.get('min_candidates')
+        fields, unknown = parse_fields(request.args.get('fields') or data.get('fields'), SEARCH_RESULT_FIELDS)
+        if unknown:
+            return unknown_fields_error(unknown)
+        filters, unknown = parse_filters(data.get('filters') or {})
+        if unknown:
+            return unknown_buckets_error(unknown)
+        
+        if len(specification_texts) > SEARCH_BATCH_MAX_QUERIES:
+            return jsonify({
+                'success': False,
+                'error': f'At most {SEARCH_BATCH_MAX_QUERIES} specifications per batch'
+            }), 400
+        
+        # Queries /api/search answered recently are served from its cache; the
+        # rest are ranked exactly as /api/search ranks them. Batch results carry
+        # no facet counts, so they are not written back to the cache
+        matcher.catalog.ensure_loaded()
+        catalog_version = matcher.catalog.version
+        parsed_specs = [matcher.parser.parse_specification(text) for text in specification_texts]
+        cached = [
+            search_cache.get(catalog_version, search_cache_key(text, parsed_spec, top_k, prefilter, min_candidates, filters))
+            for text, parsed_spec in zip(specification_texts, parsed_specs)
+        ]
+        misses = [i for i, entry in enumerate(cached) if entry is None]
+        batch_matches, _ = matcher.find_matching_phones_batch(
+            [specification_texts[i] for i in misses], top_k, prefilter, min_candidates, filters,
+            [parsed_specs[i] for i in misses]
+        )
+        
+        # Format response
+        product_fields = [field for field in fields if field in PRODUCT_FIELDS] if fields else None
+        phones_by_query = [entry['results'] if entry else None for entry in cached]
+        for i, matches in zip(misses, batch_matches):
+            phones_by_query[i] = [
+                dict(
+                    match['phone'].to_dict(product_fields),
+                    similarity_score=match['similarity_score'],
+                    matched_features=match['matched_features']
+                )
+                for match in matches
+            ]
+        results = [
+            {
+                'query': specification_text,
+                'parsed_specification': parsed_spec,
+                'total_matches': len(phones),
+                'results': [project(phone, fields) for phone in phones]
+            }
+            for specification_text, parsed_spec, phones in zip(specification_texts, parsed_specs, phones_by_query)
+        ]
+        
+        return fast_json({
+            'success': True,
+            'total_queries': len(results),
+            'results': results
+        })
+        
+    except Exception as e:
+        logger.error(f"Batch search endpoint error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Batch search failed'
+        }), 500
+
 @app.route('/api/products', methods=['GET'])
+@admit('products')
 def get_all_products():
-    """Get all products from database"""
+    """Get all products from database, optionally filtered and paginated, with facet counts"""
     try:
-        products = matcher.get_products_from_db()
-        return jsonify({
+        fields, unknown = parse_fields(request.args.get('fields'), PRODUCT_FIELDS)
+        if unknown:
+            return unknown_fields_error(unknown)
+        filters, unknown = parse_filters(request.args)
+        if unknown:
+            return unknown_buckets_error(unknown)
+        
+        # Pages are opt-in so existing clients keep receiving the whole catalog
+        limit = request.args.get('limit', type=int)
+        if limit is not None:
+            limit = min(max(limit, 1), PRODUCTS_MAX_LIMIT)
+        page = max(request.args.get('page', 1, type=int), 1) if limit else 1
+        
+        # Free text narrows the filtered rows by model or brand name
+        query = request.args.get('q', '').strip().lower()
+        predicate = (lambda product: query in product['model'].lower() or query in product['brand']) if query else None
+        products, facets = matcher.select_filtered(filters, predicate, with_facets=True)
+        page_products = products[(page - 1) * limit:page * limit] if limit else products
+        
+        return fast_json({
             'success': True,
             'total_products': len(products),
-            'products': products
+            'products': [product.to_dict(fields) for product in page_products],
+            'filters': filters,
+            'facets': facets,
+            'pagination': {
+                'page': page,
+                'limit': limit,
+                'total_pages': max((len(products) + limit - 1) // limit, 1) if limit else 1
+            }
         })
     except Exception as e:
         logger.error(f"Get products error: {str(e)}")
@@ -992,22 +2717,15 @@ def get_all_products():
         }), 500
 
 @app.route('/api/products/<product_id>', methods=['GET'])
+@admit('database')
 def get_product_details(product_id):
     """Get detailed information about a specific product"""
     try:
-        query = """
-        SELECT 
-            p.*,
-            ps.*,
-            ARRAY_AGG(pf.feature_name) as features
-        FROM products p
-        LEFT JOIN product_specs ps ON p.id = ps.product_id
-        LEFT JOIN product_features pf ON p.id = pf.product_id
-        WHERE p.id = %s
-        GROUP BY p.id, ps.id
-        """
-        
-        result = matcher.db_manager.execute_query(query, (product_id,))
+        invalid = invalid_ids([product_id])
+        if invalid:
+            return invalid_ids_error(invalid)
+        
+        result = matcher.db_manager.execute_prepared('product_details', (product_id,))
         
         if result:
             product = dict(result[0])
@@ -1028,12 +2746,41 @@ def get_product_details(product_id):
             'error': 'Failed to fetch product details'
         }), 500
 
+@app.route('/api/suggest', methods=['GET'])
+def suggest():
+    """Autocomplete suggestions for the search box"""
+    try:
+        query = request.args.get('q', '').strip()
+        limit = max(1, min(request.args.get('limit', SUGGEST_DEFAULT_LIMIT, type=int), SUGGEST_MAX_LIMIT))
+        
+        if not query:
+            return jsonify({
+                'success': True,
+                'query': query,
+                'suggestions': []
+            })
+        
+        suggestions = matcher.get_suggestion_index().suggest(query, limit)
+        
+        return jsonify({
+            'success': True,
+            'query': query,
+            'suggestions': suggestions,
+            'catalog_version': matcher.catalog.version
+        })
+        
+    except Exception as e:
+        logger.error(f"Suggest error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to fetch suggestions'
+        }), 500
+
 @app.route('/api/brands', methods=['GET'])
 def get_brands():
     """Get all unique brands from database"""
     try:
-        query = "SELECT DISTINCT brand FROM products ORDER BY brand"
-        results = matcher.db_manager.execute_query(query)
+        results = matcher.db_manager.execute_prepared('brands')
         
         brands = [row['brand'] for row in results] if results else []
         
@@ -1051,24 +2798,15 @@ def get_brands():
         }), 500
 
 @app.route('/api/price-range/<int:min_price>/<int:max_price>', methods=['GET'])
+@admit('database')
 def get_products_by_price_range(min_price, max_price):
     """Get products within a specific price range"""
     try:
-        query = """
-        SELECT p.*, ps.*, ARRAY_AGG(pf.feature_name) as features
-        FROM products p
-        LEFT JOIN product_specs ps ON p.id = ps.product_id
-        LEFT JOIN product_features pf ON p.id = pf.product_id
-        WHERE p.price BETWEEN %s AND %s
-        GROUP BY p.id, ps.id
-        ORDER BY p.price ASC
-        """
-        
-        results = matcher.db_manager.execute_query(query, (min_price, max_price))
+        results = matcher.db_manager.execute_prepared('products_by_price_range', (min_price, max_price))
         
         products = [dict(row) for row in results] if results else []
         
-        return jsonify({
+        return fast_json({
             'success': True,
             'price_range': {'min': min_price, 'max': max_price},
             'total_products': len(products),
@@ -1082,10 +2820,49 @@ def get_products_by_price_range(min_price, max_price):
             'error': 'Failed to fetch products by price range'
         }), 500
 
+# Specification fields of a price prediction request, as sent by the backend
+PREDICT_FIELDS = ['brand', 'display_size', 'processor', 'ram', 'storage', 'camera', 'battery']
+
+@app.route('/api/predict', methods=['POST'])
+@admit('search')
+def predict_price():
+    """Predict a phone's price from its specifications with the best model"""
+    try:
+        data = request.get_json(silent=True)
+        
+        if not data or not data.get('brand'):
+            return jsonify({
+                'success': False,
+                'error': 'Brand is required'
+            }), 400
+        
+        specs = {field: str(data[field]) if data.get(field) else None for field in PREDICT_FIELDS}
+        prediction = matcher.predict_price(specs)
+        
+        if prediction is None:
+            return jsonify({
+                'success': False,
+                'error': 'Model not trained yet'
+            }), 503
+        
+        return jsonify(dict(prediction, success=True))
+        
+    except Exception as e:
+        logger.error(f"Predict endpoint error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Prediction failed'
+        }), 500
+
 @app.route('/api/predictions/<user_id>', methods=['GET'])
+@admit('database')
 def get_user_predictions(user_id):
     """Get user's prediction history"""
     try:
+        invalid = invalid_ids([user_id])
+        if invalid:
+            return invalid_ids_error(invalid)
+        
         limit = request.args.get('limit', 10, type=int)
         predictions = matcher.get_user_predictions(user_id, limit)
         
@@ -1104,10 +2881,29 @@ def get_user_predictions(user_id):
         }), 500
 
 @app.route('/api/train', methods=['POST'])
+@admit('training')
 def retrain_model():
     """Retrain model with latest database data"""
     try:
-        success = matcher.train_multiple_models()
+        data = request.get_json(silent=True) or {}
+        
+        if not MODEL_SERVING:
+            return jsonify({
+                'success': False,
+                'error': 'Search shards do not train models'
+            }), 409
+        
+        if data.get('mode', 'full') == 'incremental':
+            if matcher.model_info.get('training_mode') == 'streaming':
+                return jsonify({
+                    'success': False,
+                    'error': 'Incremental updates are not available after a streaming run, retrain with mode "streaming"'
+                }), 409
+            success = matcher.train_incremental()
+        elif data.get('mode') == 'streaming':
+            success = matcher.train_streaming()
+        else:
+            success = matcher.train_multiple_models(search=bool(data.get('search', False)))
         
         if success:
             return jsonify({
@@ -1131,17 +2927,153 @@ def retrain_model():
 @app.route('/api/model/status', methods=['GET'])
 def get_model_status():
     """Get model status and information"""
-    products_count = len(matcher.get_products_from_db())
-    
+    products_count = len(matcher.catalog.table)
     return jsonify({
         'success': True,
         'model_info': matcher.model_info,
+        'telemetry_comparison': compare_latest(matcher.model_info.get('telemetry_history')),
         'model_loaded': matcher.model is not None,
         'database_products': products_count,
+        'catalog_version': matcher.catalog.version,
+        'catalog_source': matcher.catalog.source,
         'supported_brands': list(matcher.parser.brand_patterns.keys())
     })
 
+@app.route('/api/admin/memory', methods=['GET'])
+@memory_admin
+def get_memory_status():
+    """Get memory profiling status, snapshots and the latest per-stage measurements"""
+    return jsonify({
+        'success': True,
+        'memory': matcher.memory.status()
+    })
+
+@app.route('/api/admin/memory/tracing', methods=['POST'])
+@memory_admin
+def set_memory_tracing():
+    """Start or stop tracemalloc tracing on the live process"""
+    data = request.get_json(silent=True) or {}
+    frames = data.get('frames')
+    if frames is not None and (not isinstance(frames, int) or isinstance(frames, bool) or frames < 1):
+        return jsonify({
+            'success': False,
+            'error': 'frames must be a positive integer'
+        }), 400
+    
+    if data.get('enabled', True):
+        matcher.memory.start(frames)
+    else:
+        matcher.memory.stop()
+    
+    return jsonify({
+        'success': True,
+        'memory': matcher.memory.status()
+    })
+
+@app.route('/api/admin/memory/snapshot', methods=['POST'])
+@memory_admin
+def take_memory_snapshot():
+    """Capture a tracemalloc snapshot, returning its top allocations and the change since the previous one"""
+    data = request.get_json(silent=True) or {}
+    try:
+        limit = int(data.get('limit', 20))
+    except (TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'error': 'limit must be an integer'
+        }), 400
+    if limit < 1:
+        return jsonify({
+            'success': False,
+            'error': 'limit must be at least 1'
+        }), 400
+    key_type = data.get('key_type', 'lineno')
+    if key_type not in MEMORY_SNAPSHOT_KEY_TYPES:
+        return jsonify({
+            'success': False,
+            'error': f"key_type must be one of {', '.join(MEMORY_SNAPSHOT_KEY_TYPES)}"
+        }), 400
+    if not matcher.memory.enabled:
+        return jsonify({
+            'success': False,
+            'error': 'Memory profiling is not enabled, start it via /api/admin/memory/tracing'
+        }), 409
+    
+    try:
+        previous = matcher.memory.last_snapshot()
+        snapshot_id, snapshot = matcher.memory.take_snapshot()
+        
+        response = {
+            'success': True,
+            'snapshot_id': snapshot_id,
+            'top': matcher.memory.top(snapshot, limit, key_type)
+        }
+        if previous is not None:
+            response['compared_to'] = previous[0]
+            response['diff'] = matcher.memory.diff(previous[2], snapshot, limit, key_type)
+        return jsonify(response)
+        
+    except Exception as e:
+        logger.error(f"Memory snapshot error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Memory snapshot failed'
+        }), 500
+
+@app.route('/api/admin/memory/diff', methods=['GET'])
+@memory_admin
+def diff_memory_snapshots():
+    """Compare two stored tracemalloc snapshots"""
+    key_type = request.args.get('key_type', 'lineno')
+    if key_type not in MEMORY_SNAPSHOT_KEY_TYPES:
+        return jsonify({
+            'success': False,
+            'error': f"key_type must be one of {', '.join(MEMORY_SNAPSHOT_KEY_TYPES)}"
+        }), 400
+    
+    old = matcher.memory.get_snapshot(request.args.get('from', type=int))
+    new = matcher.memory.get_snapshot(request.args.get('to', type=int))
+    if old is None or new is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown snapshot id',
+            'snapshots': matcher.memory.status()['snapshots']
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'from': {'id': old[0], 'taken_at': old[1]},
+        'to': {'id': new[0], 'taken_at': new[1]},
+        'diff': matcher.memory.diff(old[2], new[2], request.args.get('limit', 20, type=int), key_type)
+    })
+
+@app.route('/api/catalog/snapshot', methods=['POST'])
+def export_catalog_snapshot():
+    """Write the current catalog to the snapshot file"""
+    try:
+        matcher.catalog.ensure_loaded()
+        header = matcher.catalog.save_snapshot()
+        if header is None:
+            return jsonify({
+                'success': False,
+                'error': 'Failed to write catalog snapshot'
+            }), 500
+        
+        return jsonify({
+            'success': True,
+            'path': CATALOG_SNAPSHOT_PATH,
+            'snapshot': header
+        })
+        
+    except Exception as e:
+        logger.error(f"Catalog snapshot error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to write catalog snapshot'
+        }), 500
+
 @app.route('/api/statistics', methods=['GET'])
+@admit('database')
 def get_statistics():
     """Get database statistics"""
     try:
@@ -1195,6 +3127,7 @@ def get_statistics():
         }), 500
 
 @app.route('/api/compare', methods=['POST'])
+@admit('database')
 def compare_products():
     """Compare multiple products by their IDs"""
     try:
@@ -1214,21 +3147,11 @@ def compare_products():
                 'error': 'At least 2 product IDs are required for comparison'
             }), 400
         
-        placeholders = ', '.join(['%s'] * len(product_ids))
-        query = f"""
-        SELECT 
-            p.*,
-            ps.*,
-            ARRAY_AGG(pf.feature_name) as features
-        FROM products p
-        LEFT JOIN product_specs ps ON p.id = ps.product_id
-        LEFT JOIN product_features pf ON p.id = pf.product_id
-        WHERE p.id IN ({placeholders})
-        GROUP BY p.id, ps.id
-        ORDER BY p.price DESC
-        """
-        
-        results = matcher.db_manager.execute_query(query, product_ids)
+        invalid = invalid_ids(product_ids)
+        if invalid:
+            return invalid_ids_error(invalid)
+        
+        results = matcher.db_manager.execute_prepared('compare_products', ([str(product_id) for product_id in product_ids],))
         
         if results:
             products = [dict(row) for row in results]
@@ -1264,49 +3187,46 @@ def compare_products():
             'error': 'Product comparison failed'
         }), 500
 
+def load_recommendations(product_id):
+    """The base product and similar products, or None when the product does not exist"""
+    # Get the base product
+    base_result = matcher.db_manager.execute_prepared('recommendation_base', (product_id,))
+    if not base_result:
+        return None
+    
+    base_product = dict(base_result[0])
+    
+    # Find similar products based on brand, price range, and specifications
+    price_min = float(base_product['price'] or 0) * 0.8  # 20% below
+    price_max = float(base_product['price'] or 1000) * 1.2  # 20% above
+    
+    recommendations_result = matcher.db_manager.execute_prepared(
+        'recommendations',
+        (base_product['price'], base_product['brand'], product_id, price_min, price_max)
+    )
+    
+    recommendations = [dict(row) for row in recommendations_result] if recommendations_result else []
+    return base_product, recommendations
+
 @app.route('/api/recommendations/<product_id>', methods=['GET'])
+@admit('database')
 def get_recommendations(product_id):
     """Get product recommendations based on a specific product"""
     try:
-        # Get the base product
-        base_product_query = """
-        SELECT p.*, ps.* FROM products p
-        LEFT JOIN product_specs ps ON p.id = ps.product_id
-        WHERE p.id = %s
-        """
+        invalid = invalid_ids([product_id])
+        if invalid:
+            return invalid_ids_error(invalid)
         
-        base_result = matcher.db_manager.execute_query(base_product_query, (product_id,))
+        # Concurrent requests for the same product share one pair of queries
+        found = recommendation_flight.do(product_id, load_recommendations, product_id)
         
-        if not base_result:
+        if not found:
             return jsonify({
                 'success': False,
                 'error': 'Product not found'
             }), 404
         
-        base_product = dict(base_result[0])
-        
-        # Find similar products based on brand, price range, and specifications
-        price_min = (base_product['price'] or 0) * 0.8  # 20% below
-        price_max = (base_product['price'] or 1000) * 1.2  # 20% above
-        
-        recommendations_query = """
-        SELECT p.*, ps.*, 
-               ABS(p.price - %s) as price_diff,
-               CASE WHEN p.brand = %s THEN 1 ELSE 0 END as same_brand
-        FROM products p
-        LEFT JOIN product_specs ps ON p.id = ps.product_id
-        WHERE p.id != %s 
-        AND p.price BETWEEN %s AND %s
-        ORDER BY same_brand DESC, price_diff ASC
-        LIMIT 5
-        """
-        
-        recommendations_result = matcher.db_manager.execute_query(
-            recommendations_query, 
-            (base_product['price'], base_product['brand'], product_id, price_min, price_max)
-        )
-        
-        recommendations = [dict(row) for row in recommendations_result] if recommendations_result else []
+        base_product, recommendations = found
         
         return jsonify({
             'success': True,
@@ -1315,6 +3235,8 @@ def get_recommendations(product_id):
             'recommendation_count': len(recommendations)
         })
         
+    except CoalescingTimeout as e:
+        return coalescing_timeout_error(e)
     except Exception as e:
         logger.error(f"Get recommendations error: {str(e)}")
         return jsonify({
@@ -1338,14 +3260,18 @@ def internal_error(error):
 
 if __name__ == '__main__':
     # Load or train model on startup
-    matcher.load_model()
+    if MODEL_SERVING:
+        matcher.load_model()
+        matcher.start_bundle_watch()
+    matcher.start_catalog_sync()
+    health_prober.ensure_started()
     
     # Start Flask app
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('DEBUG', 'False').lower() == 'true'
     
     logger.info(f"Starting Mobile Specification Matching API with PostgreSQL on port {port}")
-    products_count = len(matcher.get_products_from_db())
+    products_count = len(matcher.catalog.snapshot())
     logger.info(f"Connected to database with {products_count} products")
     
     app.run(host='0.0.0.0', port=port, debug=debug)
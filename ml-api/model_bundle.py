@@ -0,0 +1,104 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FILE = 'bundle.joblib'
+INFO_FILE = 'model_info.json'
+LATEST_FILE = 'LATEST'
+
+
+def new_bundle_version():
+    # Versions sort in publishing order, which pruning relies on, so they
+    # carry microseconds: bundles can be published within the same second
+    return f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:6]}"
+
+
+def write_bundle(directory, payload, model_info, keep=5):
+    """Write a versioned bundle, then point LATEST at it; returns the version"""
+    version = new_bundle_version()
+    os.makedirs(directory, exist_ok=True)
+
+    # Build the version directory under a temporary name so watchers never
+    # see a partial bundle, then publish it by rewriting LATEST atomically
+    tmp_dir = os.path.join(directory, f".{version}.tmp")
+    os.makedirs(tmp_dir)
+    joblib.dump(payload, os.path.join(tmp_dir, BUNDLE_FILE))
+    with open(os.path.join(tmp_dir, INFO_FILE), 'w') as f:
+        json.dump(dict(model_info, bundle_version=version), f, indent=2, default=str)
+    os.replace(tmp_dir, os.path.join(directory, version))
+
+    tmp_latest = os.path.join(directory, f".{LATEST_FILE}.{version}.tmp")
+    with open(tmp_latest, 'w') as f:
+        f.write(version)
+    os.replace(tmp_latest, os.path.join(directory, LATEST_FILE))
+
+    prune_bundles(directory, keep)
+    logger.info(f"Published model bundle {version} to {directory}")
+    return version
+
+
+def prune_bundles(directory, keep):
+    """Remove all but the newest keep bundles; the one LATEST names is always kept"""
+    latest = latest_version(directory)
+    versions = sorted(
+        name for name in os.listdir(directory)
+        if not name.startswith('.') and os.path.isdir(os.path.join(directory, name))
+    )
+    for version in versions[:-keep] if keep else []:
+        if version != latest:
+            shutil.rmtree(os.path.join(directory, version), ignore_errors=True)
+
+
+def latest_version(directory):
+    try:
+        with open(os.path.join(directory, LATEST_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_bundle(directory, version):
+    return joblib.load(os.path.join(directory, version, BUNDLE_FILE))
+
+
+class ModelBundleWatcher(threading.Thread):
+    """Poll a shared bundle directory and hand each newly published bundle to a callback"""
+
+    def __init__(self, directory, on_bundle, interval=10, current_version=None):
+        # on_bundle(version, payload) swaps the bundle into the serving process
+        super().__init__(name='model-bundle-watcher', daemon=True)
+        self.directory = directory
+        self.on_bundle = on_bundle
+        self.interval = interval
+        self.current_version = current_version
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def check(self):
+        """Load the latest bundle if it changed; a bad bundle is skipped until the next one"""
+        version = latest_version(self.directory)
+        if not version or version == self.current_version:
+            return False
+
+        try:
+            payload = read_bundle(self.directory, version)
+            self.on_bundle(version, payload)
+            logger.info(f"Switched to model bundle {version}")
+        except Exception as e:
+            logger.error(f"Model bundle {version} load error: {str(e)}")
+        self.current_version = version
+        return True
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.check()
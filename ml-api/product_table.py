@@ -0,0 +1,310 @@
+import json
+from collections.abc import Mapping
+
+import numpy as np
+
+# Field order of a product as returned by the API
+PRODUCT_FIELDS = [
+    'id', 'brand', 'model', 'price', 'rating', 'reviews', 'description', 'image_url',
+    'display_size', 'display_size_numeric', 'processor', 'processor_score',
+    'ram', 'ram_numeric', 'storage', 'storage_numeric', 'camera', 'camera_numeric',
+    'battery', 'battery_numeric', 'operating_system', 'price_range', 'reviews_count_log',
+    'features', 'specifications'
+]
+
+NUMERIC_COLUMNS = {
+    'price': np.float64,
+    'rating': np.float64,
+    'reviews': np.int64,
+    'display_size_numeric': np.float64,
+    'processor_score': np.int16,
+    'ram_numeric': np.float32,
+    'storage_numeric': np.float32,
+    'camera_numeric': np.float32,
+    'battery_numeric': np.float32,
+    'price_range': np.int8,
+    'reviews_count_log': np.float64
+}
+
+# Low-cardinality strings stored as integer codes into a shared dictionary
+CATEGORICAL_COLUMNS = [
+    'brand', 'processor', 'operating_system', 'display_size', 'ram', 'storage', 'camera', 'battery'
+]
+
+OBJECT_COLUMNS = ['id', 'model', 'description', 'image_url', 'features']
+
+# Bump whenever the columns or their encoding in snapshot files change
+SNAPSHOT_SCHEMA_VERSION = 2
+
+
+def _save_strings(arrays, key, values):
+    """Store optional strings as a string array plus a mask of the missing ones"""
+    arrays[key] = np.array(['' if value is None else value for value in values], dtype=str)
+    arrays[f"{key}.null"] = np.array([value is None for value in values], dtype=bool)
+
+
+def _load_strings(data, key):
+    values = data[key].tolist()
+    for position in np.flatnonzero(data[f"{key}.null"]):
+        values[position] = None
+    return values
+
+
+class StringDictionary:
+    """Dictionary encoding for repeated strings"""
+
+    def __init__(self, values=None):
+        self.values = []
+        self.codes = {}
+        for value in values or []:
+            self.encode(value)
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.codes[value] = code
+        return code
+
+    def decode(self, code):
+        return self.values[code]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class ProductRow(Mapping):
+    """Read-only view of one table row, materialized field by field"""
+
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def __getitem__(self, key):
+        return self.table.value(self.index, key)
+
+    def __iter__(self):
+        return iter(PRODUCT_FIELDS)
+
+    def __len__(self):
+        return len(PRODUCT_FIELDS)
+
+    def to_dict(self, fields=None):
+        return {field: self.table.value(self.index, field) for field in (fields or PRODUCT_FIELDS)}
+
+    def copy(self):
+        return self.to_dict()
+
+
+class ProductTable:
+    """Columnar product storage with typed numeric columns and encoded strings"""
+
+    def __init__(self, capacity=0):
+        self.size = 0
+        self.live_count = 0
+        self.numeric = {name: np.zeros(capacity, dtype=dtype) for name, dtype in NUMERIC_COLUMNS.items()}
+        self.categorical = {name: np.zeros(capacity, dtype=np.int32) for name in CATEGORICAL_COLUMNS}
+        self.dictionaries = {name: StringDictionary() for name in CATEGORICAL_COLUMNS}
+        self.objects = {name: np.empty(capacity, dtype=object) for name in OBJECT_COLUMNS}
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    @classmethod
+    def from_products(cls, products):
+        """Build a table from an iterable of product mappings"""
+        table = cls()
+        numeric = {name: [] for name in NUMERIC_COLUMNS}
+        categorical = {name: [] for name in CATEGORICAL_COLUMNS}
+        objects = {name: [] for name in OBJECT_COLUMNS}
+
+        for product in products:
+            for name in NUMERIC_COLUMNS:
+                numeric[name].append(product[name])
+            for name in CATEGORICAL_COLUMNS:
+                categorical[name].append(table.dictionaries[name].encode(product[name]))
+            for name in OBJECT_COLUMNS:
+                value = product[name]
+                objects[name].append(tuple(value) if name == 'features' else value)
+
+        size = len(objects['id'])
+        table.numeric = {name: np.array(values, dtype=NUMERIC_COLUMNS[name]) for name, values in numeric.items()}
+        table.categorical = {name: np.array(codes, dtype=np.int32) for name, codes in categorical.items()}
+        table.objects = {}
+        for name, values in objects.items():
+            column = np.empty(size, dtype=object)
+            column[:] = values
+            table.objects[name] = column
+        table.alive = np.ones(size, dtype=bool)
+        table.size = table.live_count = size
+        return table
+
+    def __len__(self):
+        return self.live_count
+
+    def _ensure_capacity(self, capacity):
+        current = len(self.alive)
+        if capacity <= current:
+            return
+        new_capacity = max(capacity, current * 2, 16)
+
+        def grow(array):
+            grown = np.zeros(new_capacity, dtype=array.dtype) if array.dtype != object else np.empty(new_capacity, dtype=object)
+            grown[:current] = array
+            return grown
+
+        self.numeric = {name: grow(array) for name, array in self.numeric.items()}
+        self.categorical = {name: grow(array) for name, array in self.categorical.items()}
+        self.objects = {name: grow(array) for name, array in self.objects.items()}
+        self.alive = grow(self.alive)
+
+    def _write(self, row, product):
+        for name in NUMERIC_COLUMNS:
+            self.numeric[name][row] = product[name]
+        for name in CATEGORICAL_COLUMNS:
+            self.categorical[name][row] = self.dictionaries[name].encode(product[name])
+        for name in OBJECT_COLUMNS:
+            value = product[name]
+            self.objects[name][row] = tuple(value) if name == 'features' else value
+
+    def append(self, product):
+        """Append a product and return its row id"""
+        row = self.size
+        self._ensure_capacity(row + 1)
+        self._write(row, product)
+        self.alive[row] = True
+        self.size += 1
+        self.live_count += 1
+        return row
+
+    def update_row(self, row, product):
+        self._write(row, product)
+
+    def delete_row(self, row):
+        """Tombstone a row so existing row ids stay valid"""
+        if self.alive[row]:
+            self.alive[row] = False
+            self.live_count -= 1
+
+    def value(self, row, field):
+        if field in self.numeric:
+            return self.numeric[field][row].item()
+        if field in self.categorical:
+            return self.dictionaries[field].values[self.categorical[field][row]]
+        if field == 'features':
+            return list(self.objects['features'][row])
+        if field in self.objects:
+            return self.objects[field][row]
+        if field == 'specifications':
+            values = [self.value(row, name) for name in ['brand', 'model', 'display_size', 'ram', 'storage', 'camera', 'battery']]
+            return "{} {} with {} {} {} {} {}".format(*values)
+        raise KeyError(field)
+
+    def row(self, row):
+        return ProductRow(self, row)
+
+    def alive_rows(self):
+        return np.flatnonzero(self.alive[:self.size])
+
+    def rows(self):
+        """Views over every live row"""
+        return [ProductRow(self, row) for row in self.alive_rows()]
+
+    def column(self, name):
+        """Column values for all live rows, decoding strings when needed"""
+        rows = self.alive_rows()
+        if name in self.numeric:
+            return self.numeric[name][rows]
+        if name in self.categorical:
+            return np.array(self.dictionaries[name].values, dtype=object)[self.categorical[name][rows]]
+        return self.objects[name][rows]
+
+    def take(self, rows):
+        """New compact table holding copies of the given rows"""
+        rows = np.asarray(rows, dtype=np.int64)
+        table = ProductTable()
+        table.numeric = {name: array[rows] for name, array in self.numeric.items()}
+        table.categorical = {name: array[rows] for name, array in self.categorical.items()}
+        table.dictionaries = {name: StringDictionary(d.values) for name, d in self.dictionaries.items()}
+        table.objects = {name: array[rows] for name, array in self.objects.items()}
+        table.alive = np.ones(len(rows), dtype=bool)
+        table.size = table.live_count = len(rows)
+        return table
+
+    def compact(self):
+        return self.take(self.alive_rows())
+
+    def concat(self, other):
+        """New table with the live rows of both tables"""
+        left, right = self.compact(), other.compact()
+        table = ProductTable()
+        table.dictionaries = left.dictionaries
+        table.numeric = {name: np.concatenate([left.numeric[name], right.numeric[name]]) for name in NUMERIC_COLUMNS}
+        table.categorical = {}
+        for name in CATEGORICAL_COLUMNS:
+            # Re-encode the right-hand codes into the left-hand dictionary
+            mapping = np.array([table.dictionaries[name].encode(value) for value in right.dictionaries[name].values], dtype=np.int32)
+            right_codes = mapping[right.categorical[name]] if len(mapping) else right.categorical[name]
+            table.categorical[name] = np.concatenate([left.categorical[name], right_codes])
+        table.objects = {name: np.concatenate([left.objects[name], right.objects[name]]) for name in OBJECT_COLUMNS}
+        table.size = table.live_count = left.size + right.size
+        table.alive = np.ones(table.size, dtype=bool)
+        return table
+
+    def nbytes(self):
+        """Approximate memory held by the column arrays"""
+        arrays = list(self.numeric.values()) + list(self.categorical.values()) + list(self.objects.values())
+        return sum(array.nbytes for array in arrays) + self.alive.nbytes
+
+    def save_snapshot(self, path, metadata=None):
+        """Write the live rows to an uncompressed npz file without pickled objects"""
+        table = self.compact()
+        arrays = {f"numeric.{name}": array for name, array in table.numeric.items()}
+        for name in CATEGORICAL_COLUMNS:
+            arrays[f"codes.{name}"] = table.categorical[name]
+            _save_strings(arrays, f"dictionary.{name}", table.dictionaries[name].values)
+        for name in OBJECT_COLUMNS:
+            if name == 'features':
+                # Ragged lists are stored flat with per-row offsets
+                lengths = [len(features) for features in table.objects['features']]
+                arrays['features.values'] = np.array([feature for features in table.objects['features'] for feature in features], dtype=str)
+                arrays['features.offsets'] = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+            else:
+                _save_strings(arrays, f"object.{name}", table.objects[name])
+        header = dict(metadata or {}, schema_version=SNAPSHOT_SCHEMA_VERSION, rows=table.size)
+        arrays['header'] = np.array(json.dumps(header))
+
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+        return header
+
+    @classmethod
+    def load_snapshot(cls, path):
+        """Read a snapshot written by save_snapshot, returning (table, header)"""
+        with np.load(path, allow_pickle=False) as data:
+            header = json.loads(data['header'].item())
+            if header.get('schema_version') != SNAPSHOT_SCHEMA_VERSION:
+                raise ValueError(
+                    f"Snapshot schema version {header.get('schema_version')} does not match {SNAPSHOT_SCHEMA_VERSION}"
+                )
+
+            table = cls()
+            size = int(header['rows'])
+            table.numeric = {name: data[f"numeric.{name}"].astype(dtype, copy=False) for name, dtype in NUMERIC_COLUMNS.items()}
+            table.categorical = {name: data[f"codes.{name}"] for name in CATEGORICAL_COLUMNS}
+            table.dictionaries = {name: StringDictionary(_load_strings(data, f"dictionary.{name}")) for name in CATEGORICAL_COLUMNS}
+            table.objects = {}
+            for name in OBJECT_COLUMNS:
+                column = np.empty(size, dtype=object)
+                if name == 'features':
+                    values = data['features.values'].tolist()
+                    offsets = data['features.offsets'].tolist()
+                    column[:] = [tuple(values[offsets[i]:offsets[i + 1]]) for i in range(size)]
+                else:
+                    column[:] = _load_strings(data, f"object.{name}")
+                table.objects[name] = column
+
+        table.alive = np.ones(size, dtype=bool)
+        table.size = table.live_count = size
+        return table, header
@@ -0,0 +1,133 @@
+"""SQL used by the ml-api.
+
+Features are folded into one array per product before they are joined, so a
+product's columns are never repeated once per feature and no outer GROUP BY
+is needed. Full catalog reads aggregate product_features once with a hash
+aggregate; lookups of a few products use a LATERAL subquery that reads only
+their rows through idx_product_features_product_id.
+"""
+
+# Columns of a catalog product as consumed by build_product
+CATALOG_COLUMNS = """
+    p.id,
+    p.name as model,
+    p.brand,
+    p.price,
+    p.rating,
+    p.reviews,
+    p.description,
+    p.image_url,
+    ps.display_size,
+    ps.processor,
+    ps.ram,
+    ps.storage,
+    ps.camera,
+    ps.battery,
+    ps.operating_system,
+    COALESCE(pf.features, '{}') as features"""
+
+# Specification columns; ps.* would also overwrite the product's id and created_at
+SPEC_COLUMNS = """
+    ps.product_id,
+    ps.display_size,
+    ps.processor,
+    ps.ram,
+    ps.storage,
+    ps.camera,
+    ps.battery,
+    ps.operating_system"""
+
+FEATURES_BY_PRODUCT_JOIN = """
+LEFT JOIN (
+    SELECT product_id, ARRAY_AGG(feature_name) as features
+    FROM product_features
+    GROUP BY product_id
+) pf ON pf.product_id = p.id"""
+
+FEATURES_LATERAL_JOIN = """
+LEFT JOIN LATERAL (
+    SELECT ARRAY_AGG(feature_name) as features
+    FROM product_features
+    WHERE product_id = p.id
+) pf ON TRUE"""
+
+# Whole catalog, streamed through a server-side cursor
+PRODUCTS_QUERY = f"""
+SELECT {CATALOG_COLUMNS}
+FROM products p
+LEFT JOIN product_specs ps ON p.id = ps.product_id
+{FEATURES_BY_PRODUCT_JOIN}
+ORDER BY p.created_at DESC
+"""
+
+# The pre-aggregation replaced this form; kept for the query benchmark
+LEGACY_PRODUCTS_QUERY = """
+SELECT p.id, p.name as model, p.brand, p.price, p.rating, p.reviews, p.description, p.image_url,
+       ps.display_size, ps.processor, ps.ram, ps.storage, ps.camera, ps.battery, ps.operating_system,
+       ARRAY_AGG(pf.feature_name) as features
+FROM products p
+LEFT JOIN product_specs ps ON p.id = ps.product_id
+LEFT JOIN product_features pf ON p.id = pf.product_id
+GROUP BY p.id, ps.id
+ORDER BY p.created_at DESC
+"""
+
+# Named prepared statements: name -> (parameter types, statement using $n)
+PREPARED_STATEMENTS = {
+    'products_by_ids': (['uuid[]'], f"""
+        SELECT {CATALOG_COLUMNS}
+        FROM products p
+        LEFT JOIN product_specs ps ON p.id = ps.product_id
+        {FEATURES_LATERAL_JOIN}
+        WHERE p.id = ANY($1)
+    """),
+    'product_details': (['uuid'], f"""
+        SELECT p.*, {SPEC_COLUMNS}, COALESCE(pf.features, '{{}}') as features
+        FROM products p
+        LEFT JOIN product_specs ps ON p.id = ps.product_id
+        {FEATURES_LATERAL_JOIN}
+        WHERE p.id = $1
+    """),
+    'products_by_price_range': (['numeric', 'numeric'], f"""
+        SELECT p.*, {SPEC_COLUMNS}, COALESCE(pf.features, '{{}}') as features
+        FROM products p
+        LEFT JOIN product_specs ps ON p.id = ps.product_id
+        {FEATURES_LATERAL_JOIN}
+        WHERE p.price BETWEEN $1 AND $2
+        ORDER BY p.price ASC
+    """),
+    'compare_products': (['uuid[]'], f"""
+        SELECT p.*, {SPEC_COLUMNS}, COALESCE(pf.features, '{{}}') as features
+        FROM products p
+        LEFT JOIN product_specs ps ON p.id = ps.product_id
+        {FEATURES_LATERAL_JOIN}
+        WHERE p.id = ANY($1)
+        ORDER BY p.price DESC
+    """),
+    'recommendation_base': (['uuid'], f"""
+        SELECT p.*, {SPEC_COLUMNS}
+        FROM products p
+        LEFT JOIN product_specs ps ON p.id = ps.product_id
+        WHERE p.id = $1
+    """),
+    'recommendations': (['numeric', 'text', 'uuid', 'numeric', 'numeric'], f"""
+        SELECT p.*, {SPEC_COLUMNS},
+               ABS(p.price - $1) as price_diff,
+               CASE WHEN p.brand = $2 THEN 1 ELSE 0 END as same_brand
+        FROM products p
+        LEFT JOIN product_specs ps ON p.id = ps.product_id
+        WHERE p.id != $3
+        AND p.price BETWEEN $4 AND $5
+        ORDER BY same_brand DESC, price_diff ASC
+        LIMIT 5
+    """),
+    'user_predictions': (['uuid', 'integer'], """
+        SELECT * FROM predictions
+        WHERE user_id = $1
+        ORDER BY created_at DESC
+        LIMIT $2
+    """),
+    'brands': ([], """
+        SELECT DISTINCT brand FROM products ORDER BY brand
+    """)
+}
@@ -0,0 +1,398 @@
+import bisect
+import heapq
+import logging
+import re
+import threading
+from collections import Counter, defaultdict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class CandidateIndex:
+    """Brand inverted index and price-sorted rows used to narrow search candidates"""
+
+    def __init__(self):
+        self.brand_rows = defaultdict(set)
+        self.price_rows = []  # sorted (price, row) pairs
+
+    def rebuild(self, table):
+        rows = table.alive_rows()
+        brand_codes = table.categorical['brand'][rows]
+        brands = table.dictionaries['brand'].values
+        self.brand_rows = defaultdict(set)
+        for row, code in zip(rows.tolist(), brand_codes.tolist()):
+            self.brand_rows[brands[code]].add(row)
+        prices = table.numeric['price'][rows]
+        order = np.lexsort((rows, prices))
+        self.price_rows = list(zip(prices[order].tolist(), rows[order].tolist()))
+
+    def add_row(self, row, product):
+        self.brand_rows[product['brand']].add(row)
+        bisect.insort(self.price_rows, (product['price'], row))
+
+    def remove_row(self, row, product):
+        rows = self.brand_rows.get(product['brand'])
+        if rows is not None:
+            rows.discard(row)
+            if not rows:
+                del self.brand_rows[product['brand']]
+        position = bisect.bisect_left(self.price_rows, (product['price'], row))
+        if position < len(self.price_rows) and self.price_rows[position] == (product['price'], row):
+            del self.price_rows[position]
+
+    def rows_for_brand(self, brand):
+        return set(self.brand_rows.get(brand, ()))
+
+    def rows_in_price_range(self, min_price, max_price):
+        start = bisect.bisect_left(self.price_rows, (min_price, -1))
+        end = bisect.bisect_right(self.price_rows, (max_price, float('inf')))
+        return {row for _, row in self.price_rows[start:end]}
+
+    def candidates(self, brand=None, price=None, tolerance=0.3):
+        """Rows matching the brand and a price band, or None when nothing narrows the search"""
+        rows = None
+        if brand and brand != 'unknown':
+            rows = self.rows_for_brand(brand)
+        if price:
+            price_rows = self.rows_in_price_range(price * (1 - tolerance), price * (1 + tolerance))
+            rows = price_rows if rows is None else rows & price_rows
+        return rows
+
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(bits):
+        return int(np.bitwise_count(bits).sum())
+else:
+    POPCOUNT_TABLE = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+    def popcount(bits):
+        return int(POPCOUNT_TABLE[bits].sum(dtype=np.int64))
+
+
+class BitmapIndex:
+    """Packed row bitsets per brand, feature and price bucket for filtering and facet counts"""
+
+    DIMENSIONS = ('brand', 'feature', 'price_bucket')
+    # Dimensions whose listed values are alternatives; features must all match
+    DISJUNCTIVE = ('brand', 'price_bucket')
+
+    def __init__(self, price_buckets):
+        # price_buckets maps a product's price_range code to its bucket label
+        self.price_buckets = price_buckets
+        self.capacity = 0  # rows covered by every bitset, a multiple of 8
+        self.alive = np.zeros(0, dtype=np.uint8)
+        self.bitsets = {dimension: {} for dimension in self.DIMENSIONS}
+
+    def _keys(self, product):
+        yield 'brand', product['brand']
+        for feature in product['features'] or ():
+            yield 'feature', feature.strip().lower()
+        bucket = self.price_buckets.get(int(product['price_range']))
+        if bucket:
+            yield 'price_bucket', bucket
+
+    def _ensure_capacity(self, rows):
+        if rows <= self.capacity:
+            return
+        capacity = max(rows, self.capacity * 2, 64)
+        capacity += -capacity % 8
+        pad = capacity // 8 - len(self.alive)
+        self.alive = np.concatenate([self.alive, np.zeros(pad, dtype=np.uint8)])
+        for bitsets in self.bitsets.values():
+            for key, bits in bitsets.items():
+                bitsets[key] = np.concatenate([bits, np.zeros(pad, dtype=np.uint8)])
+        self.capacity = capacity
+
+    def _bitset(self, dimension, key):
+        bits = self.bitsets[dimension].get(key)
+        if bits is None:
+            bits = self.bitsets[dimension][key] = np.zeros(self.capacity // 8, dtype=np.uint8)
+        return bits
+
+    def rebuild(self, table):
+        self.capacity = 0
+        self.alive = np.zeros(0, dtype=np.uint8)
+        self.bitsets = {dimension: {} for dimension in self.DIMENSIONS}
+        self._ensure_capacity(table.size)
+
+        rows = table.alive_rows()
+        self.alive = self.pack(rows)
+
+        brand_codes = table.categorical['brand'][rows]
+        for code, brand in enumerate(table.dictionaries['brand'].values):
+            brand_rows = rows[brand_codes == code]
+            if len(brand_rows):
+                self.bitsets['brand'][brand] = self.pack(brand_rows)
+
+        buckets = table.numeric['price_range'][rows]
+        for code, label in self.price_buckets.items():
+            bucket_rows = rows[buckets == code]
+            if len(bucket_rows):
+                self.bitsets['price_bucket'][label] = self.pack(bucket_rows)
+
+        feature_rows = defaultdict(list)
+        for row, features in zip(rows.tolist(), table.objects['features'][rows]):
+            for feature in features or ():
+                feature_rows[feature.strip().lower()].append(row)
+        for feature, rows_with_feature in feature_rows.items():
+            self.bitsets['feature'][feature] = self.pack(rows_with_feature)
+
+    def add_row(self, row, product):
+        self._ensure_capacity(row + 1)
+        byte, mask = row >> 3, np.uint8(1 << (row & 7))
+        self.alive[byte] |= mask
+        for dimension, key in self._keys(product):
+            self._bitset(dimension, key)[byte] |= mask
+
+    def remove_row(self, row, product):
+        if row >= self.capacity:
+            return
+        byte, mask = row >> 3, np.uint8(~(1 << (row & 7)) & 0xFF)
+        self.alive[byte] &= mask
+        for dimension, key in self._keys(product):
+            bits = self.bitsets[dimension].get(key)
+            if bits is not None:
+                bits[byte] &= mask
+
+    def pack(self, rows):
+        """Bitset with the given rows set"""
+        rows = np.asarray(rows, dtype=np.int64)
+        mask = np.zeros(self.capacity, dtype=bool)
+        # Rows of a table replaced since they were selected fall outside the bitsets
+        mask[rows[rows < self.capacity]] = True
+        return np.packbits(mask, bitorder='little')
+
+    def rows(self, bits):
+        """Sorted row numbers of the set bits"""
+        return np.flatnonzero(np.unpackbits(bits, bitorder='little'))
+
+    def select(self, filters):
+        """Bitset of live rows with any of the listed brands and buckets and all listed features"""
+        bits = self.alive.copy()
+        for dimension, values in filters.items():
+            if not values:
+                continue
+            bitsets = self.bitsets[dimension]
+            empty = np.zeros_like(bits)
+            if dimension == 'feature':
+                for value in values:
+                    bits &= bitsets.get(value, empty)
+            else:
+                union = empty
+                for value in values:
+                    union = union | bitsets.get(value, empty)
+                bits &= union
+        return bits
+
+    def count(self, bits):
+        return popcount(bits)
+
+    def facets(self, bits, dimensions=None):
+        """Per value counts of the rows in bits, for every dimension or the given ones"""
+        counts = {}
+        for dimension in dimensions or self.DIMENSIONS:
+            bitsets = self.bitsets[dimension]
+            dimension_counts = {}
+            for key, key_bits in bitsets.items():
+                count = popcount(bits & key_bits)
+                if count:
+                    dimension_counts[key] = count
+            counts[dimension] = dict(sorted(dimension_counts.items(), key=lambda item: (-item[1], item[0])))
+        return counts
+
+    def disjunctive_facets(self, filters, restrict=None):
+        """Facet counts for filters, each disjunctive dimension counted with its own filter left out"""
+        # A count then says how many rows choosing that value would add. A
+        # feature count over the selection already says how many remain when
+        # it is added, as features narrow each other. restrict, if given,
+        # is a bitset every counted row must also be in
+        selected = self.select(filters)
+        counts = {}
+        for dimension in self.DIMENSIONS:
+            bits = selected
+            if dimension in self.DISJUNCTIVE and filters.get(dimension):
+                bits = self.select({name: values for name, values in filters.items() if name != dimension})
+            if restrict is not None:
+                bits = bits & restrict
+            counts.update(self.facets(bits, [dimension]))
+        return counts
+
+
+def trigrams(term):
+    padded = f"^{term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, max_distance):
+    """Optimal string alignment distance, giving up once it exceeds max_distance"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class FuzzyTermIndex:
+    """Trigram index resolving misspelled brand aliases and model name tokens to a brand"""
+
+    def __init__(self, brand_aliases, max_candidates=20):
+        # brand_aliases maps alias -> brand and is always indexed
+        self.brand_aliases = {self.normalize(alias): brand for alias, brand in brand_aliases.items()}
+        self.max_candidates = max_candidates
+        self.term_brands = defaultdict(Counter)
+        self.trigram_terms = defaultdict(set)
+        self.lock = threading.Lock()
+        self._reset()
+
+    @staticmethod
+    def normalize(term):
+        return term.lower().replace('+', 'plus').replace(' ', '')
+
+    @staticmethod
+    def model_tokens(model):
+        return {token for token in re.findall(r'[a-z][a-z0-9]+', (model or '').lower()) if len(token) >= 3}
+
+    def _reset(self):
+        self.term_brands = defaultdict(Counter)
+        self.trigram_terms = defaultdict(set)
+        for alias, brand in self.brand_aliases.items():
+            self._add_term(alias, brand)
+
+    def _add_term(self, term, brand):
+        if not self.term_brands[term]:
+            for gram in trigrams(term):
+                self.trigram_terms[gram].add(term)
+        self.term_brands[term][brand] += 1
+
+    def _remove_term(self, term, brand):
+        brands = self.term_brands.get(term)
+        if not brands or not brands[brand]:
+            return
+        brands[brand] -= 1
+        if brands[brand] <= 0:
+            del brands[brand]
+        if not brands:
+            del self.term_brands[term]
+            for gram in trigrams(term):
+                self.trigram_terms[gram].discard(term)
+
+    def rebuild(self, table):
+        with self.lock:
+            self._reset()
+            brands = table.dictionaries['brand'].values
+            for row in table.alive_rows():
+                brand = brands[table.categorical['brand'][row]]
+                for token in self.model_tokens(table.objects['model'][row]):
+                    self._add_term(token, brand)
+
+    def add_row(self, row, product):
+        with self.lock:
+            for token in self.model_tokens(product['model']):
+                self._add_term(token, product['brand'])
+
+    def remove_row(self, row, product):
+        with self.lock:
+            for token in self.model_tokens(product['model']):
+                self._remove_term(token, product['brand'])
+
+    def resolve(self, token, max_distance=None):
+        """Nearest indexed term within the edit-distance bound, as (term, brand, distance)"""
+        token = self.normalize(token)
+        if max_distance is None:
+            # Very short tokens only match exactly, longer ones tolerate more edits
+            max_distance = 0 if len(token) <= 3 else 1 if len(token) <= 5 else 2
+
+        with self.lock:
+            if self.term_brands.get(token):
+                # A correctly spelled term never falls through to a neighbouring one
+                brand = self._brand_for(token)
+                return (token, brand, 0) if brand else None
+
+            shared = Counter()
+            for gram in trigrams(token):
+                for term in self.trigram_terms.get(gram, ()):
+                    shared[term] += 1
+
+            best = None
+            for term, common in shared.most_common(self.max_candidates):
+                brand = self._brand_for(term)
+                if brand is None:
+                    continue
+                distance = edit_distance(token, term, max_distance)
+                if distance <= max_distance and (best is None or distance < best[2]):
+                    best = (term, brand, distance)
+            return best
+
+    def _brand_for(self, term):
+        # Brand aliases are authoritative; model tokens such as 'pro' or 'ultra'
+        # that are shared by several brands do not identify one
+        if term in self.brand_aliases:
+            return self.brand_aliases[term]
+        brands = self.term_brands[term]
+        return next(iter(brands)) if len(brands) == 1 else None
+
+
+class SuggestionIndex:
+    """Sorted-array prefix index of autocomplete suggestions ranked by popularity"""
+
+    def __init__(self, entries, precomputed_prefix_length=3, precomputed_limit=50):
+        # entries are (text, kind, score, extra) tuples; every word suffix of a
+        # text is indexed so 's24' finds 'Galaxy S24 Ultra'
+        self.suggestions = []
+        keyed = []
+        for text, kind, score, extra in entries:
+            position = len(self.suggestions)
+            self.suggestions.append(dict(extra, text=text, type=kind, score=float(score)))
+            words = self.normalize(text).split()
+            for start in range(len(words)):
+                keyed.append((' '.join(words[start:]), position))
+        keyed.sort()
+        self.keys = [key for key, _ in keyed]
+        self.positions = [position for _, position in keyed]
+
+        # Short prefixes match a large slice of the array, so their top
+        # suggestions are ranked once here instead of on every keystroke
+        self.precomputed_limit = precomputed_limit
+        self.top_by_prefix = {}
+        buckets = defaultdict(set)
+        for key, position in keyed:
+            for length in range(1, min(precomputed_prefix_length, len(key)) + 1):
+                buckets[key[:length]].add(position)
+        for prefix, positions in buckets.items():
+            self.top_by_prefix[prefix] = self._rank(positions, precomputed_limit)
+
+    @staticmethod
+    def normalize(text):
+        return ' '.join(re.findall(r'[a-z0-9+.]+', (text or '').lower()))
+
+    def _rank(self, positions, limit):
+        return heapq.nlargest(limit, positions, key=lambda position: (self.suggestions[position]['score'], -position))
+
+    def __len__(self):
+        return len(self.suggestions)
+
+    def suggest(self, prefix, limit=10):
+        """Best suggestions whose text, or any word suffix of it, starts with prefix"""
+        prefix = self.normalize(prefix)
+        if not prefix:
+            return []
+
+        if prefix in self.top_by_prefix and limit <= self.precomputed_limit:
+            ranked = self.top_by_prefix[prefix][:limit]
+        else:
+            start = bisect.bisect_left(self.keys, prefix)
+            end = bisect.bisect_left(self.keys, prefix + '\uffff', start)
+            ranked = self._rank(set(self.positions[start:end]), limit)
+        return [self.suggestions[position] for position in ranked]
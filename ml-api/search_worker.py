@@ -0,0 +1,26 @@
+"""Worker processes of the hyperparameter search.
+
+Candidates are fitted in a process pool rather than threads so fits still
+running when the search budget runs out can be terminated instead of
+competing with serving for CPU.
+"""
+import time
+
+from sklearn.base import clone
+from sklearn.metrics import r2_score
+
+_data = {}
+
+
+def init_worker(X_fit, y_fit, X_val, y_val, sample_order):
+    """Receive the search data once per worker process"""
+    _data.update(X_fit=X_fit, y_fit=y_fit, X_val=X_val, y_val=y_val, sample_order=sample_order)
+
+
+def evaluate(pipeline, n_samples):
+    """Fit a candidate on the first n_samples rows; returns (validation R2, fit seconds)"""
+    started = time.monotonic()
+    rows = _data['sample_order'][:n_samples]
+    pipeline = clone(pipeline)
+    pipeline.fit(_data['X_fit'][rows], _data['y_fit'][rows])
+    return r2_score(_data['y_val'], pipeline.predict(_data['X_val'])), time.monotonic() - started
@@ -0,0 +1,117 @@
+import gzip
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+import numpy as np
+from flask import Response
+
+logger = logging.getLogger(__name__)
+
+# orjson and brotli are optional; without them responses fall back to the
+# standard json module and gzip
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def _default(value):
+    """Encode the types the standard encoders reject"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (UUID, bytes)):
+        return str(value)
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """Serialize to UTF-8 JSON bytes, handling numpy values natively"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_default, separators=(',', ':')).encode()
+
+
+def parse_fields(value, allowed):
+    """Split a comma separated ?fields= list; returns (fields, unknown fields)"""
+    if not value:
+        return None, []
+    if isinstance(value, str):
+        value = value.split(',')
+    fields = [field.strip() for field in value if field and field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    return fields or None, unknown
+
+
+def project(record, fields):
+    """Keep only the requested keys of a record"""
+    if fields is None:
+        return record
+    return {field: record[field] for field in fields if field in record}
+
+
+def _qualities(accept_encoding):
+    """Quality value of each coding listed in an Accept-Encoding header"""
+    qualities = {}
+    for part in (accept_encoding or '').split(','):
+        coding, *params = [item.strip() for item in part.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0  # An unreadable weight does not accept the coding
+        qualities[coding.lower()] = quality
+    return qualities
+
+
+def negotiate_encoding(accept_encoding):
+    """Highest weighted coding the client accepts; q=0 refuses a coding, * weighs unlisted ones"""
+    qualities = _qualities(accept_encoding)
+    default = qualities.get('*', 0.0)
+    codings = (['br'] if brotli is not None else []) + ['gzip']
+    # max keeps the first of equal weights, so brotli wins ties
+    best = max(codings, key=lambda coding: qualities.get(coding, default))
+    return best if qualities.get(best, default) > 0 else None
+
+
+def json_response(payload, status=200, accept_encoding=None):
+    """Flask response with fast JSON and Accept-Encoding negotiated compression"""
+    body = dumps(payload)
+    headers = {'Vary': 'Accept-Encoding'}
+
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding == 'br':
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+        headers['Content-Encoding'] = 'br'
+    elif encoding == 'gzip':
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        headers['Content-Encoding'] = 'gzip'
+
+    return Response(body, status=status, mimetype='application/json', headers=headers)
@@ -0,0 +1,277 @@
+"""Sharded scatter-gather search over a partitioned catalog snapshot.
+
+The catalog snapshot is split into N shard snapshots, by product id hash or
+by brand, and each shard is served by its own ml-api process. A coordinator
+sends every search to the shards in parallel and merges their top_k lists;
+shards that miss the deadline are left out and the response is flagged partial.
+
+    python shard_search.py partition --snapshot data/catalog_snapshot.npz --shards 8 --by brand --out data/shards
+    python shard_search.py serve --manifest data/shards/manifest.json --base-port 5100
+
+The coordinator is the regular API started with the printed settings:
+
+    SEARCH_SHARD_URLS=http://localhost:5100,... SEARCH_SHARD_MANIFEST=data/shards/manifest.json python mobile_spec.py
+"""
+import argparse
+import heapq
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from itertools import islice
+
+import numpy as np
+
+from product_table import ProductTable
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+SHARD_BY = ('hash', 'brand')
+
+
+def hash_shard(product_id, num_shards):
+    # crc32 rather than hash() so every process agrees on the placement
+    return zlib.crc32(str(product_id).encode()) % num_shards
+
+
+def assign_brands(brands, num_shards):
+    """Place whole brands on shards, largest brand first onto the least loaded shard"""
+    names, counts = np.unique(brands, return_counts=True)
+    loads = [(0, shard) for shard in range(num_shards)]
+    heapq.heapify(loads)
+    placement = {}
+    for index in np.argsort(-counts, kind='stable'):
+        load, shard = heapq.heappop(loads)
+        placement[str(names[index])] = shard
+        heapq.heappush(loads, (load + int(counts[index]), shard))
+    return placement
+
+
+def partition_snapshot(snapshot_path, out_dir, num_shards, by='hash'):
+    """Split a catalog snapshot into shard snapshots plus a manifest; returns the manifest"""
+    if by not in SHARD_BY:
+        raise ValueError(f"Unknown shard key {by}, expected one of {', '.join(SHARD_BY)}")
+
+    table, header = ProductTable.load_snapshot(snapshot_path)
+    table = table.compact()
+
+    brands = brand_rows = None
+    if by == 'brand':
+        brands = assign_brands(table.column('brand'), num_shards)
+        names, counts = np.unique(table.column('brand'), return_counts=True)
+        brand_rows = {str(name): int(count) for name, count in zip(names, counts)}
+        assignment = np.array([brands[brand] for brand in table.column('brand')], dtype=np.int64)
+    else:
+        assignment = np.array([hash_shard(product_id, num_shards) for product_id in table.objects['id']], dtype=np.int64)
+
+    os.makedirs(out_dir, exist_ok=True)
+    shards = []
+    for shard in range(num_shards):
+        file_name = f"shard-{shard:03d}.npz"
+        shard_header = table.take(np.flatnonzero(assignment == shard)).save_snapshot(
+            os.path.join(out_dir, file_name),
+            {'shard': shard, 'num_shards': num_shards, 'exported_at': header.get('exported_at')}
+        )
+        shards.append({'file': file_name, 'rows': shard_header['rows']})
+
+    manifest = {
+        'by': by,
+        'num_shards': num_shards,
+        'shards': shards,
+        'brands': brands,
+        'brand_rows': brand_rows,
+        'source': os.path.abspath(snapshot_path),
+        'source_exported_at': header.get('exported_at'),
+        'partitioned_at': datetime.now().isoformat()
+    }
+    with open(os.path.join(out_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info(f"Partitioned {len(table)} products into {num_shards} shards by {by}: {[s['rows'] for s in shards]}")
+    return manifest
+
+
+def load_manifest(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+class ShardCoordinator:
+    """Fan searches out to shard processes and merge their results"""
+
+    def __init__(self, shard_urls, timeout=2.0, manifest=None, min_candidates=20):
+        # min_candidates is the shards' default pre-filter size, which decides
+        # whether a branded search can stay on its brand's shard
+        self.shard_urls = [url.rstrip('/') for url in shard_urls]
+        self.timeout = timeout
+        self.manifest = manifest
+        self.min_candidates = min_candidates
+        if manifest and manifest['num_shards'] != len(self.shard_urls):
+            raise ValueError(f"Manifest has {manifest['num_shards']} shards but {len(self.shard_urls)} URLs were given")
+
+        # Enough threads for a few searches in flight at once; a timed out
+        # request still holds its thread until the socket timeout fires
+        self.executor = ThreadPoolExecutor(max_workers=len(self.shard_urls) * 4, thread_name_prefix='shard-search')
+        self.lock = threading.Lock()
+        self.counters = {
+            shard: {'requests': 0, 'timeouts': 0, 'errors': 0, 'total_ms': 0.0}
+            for shard in range(len(self.shard_urls))
+        }
+
+    def route(self, parsed_spec, prefilter, top_k=10, min_candidates=None, filters=None):
+        """Shards that can hold the best matches; a brand-sharded catalog sends branded queries to one shard"""
+        brands = (self.manifest or {}).get('brands')
+        brand_rows = (self.manifest or {}).get('brand_rows') or {}
+        brand = parsed_spec.get('brand')
+        # The pre-filter widens to the whole catalog when the brand alone has
+        # too few rows, and explicit filters replace it; both need every shard
+        needed = max(top_k, min_candidates or self.min_candidates)
+        if prefilter and not filters and brands and brand in brands and brand_rows.get(brand, 0) >= needed:
+            return [brands[brand]]
+        return list(range(len(self.shard_urls)))
+
+    def query_shard(self, shard, body):
+        start = time.perf_counter()
+        request = urllib.request.Request(
+            f"{self.shard_urls[shard]}/api/search", data=body,
+            headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        finally:
+            with self.lock:
+                self.counters[shard]['requests'] += 1
+                self.counters[shard]['total_ms'] += (time.perf_counter() - start) * 1000
+
+    def search(self, specification_text, parsed_spec, top_k=10, prefilter=True, min_candidates=None, filters=None):
+        """Return (merged top_k results, summed facet counts, shard status)"""
+        shards = self.route(parsed_spec, prefilter, top_k, min_candidates, filters)
+        body = json.dumps({
+            'specification': specification_text,
+            'top_k': top_k,
+            'prefilter': prefilter,
+            'min_candidates': min_candidates,
+            'filters': filters or {}
+        }).encode()
+
+        futures = {self.executor.submit(self.query_shard, shard, body): shard for shard in shards}
+        done, not_done = wait(futures, timeout=self.timeout)
+
+        shard_results, facets, timed_out, failed = [], {}, [], []
+        for future in not_done:
+            future.cancel()
+            timed_out.append(futures[future])
+        for future in done:
+            shard = futures[future]
+            try:
+                response = future.result()
+                shard_results.append(response['results'])
+                # Shards hold disjoint rows, so their facet counts add up
+                for dimension, counts in (response.get('facets') or {}).items():
+                    merged_counts = facets.setdefault(dimension, {})
+                    for value, count in counts.items():
+                        merged_counts[value] = merged_counts.get(value, 0) + count
+            except Exception as e:
+                # A socket timeout inside the deadline counts as a timeout too
+                reason = getattr(e, 'reason', e)
+                (timed_out if isinstance(reason, TimeoutError) else failed).append(shard)
+                logger.warning(f"Search shard {shard} error: {str(e)}")
+
+        with self.lock:
+            for shard in timed_out:
+                self.counters[shard]['timeouts'] += 1
+            for shard in failed:
+                self.counters[shard]['errors'] += 1
+
+        # Each shard returns its results best first, so a k-way heap merge of
+        # the sorted lists yields the global top_k
+        merged = heapq.merge(*shard_results, key=lambda phone: -phone['similarity_score'])
+        results = list(islice(merged, top_k))
+
+        status = {
+            'total': len(self.shard_urls),
+            'queried': sorted(shards),
+            'responded': len(shard_results),
+            'timed_out': sorted(timed_out),
+            'failed': sorted(failed),
+            'partial': len(shard_results) < len(shards)
+        }
+        return results, facets, status
+
+    def stats(self):
+        with self.lock:
+            return [
+                {
+                    'shard': shard,
+                    'url': self.shard_urls[shard],
+                    'requests': counters['requests'],
+                    'timeouts': counters['timeouts'],
+                    'errors': counters['errors'],
+                    'avg_ms': round(counters['total_ms'] / counters['requests'], 2) if counters['requests'] else None
+                }
+                for shard, counters in self.counters.items()
+            ]
+
+
+def serve(manifest_path, base_port):
+    """Start one ml-api process per shard and wait on them"""
+    manifest = load_manifest(manifest_path)
+    shard_dir = os.path.dirname(os.path.abspath(manifest_path))
+    processes, urls = [], []
+    for shard, info in enumerate(manifest['shards']):
+        port = base_port + shard
+        env = dict(
+            os.environ, PORT=str(port), DEBUG='false',
+            SEARCH_SHARD_SNAPSHOT=os.path.join(shard_dir, info['file'])
+        )
+        env.pop('SEARCH_SHARD_URLS', None)
+        processes.append(subprocess.Popen(
+            [sys.executable, 'mobile_spec.py'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), env=env
+        ))
+        urls.append(f"http://localhost:{port}")
+
+    print(f"SEARCH_SHARD_URLS={','.join(urls)}")
+    print(f"SEARCH_SHARD_MANIFEST={os.path.abspath(manifest_path)}")
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    parser = argparse.ArgumentParser(description='Partition the catalog for sharded search and run the shards')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    partition = commands.add_parser('partition', help='Split a catalog snapshot into shard snapshots')
+    partition.add_argument('--snapshot', default='data/catalog_snapshot.npz')
+    partition.add_argument('--shards', type=int, required=True)
+    partition.add_argument('--by', choices=SHARD_BY, default='hash')
+    partition.add_argument('--out', default='data/shards')
+
+    run = commands.add_parser('serve', help='Start one ml-api process per shard')
+    run.add_argument('--manifest', default=os.path.join('data/shards', MANIFEST_FILE))
+    run.add_argument('--base-port', type=int, default=5100)
+
+    args = parser.parse_args()
+    if args.command == 'partition':
+        partition_snapshot(args.snapshot, args.out, args.shards, args.by)
+    else:
+        serve(args.manifest, args.base_port)
+
+
+if __name__ == '__main__':
+    main()
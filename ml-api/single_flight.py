@@ -0,0 +1,78 @@
+import threading
+
+
+class CoalescingTimeout(TimeoutError):
+    """Raised in a caller that gave up waiting for an identical call already in flight"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run one call per key at a time; concurrent callers with the same key wait for its result"""
+
+    def __init__(self, name, timeout=10.0):
+        self.name = name
+        self.timeout = timeout
+        self.calls = {}  # key -> _Call in flight
+        self.executed = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.max_waiters = 0
+        self.lock = threading.Lock()
+
+    def do(self, key, function, *args, **kwargs):
+        """Return function(*args, **kwargs), sharing the result of a call with the same key in flight"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, call.waiters)
+
+        if leader:
+            try:
+                call.result = function(*args, **kwargs)
+                return call.result
+            except Exception as e:
+                call.error = e
+                raise
+            finally:
+                # Later callers start a fresh call; waiters already hold this one
+                with self.lock:
+                    del self.calls[key]
+                    self.executed += 1
+                    if call.error is not None:
+                        self.errors += 1
+                call.done.set()
+
+        if not call.done.wait(self.timeout):
+            with self.lock:
+                self.timeouts += 1
+            raise CoalescingTimeout(f"Gave up after {self.timeout}s waiting for an identical {self.name} call")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        with self.lock:
+            served = self.executed + self.coalesced
+            return {
+                'timeout_seconds': self.timeout,
+                'in_flight': len(self.calls),
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'coalesced_ratio': round(self.coalesced / served, 4) if served else 0.0,
+                'max_waiters': self.max_waiters,
+                'timeouts': self.timeouts,
+                'errors': self.errors
+            }
@@ -0,0 +1,72 @@
+import numpy as np
+
+
+def chunk_bounds(real_count, total_count, chunk_size):
+    """Split the real and synthetic rows evenly over the chunks, so every chunk mixes both"""
+    chunks = max(1, -(-total_count // chunk_size))
+    real = np.linspace(0, real_count, chunks + 1).astype(np.int64)
+    synthetic = np.linspace(0, total_count - real_count, chunks + 1).astype(np.int64)
+    return [
+        (real[chunk], real[chunk + 1], synthetic[chunk], synthetic[chunk + 1])
+        for chunk in range(chunks)
+    ]
+
+
+def holdout_mask(count, fraction, seed, chunk):
+    """Held-out rows of a chunk; the same on every pass over the stream"""
+    return np.random.RandomState([seed, chunk, 1]).random_sample(count) < fraction
+
+
+class StandardizedTargetRegressor:
+    """Incremental regressor trained on a standardized price that predicts in the original units"""
+
+    def __init__(self, regressor, mean, std):
+        self.regressor = regressor
+        self.mean = mean
+        self.std = std or 1.0
+
+    def partial_fit(self, X, y):
+        self.regressor.partial_fit(X, (y - self.mean) / self.std)
+        return self
+
+    def predict(self, X):
+        return self.regressor.predict(X) * self.std + self.mean
+
+
+class StreamingRegressionMetrics:
+    """R2, MAE, RMSE and MAPE accumulated chunk by chunk"""
+
+    def __init__(self):
+        self.count = 0
+        self.abs_error = 0.0
+        self.squared_error = 0.0
+        self.percentage_error = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations of y from its mean
+
+    def update(self, y_true, y_pred):
+        count = len(y_true)
+        if not count:
+            return
+        errors = y_true - y_pred
+        self.abs_error += float(np.abs(errors).sum())
+        self.squared_error += float(np.square(errors).sum())
+        self.percentage_error += float(np.abs(errors / y_true).sum())
+
+        # Merge the chunk's mean and squared deviations into the running ones
+        chunk_mean = float(y_true.mean())
+        delta = chunk_mean - self.mean
+        total = self.count + count
+        self.m2 += float(np.square(y_true - chunk_mean).sum()) + delta ** 2 * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+
+    def result(self):
+        if not self.count:
+            return None
+        return {
+            'test_r2': 1 - self.squared_error / self.m2 if self.m2 else 0.0,
+            'test_mae': self.abs_error / self.count,
+            'test_rmse': float(np.sqrt(self.squared_error / self.count)),
+            'test_mape': self.percentage_error / self.count * 100
+        }
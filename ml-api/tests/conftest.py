@@ -0,0 +1,147 @@
+import os
+import random
+import shutil
+import sys
+import uuid
+
+import pytest
+
+# The ml-api modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def product(number, brand='samsung', price=500.0, model=None, features=(), price_range=1, **fields):
+    """A catalog product with every column ProductTable stores"""
+    values = {
+        'id': f'00000000-0000-0000-0000-{number:012d}',
+        'brand': brand,
+        'model': model or f'Phone {number}',
+        'price': price,
+        'rating': 4.0,
+        'reviews': 10,
+        'description': '',
+        'image_url': '',
+        'display_size': '6.1"',
+        'display_size_numeric': 6.1,
+        'processor': 'Snapdragon 8 Gen 2',
+        'processor_score': 90,
+        'ram': '8GB',
+        'ram_numeric': 8.0,
+        'storage': '128GB',
+        'storage_numeric': 128.0,
+        'camera': '50MP',
+        'camera_numeric': 50.0,
+        'battery': '5000mAh',
+        'battery_numeric': 5000.0,
+        'operating_system': 'Android',
+        'price_range': price_range,
+        'reviews_count_log': 2.4,
+        'features': list(features)
+    }
+    values.update(fields)
+    return values
+
+
+@pytest.fixture
+def make_product():
+    return product
+
+
+@pytest.fixture
+def pg_schema():
+    """Connection settings for a throwaway schema in the configured Postgres, dropped afterwards"""
+    psycopg2 = pytest.importorskip('psycopg2')
+    from db_config import DATABASE_CONFIG
+
+    try:
+        connection = psycopg2.connect(**DATABASE_CONFIG, connect_timeout=3)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"Postgres is not available: {e}")
+    connection.autocommit = True
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE SCHEMA {schema}")
+    try:
+        yield dict(DATABASE_CONFIG, options=f"-c search_path={schema}")
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA {schema} CASCADE")
+        connection.close()
+
+
+def db_row(number, rng):
+    """A row of the joined products query, before build_product enriches it"""
+    ram, storage = rng.choice([4, 8, 12]), rng.choice([64, 128, 256])
+    return {
+        'id': f'00000000-0000-0000-0000-{number:012d}',
+        'brand': rng.choice(['Samsung', 'Apple', 'Xiaomi', 'Google', 'Nokia']),
+        'model': f"{rng.choice(['Galaxy S', 'iPhone', 'Redmi Note', 'Pixel', 'Lumia'])} {number}",
+        'price': 200 + ram * 40 + storage + rng.randint(0, 100),
+        'rating': round(rng.uniform(3, 5), 1),
+        'reviews': rng.randint(0, 1000),
+        'description': '',
+        'image_url': '',
+        'display_size': '6.1"',
+        'processor': rng.choice(['Snapdragon 8 Gen 2', 'A16 Bionic', 'Dimensity 9000', 'Snapdragon 695']),
+        'ram': f'{ram}GB',
+        'storage': f'{storage}GB',
+        'camera': f"{rng.choice([12, 48, 50])}MP",
+        'battery': f"{rng.choice([4000, 5000])}mAh",
+        'operating_system': 'Android',
+        'features': ['5G'] if rng.random() < 0.5 else []
+    }
+
+
+def make_catalog_rows(count=300, seed=1):
+    rng = random.Random(seed)
+    return {row['id']: row for row in (db_row(number, rng) for number in range(count))}
+
+
+def make_matcher(rows, directory, monkeypatch):
+    """A matcher reading rows instead of the database, with its model files under directory"""
+    import mobile_spec
+    from product_table import ProductTable
+
+    monkeypatch.chdir(directory)
+    os.makedirs('model', exist_ok=True)
+    # Enough rows for every model to fit, small enough to train in seconds
+    monkeypatch.setattr(mobile_spec, 'MIN_TRAINING_SAMPLES', 1200)
+    monkeypatch.setattr(mobile_spec.DatabaseManager, 'connect', lambda self: False)
+
+    matcher = mobile_spec.AdvancedMobileSpecificationMatcher()
+    matcher.get_products_from_db = lambda: ProductTable.from_products(
+        matcher.build_product(row) for row in rows.values()
+    )
+    matcher.get_products_by_ids = lambda ids: ProductTable.from_products(
+        matcher.build_product(rows[product_id]) for product_id in ids if product_id in rows
+    )
+    matcher.catalog.loader, matcher.catalog.row_loader = matcher.get_products_from_db, matcher.get_products_by_ids
+    return matcher
+
+
+@pytest.fixture
+def catalog_rows():
+    """Database rows by id; tests edit them to simulate catalog changes"""
+    return make_catalog_rows()
+
+
+@pytest.fixture
+def matcher(tmp_path, monkeypatch, catalog_rows):
+    return make_matcher(catalog_rows, tmp_path, monkeypatch)
+
+
+@pytest.fixture(scope='session')
+def trained_model_dir(tmp_path_factory):
+    """Model files of one full training run on the default catalog, shared by the session"""
+    directory = tmp_path_factory.mktemp('trained')
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        assert make_matcher(make_catalog_rows(), directory, monkeypatch).train_multiple_models()
+    return directory / 'model'
+
+
+@pytest.fixture
+def trained_matcher(matcher, trained_model_dir):
+    """The matcher fixture with the shared trained models loaded from disk"""
+    shutil.copytree(trained_model_dir, 'model', dirs_exist_ok=True)
+    assert matcher.load_model()
+    return matcher
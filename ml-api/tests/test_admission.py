@@ -0,0 +1,54 @@
+import threading
+import time
+
+from admission import AdmissionPool
+
+
+def test_admits_up_to_the_concurrency_limit():
+    pool = AdmissionPool('search', max_concurrent=2, max_queue=0, queue_timeout=1.0)
+
+    assert pool.acquire()
+    assert pool.acquire()
+    assert not pool.acquire()
+    assert pool.stats()['rejected_full'] == 1
+
+    pool.release()
+    assert pool.acquire()
+
+
+def test_queued_request_is_admitted_when_a_slot_frees():
+    pool = AdmissionPool('search', max_concurrent=1, max_queue=1, queue_timeout=5.0)
+    assert pool.acquire()
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(pool.acquire()))
+    waiter.start()
+
+    while pool.stats()['waiting'] == 0:
+        time.sleep(0.001)
+    # The queue is full, so a third request is turned away at once
+    assert not pool.acquire()
+    pool.release(0.5)
+    waiter.join(5)
+
+    assert admitted == [True]
+    assert pool.stats()['active'] == 1
+    assert pool.stats()['avg_service_time'] == 0.5
+
+
+def test_queued_request_times_out():
+    pool = AdmissionPool('search', max_concurrent=1, max_queue=1, queue_timeout=5.0)
+    assert pool.acquire()
+
+    assert not pool.acquire(timeout=0.05)
+    assert pool.stats()['rejected_timeout'] == 1
+    assert pool.stats()['waiting'] == 0
+
+
+def test_retry_after_grows_with_the_backlog():
+    pool = AdmissionPool('search', max_concurrent=1, max_queue=0, queue_timeout=1.0)
+    assert pool.retry_after() == 1
+
+    pool.acquire()
+    pool.release(4.0)
+    pool.acquire()
+    assert pool.retry_after() == 4
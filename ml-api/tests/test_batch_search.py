@@ -0,0 +1,53 @@
+import pytest
+
+import mobile_spec
+from result_cache import ResultCache
+
+QUERIES = [
+    'Samsung 8GB RAM 128GB storage',
+    'iphone with 256GB',
+    '5000mAh battery and a 50MP camera',
+    'Pixel under $700',
+    'redmi note 12GB RAM 6.1 inch',
+    'cheap phone',
+    'Nokia 4GB 64GB 4000mAh $500'
+]
+
+
+def ranking(matches):
+    return [(match['phone']['id'], match['similarity_score']) for match in matches]
+
+
+@pytest.mark.parametrize('options', [
+    {'prefilter': True},
+    {'prefilter': False},
+    {'prefilter': True, 'min_candidates': 200},
+    {'filters': {'brand': ['samsung', 'apple']}},
+    {'filters': {'feature': ['5g'], 'price_bucket': ['premium']}}
+])
+def test_batch_ranks_like_single_searches(matcher, options):
+    batch, parsed_specs = matcher.find_matching_phones_batch(QUERIES, 5, **options)
+
+    for query, matches, parsed_spec in zip(QUERIES, batch, parsed_specs):
+        single = matcher.find_matching_phones(query, 5, **options)
+        assert ranking(matches) == ranking(single), query
+        assert [match['matched_features'] for match in matches] == [match['matched_features'] for match in single]
+        assert parsed_spec == matcher.parser.parse_specification(query)
+
+
+def test_batch_endpoint_answers_like_the_search_endpoint(matcher, monkeypatch):
+    monkeypatch.setattr(mobile_spec, 'matcher', matcher)
+    monkeypatch.setattr(mobile_spec, 'search_cache', ResultCache())
+    client = mobile_spec.app.test_client()
+    request = {'top_k': 3, 'filters': {'brand': ['samsung', 'google']}}
+
+    # The first query is answered from the cache the search endpoint filled
+    searched = client.post('/api/search', json=dict(request, specification=QUERIES[0])).get_json()
+    batch = client.post('/api/search/batch', json=dict(request, specifications=QUERIES)).get_json()
+
+    assert mobile_spec.search_cache.stats()['hits'] == 1
+    assert batch['results'][0]['results'] == searched['results']
+    for query, answer in zip(QUERIES[1:], batch['results'][1:]):
+        single = client.post('/api/search', json=dict(request, specification=query)).get_json()
+        assert answer['results'] == single['results'], query
+        assert answer['parsed_specification'] == single['parsed_specification']
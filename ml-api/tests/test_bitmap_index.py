@@ -0,0 +1,102 @@
+import random
+from collections import Counter
+
+from product_table import ProductTable
+from search_index import BitmapIndex
+
+PRICE_BUCKETS = {0: 'budget', 1: 'mid_range', 2: 'premium', 3: 'flagship'}
+FEATURES = ['5G', 'NFC', 'Wireless Charging']
+
+
+def random_products(make_product, count, seed=3):
+    rng = random.Random(seed)
+    return [
+        make_product(
+            number,
+            brand=rng.choice(['samsung', 'apple', 'google']),
+            price_range=rng.randint(0, 3),
+            features=rng.sample(FEATURES, rng.randint(0, 2))
+        )
+        for number in range(count)
+    ]
+
+
+def matches(product, filters):
+    features = {feature.lower() for feature in product['features']}
+    return (
+        (not filters.get('brand') or product['brand'] in filters['brand'])
+        and (not filters.get('price_bucket') or PRICE_BUCKETS[product['price_range']] in filters['price_bucket'])
+        and all(feature in features for feature in filters.get('feature', ()))
+    )
+
+
+def test_select_and_facets_match_a_full_scan(make_product):
+    products = random_products(make_product, 300)
+    index = BitmapIndex(PRICE_BUCKETS)
+    index.rebuild(ProductTable.from_products(products))
+    filters = {'brand': ['samsung', 'apple'], 'feature': ['5g'], 'price_bucket': ['budget', 'premium']}
+
+    bits = index.select(filters)
+    expected = [row for row, product in enumerate(products) if matches(product, filters)]
+
+    assert index.rows(bits).tolist() == expected
+    assert index.count(bits) == len(expected)
+    facets = index.facets(bits)
+    assert facets['brand'] == dict(Counter(products[row]['brand'] for row in expected).most_common())
+    assert sum(facets['price_bucket'].values()) == len(expected)
+    assert facets['feature']['5g'] == len(expected)
+
+
+def test_unknown_values_select_nothing(make_product):
+    index = BitmapIndex(PRICE_BUCKETS)
+    index.rebuild(ProductTable.from_products(random_products(make_product, 20)))
+
+    assert index.count(index.select({'brand': ['nokia']})) == 0
+    assert index.count(index.select({'feature': ['5g', 'satellite']})) == 0
+    assert index.count(index.select({})) == 20
+
+
+def test_rows_added_past_the_capacity_and_removed(make_product):
+    table = ProductTable.from_products(random_products(make_product, 64))
+    index = BitmapIndex(PRICE_BUCKETS)
+    index.rebuild(table)
+
+    added = make_product(64, brand='nokia', features=['NFC'], price_range=3)
+    row = table.append(added)
+    index.add_row(row, added)
+    bits = index.select({'brand': ['nokia'], 'feature': ['nfc'], 'price_bucket': ['flagship']})
+    assert index.rows(bits).tolist() == [64]
+
+    table.delete_row(row)
+    index.remove_row(row, added)
+    assert index.count(index.select({'brand': ['nokia']})) == 0
+    assert index.count(index.select({})) == 64
+
+
+def test_pack_ignores_rows_outside_the_bitsets(make_product):
+    index = BitmapIndex(PRICE_BUCKETS)
+    index.rebuild(ProductTable.from_products(random_products(make_product, 10)))
+
+    assert index.rows(index.pack([1, 3, index.capacity + 5])).tolist() == [1, 3]
+
+
+def test_each_disjunctive_dimension_is_counted_without_its_own_filter(make_product):
+    products = random_products(make_product, 300)
+    index = BitmapIndex(PRICE_BUCKETS)
+    index.rebuild(ProductTable.from_products(products))
+    filters = {'brand': ['samsung'], 'feature': ['5g'], 'price_bucket': ['budget', 'premium']}
+    restrict = index.pack(range(0, 300, 2))
+
+    facets = index.disjunctive_facets(filters, restrict)
+
+    def counts(dimension, key):
+        without = {name: values for name, values in filters.items() if name != dimension}
+        rows = [row for row in range(0, 300, 2) if matches(products[row], without)]
+        return dict(Counter(key(products[row]) for row in rows).most_common())
+
+    assert facets['brand'] == counts('brand', lambda product: product['brand'])
+    assert facets['price_bucket'] == counts('price_bucket', lambda product: PRICE_BUCKETS[product['price_range']])
+    # Features narrow each other, so they are counted over the selection itself
+    selected = index.rows(index.select(filters) & restrict)
+    assert facets['feature'] == index.facets(index.pack(selected))['feature']
+    assert set(facets['brand']) == {'samsung', 'apple', 'google'}
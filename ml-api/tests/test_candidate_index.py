@@ -0,0 +1,48 @@
+import random
+
+from product_table import ProductTable
+from search_index import CandidateIndex
+
+
+def full_scan(products, brand, price, tolerance):
+    return {
+        row for row, product in enumerate(products)
+        if product['brand'] == brand and price * (1 - tolerance) <= product['price'] <= price * (1 + tolerance)
+    }
+
+
+def test_candidates_match_a_full_scan(make_product):
+    rng = random.Random(7)
+    products = [
+        make_product(number, brand=rng.choice(['samsung', 'apple', 'xiaomi']), price=float(rng.randint(100, 1500)))
+        for number in range(500)
+    ]
+    index = CandidateIndex()
+    index.rebuild(ProductTable.from_products(products))
+
+    for brand, price in [('samsung', 800), ('apple', 1000), ('xiaomi', 200)]:
+        assert index.candidates(brand, price, 0.3) == full_scan(products, brand, price, 0.3)
+
+
+def test_unknown_brand_and_no_price_do_not_narrow(make_product):
+    index = CandidateIndex()
+    index.rebuild(ProductTable.from_products([make_product(0), make_product(1, brand='apple')]))
+
+    assert index.candidates() is None
+    assert index.candidates('unknown') is None
+    assert index.candidates('nokia') == set()
+
+
+def test_add_and_remove_rows(make_product):
+    table = ProductTable.from_products([make_product(0, price=500.0)])
+    index = CandidateIndex()
+    index.rebuild(table)
+
+    added = make_product(1, price=520.0)
+    row = table.append(added)
+    index.add_row(row, added)
+    assert index.candidates('samsung', 500, 0.1) == {0, 1}
+
+    index.remove_row(0, table.row(0))
+    assert index.candidates('samsung', 500, 0.1) == {1}
+    assert index.rows_in_price_range(0, 510) == set()
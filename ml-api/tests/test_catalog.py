@@ -0,0 +1,172 @@
+import os
+import select
+import time
+
+import pytest
+
+from catalog import CatalogChangeListener, ProductCatalog
+from product_table import ProductTable
+from search_index import CandidateIndex
+
+MIGRATION = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'supabase', 'migrations', '20251019090000_bright_signal.sql'
+)
+
+
+class FakeDatabase:
+    """Products by id, read back as tables the way the catalog loaders return them"""
+
+    def __init__(self, products):
+        self.products = {product['id']: product for product in products}
+
+    def load_all(self):
+        return ProductTable.from_products(self.products.values())
+
+    def load_ids(self, ids):
+        return ProductTable.from_products(self.products[i] for i in ids if i in self.products)
+
+
+@pytest.fixture
+def database(make_product):
+    return FakeDatabase([make_product(number, price=100.0 * (number + 1)) for number in range(3)])
+
+
+@pytest.fixture
+def catalog(database):
+    catalog = ProductCatalog(database.load_all, database.load_ids)
+    catalog.register_index(CandidateIndex())
+    catalog.ensure_loaded()
+    return catalog
+
+
+def test_changes_are_applied_row_by_row(catalog, database, make_product):
+    index = catalog.indexes[0]
+    changed, removed, added = make_product(0, price=950.0), make_product(1), make_product(7, brand='apple')
+    database.products[changed['id']] = changed
+    del database.products[removed['id']]
+    database.products[added['id']] = added
+    version = catalog.version
+
+    assert catalog.apply_changes([changed['id'], removed['id'], added['id']]) == 3
+
+    assert catalog.version == version + 1
+    assert catalog.get(changed['id'])['price'] == 950.0
+    assert catalog.get(removed['id']) is None
+    assert catalog.get(added['id'])['brand'] == 'apple'
+    assert len(catalog.snapshot()) == 3
+    # The index follows the rows without a rebuild
+    assert index.rows_for_brand('apple') == {catalog.positions[added['id']]}
+    assert index.rows_in_price_range(900, 1000) == {catalog.positions[changed['id']]}
+    assert removed['id'] not in catalog.positions
+
+
+def test_failed_row_read_keeps_the_catalog(catalog):
+    catalog.row_loader = lambda ids: None
+    version = catalog.version
+
+    assert catalog.apply_changes(['missing']) == 0
+    assert catalog.version == version
+
+
+def test_empty_reload_keeps_the_current_catalog(catalog, database):
+    database.products.clear()
+
+    assert not catalog.reload()
+    assert len(catalog.snapshot()) == 3
+
+
+def test_snapshot_is_used_when_the_database_is_empty(tmp_path, database):
+    path = str(tmp_path / 'catalog.npz')
+    ProductCatalog(database.load_all, database.load_ids, snapshot_path=path).ensure_loaded()
+    database.products.clear()
+
+    catalog = ProductCatalog(database.load_all, database.load_ids, snapshot_path=path)
+    catalog.ensure_loaded()
+
+    assert catalog.source == 'snapshot'
+    assert len(catalog.snapshot()) == 3
+
+
+class RecordingCatalog:
+    source = 'database'
+
+    def __init__(self):
+        self.changes = []
+
+    def apply_changes(self, product_ids):
+        self.changes.append(set(product_ids))
+        return len(product_ids)
+
+
+@pytest.fixture
+def products_schema(pg_schema):
+    """The schema with a minimal products table and the change tracking migration applied"""
+    psycopg2 = pytest.importorskip('psycopg2')
+    connection = psycopg2.connect(**pg_schema)
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE products (id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name TEXT, updated_at TIMESTAMPTZ);
+            CREATE TABLE product_specs (product_id UUID);
+            CREATE TABLE product_features (product_id UUID)
+        """)
+        with open(MIGRATION) as f:
+            cursor.execute(f.read())
+    yield pg_schema, connection
+    connection.close()
+
+
+def insert_product(connection, name):
+    with connection.cursor() as cursor:
+        cursor.execute("INSERT INTO products (name) VALUES (%s) RETURNING id", (name,))
+        return str(cursor.fetchone()[0])
+
+
+def test_delta_sees_a_transaction_that_commits_after_the_previous_delta(products_schema):
+    config, writer = products_schema
+    psycopg2 = pytest.importorskip('psycopg2')
+    catalog = RecordingCatalog()
+    listener = CatalogChangeListener(catalog, config)
+    assert listener.connect()
+
+    early = insert_product(writer, 'early')
+    listener.apply_delta()
+    assert catalog.changes == [{early}]
+
+    slow = psycopg2.connect(**config)
+    with slow.cursor() as cursor:
+        cursor.execute("UPDATE products SET name = 'slow' WHERE id = %s", (early,))
+    late = insert_product(writer, 'late')
+
+    listener.apply_delta()
+    assert catalog.changes[-1] == {late}
+
+    # The slow transaction started before the last delta but commits after it
+    slow.commit()
+    slow.close()
+    listener.apply_delta()
+    # Later changes may be seen twice, which re-reading the row makes harmless
+    assert early in catalog.changes[-1]
+
+    with writer.cursor() as cursor:
+        cursor.execute("DELETE FROM products WHERE id = %s", (late,))
+    listener.apply_delta()
+    assert late in catalog.changes[-1]
+    listener.connection.close()
+
+
+def test_notifications_are_applied_in_one_batch(products_schema):
+    config, writer = products_schema
+    catalog = RecordingCatalog()
+    listener = CatalogChangeListener(catalog, config)
+    assert listener.connect()
+
+    first, second = insert_product(writer, 'first'), insert_product(writer, 'second')
+    deadline = time.monotonic() + 5
+    while len(listener.connection.notifies) < 2 and time.monotonic() < deadline:
+        select.select([listener.connection], [], [], 0.1)
+        listener.connection.poll()
+    listener.apply_notifications()
+
+    assert catalog.changes == [{first, second}]
+    listener.connection.close()
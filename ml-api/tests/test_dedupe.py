@@ -0,0 +1,129 @@
+import random
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import dedupe
+from conftest import product
+from product_table import ProductTable
+
+# brand, listed model name, RAM and storage in GB
+LISTINGS = [
+    ('samsung', 'Samsung Galaxy S23 128GB', 8, 128),
+    ('samsung', 'Galaxy S23 (128 GB) Unlocked', 8, 128),
+    ('samsung', 'Galaxy S22 128GB', 8, 128),
+    ('samsung', 'Galaxy Z Fold', 12, 512),
+    ('samsung', 'Galaxy Z Fold Dual SIM', 12, 512),
+    ('apple', 'iPhone 15 Pro', 8, 256),
+    ('apple', 'Apple iPhone 15 Pro 256GB', 8, 256),
+    ('apple', 'iPhone 15 Pro', 8, 1024),
+    ('google', 'Pixel 8', 8, 128)
+]
+
+
+def listings_table(listings):
+    return ProductTable.from_products(
+        product(number, brand=brand, model=model, ram=f'{ram}GB', ram_numeric=float(ram),
+                storage=f'{storage}GB', storage_numeric=float(storage))
+        for number, (brand, model, ram, storage) in enumerate(listings)
+    )
+
+
+def pair_rows(pairs):
+    return {(left, right) for left, right, _ in pairs}
+
+
+def test_listings_of_one_model_are_paired():
+    pairs = dedupe.find_duplicate_pairs(listings_table(LISTINGS))
+
+    # Not S22 with S23, and not the 1 TB variant of the iPhone
+    assert pair_rows(pairs) == {(0, 1), (3, 4), (5, 6)}
+    assert all(dedupe.DUPLICATE_THRESHOLD <= score <= 1 for _, _, score in pairs)
+
+
+def test_model_number_blocks_find_the_pairs_of_whole_brand_blocks():
+    rng = random.Random(3)
+    listings = [
+        (brand, f"{rng.choice(['', brand])} {name} {rng.choice(['', '5G', 'Dual SIM'])}", ram, storage)
+        for brand, names in [('samsung', ['Galaxy S23', 'Galaxy S23 Ultra', 'Galaxy A54', 'Galaxy Fold']),
+                             ('xiaomi', ['Redmi Note 12', 'Redmi Note 12 Pro', 'Poco'])]
+        for name in names
+        for ram, storage in [(8, 128), (8, 128), (12, 256)]
+        for _ in range(rng.randint(1, 4))
+    ]
+    table = listings_table(listings)
+
+    # Scoring each brand as one block, as before model numbers split it
+    brands = table.column('brand')
+    names = [dedupe.normalize_name(name, brand) for name, brand in zip(table.column('model'), brands)]
+    text = TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 3), sublinear_tf=True).fit_transform(names).tocsr()
+    numbers = dedupe.model_number_codes(names)
+    specs, known = dedupe.standardize_specs(table)
+    whole_brands = []
+    for brand in np.unique(brands):
+        rows = np.flatnonzero(brands == brand)
+        whole_brands += dedupe.score_block(rows, text[rows], numbers[rows], specs[rows], known[rows], 0, len(rows))
+
+    pairs = dedupe.find_duplicate_pairs(table, chunk_rows=2)
+
+    assert len(pairs) == len(pair_rows(pairs))
+    assert sorted(pairs) == pytest.approx(sorted(whole_brands))
+    assert len(pairs) > 10
+
+
+def test_blocks_pair_every_row_with_its_possible_matches_once():
+    brands = np.array(['a', 'a', 'a', 'a', 'a', 'b'])
+    numbers = np.array([7, 0, 7, 9, 0, 7])
+
+    found = []
+    for rows, leading in dedupe.blocks(brands, numbers):
+        found += [(min(rows[left], rows[right]), max(rows[left], rows[right]))
+                  for left in range(leading) for right in range(left + 1, len(rows))]
+
+    # Rows 0 and 2 share number 7, 3 has its own, 1 and 4 have none; brand b is alone
+    assert sorted(found) == [(0, 1), (0, 2), (0, 4), (1, 2), (1, 3), (1, 4), (2, 4), (3, 4)]
+
+
+def test_model_number_codes_are_stable_across_processes():
+    codes = dedupe.model_number_codes(['galaxy s23 ultra', 'ultra s23 galaxy', 'galaxy s22', 'fold'])
+
+    assert codes[0] == codes[1] == 4216732284  # crc32 of 's23'
+    assert codes[2] not in (0, codes[0])
+    assert codes[3] == 0
+
+
+def test_score_block_rejects_different_variants():
+    names = ['s23', 's23', 's23']
+    text = TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 3)).fit_transform(names).tocsr()
+    specs = np.array([[0.0, 0.0], [0.1, 0.0], [0.1, 2.0]])
+    known = np.array([[True, True], [True, True], [True, True]])
+
+    pairs = dedupe.score_block(np.array([10, 11, 12]), text, np.ones(3, dtype=np.int64), specs, known, 0, 3)
+
+    assert [(left, right) for left, right, _ in pairs] == [(10, 11)]
+    # Identical names; the two specs differ by 0.1 and 0, a mean of 0.05
+    assert pairs[0][2] == pytest.approx(dedupe.TEXT_WEIGHT + (1 - dedupe.TEXT_WEIGHT) * (1 - 0.05 / 0.5))
+
+
+def test_clusters_join_chains_and_keep_each_rows_best_score():
+    clusters = dedupe.cluster_pairs([(0, 1, 0.9), (1, 2, 0.95), (4, 5, 0.88)], 6)
+
+    members = sorted(sorted(cluster) for cluster in clusters.values())
+    assert members == [[(0, 0.9), (1, 0.95), (2, 0.95)], [(4, 0.88), (5, 0.88)]]
+
+
+def test_missing_products_are_dropped_from_their_clusters():
+    def cluster(canonical, *ids):
+        return {
+            'canonical_product_id': canonical, 'size': len(ids),
+            'members': [{'product_id': product_id, 'similarity': 0.9} for product_id in ids]
+        }
+    clusters = [cluster('a', 'a', 'b', 'c'), cluster('d', 'd', 'e'), cluster('g', 'f', 'g', 'h')]
+
+    kept = dedupe.drop_missing_products(clusters, {'b', 'c', 'd', 'f', 'g'})
+
+    assert [(c['canonical_product_id'], c['size'], [m['product_id'] for m in c['members']]) for c in kept] == [
+        ('b', 2, ['b', 'c']),
+        ('g', 2, ['f', 'g'])
+    ]
@@ -0,0 +1,46 @@
+from product_table import ProductTable
+from search_index import FuzzyTermIndex, edit_distance
+
+BRAND_ALIASES = {'samsung': 'samsung', 'galaxy': 'samsung', 'apple': 'apple', 'iphone': 'apple', 'oneplus': 'oneplus'}
+
+
+def build_index(make_product):
+    index = FuzzyTermIndex(BRAND_ALIASES)
+    index.rebuild(ProductTable.from_products([
+        make_product(0, brand='google', model='Pixel 8 Pro'),
+        make_product(1, brand='samsung', model='Galaxy S24 Ultra'),
+        make_product(2, brand='xiaomi', model='Redmi Note 13 Pro')
+    ]))
+    return index
+
+
+def test_edit_distance_counts_transpositions_and_gives_up_early():
+    assert edit_distance('samsung', 'samsnug', 2) == 1
+    assert edit_distance('apple', 'aple', 2) == 1
+    assert edit_distance('pixel', 'nokia', 2) == 3
+
+
+def test_misspelled_brand_and_model_tokens_resolve(make_product):
+    index = build_index(make_product)
+
+    assert index.resolve('samsnug') == ('samsung', 'samsung', 1)
+    assert index.resolve('one plus') == ('oneplus', 'oneplus', 0)
+    assert index.resolve('pixle')[1] == 'google'
+    assert index.resolve('redmy')[1] == 'xiaomi'
+
+
+def test_ambiguous_and_distant_tokens_do_not_resolve(make_product):
+    index = build_index(make_product)
+
+    # 'pro' belongs to two brands, so it identifies neither
+    assert index.resolve('pro') is None
+    assert index.resolve('nokia') is None
+
+
+def test_removed_rows_stop_resolving(make_product):
+    index = build_index(make_product)
+    index.remove_row(0, make_product(0, brand='google', model='Pixel 8 Pro'))
+    assert index.resolve('pixel') is None
+
+    index.add_row(3, make_product(3, brand='google', model='Pixel 9'))
+    assert index.resolve('pixel') == ('pixel', 'google', 0)
@@ -0,0 +1,65 @@
+import threading
+import time
+
+import pytest
+
+from health import HealthProber
+
+
+class StubCatalog:
+    loaded_at = None
+    source = None
+    version = 0
+    table = ()
+
+    def ensure_loaded(self):
+        pass
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def prober():
+    prober = HealthProber({'host': 'localhost', 'port': 1}, StubCatalog(), lambda: True, interval=0.05, db_timeout=1)
+    yield prober
+    prober.stop()
+
+
+def test_a_dead_probe_thread_is_replaced(prober):
+    # As the thread of a prober created before a fork looks in the child
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    prober.thread = dead
+    assert not prober.live()
+
+    prober.ensure_started()
+
+    assert prober.thread is not dead
+    assert wait_for(lambda: prober.last_probe is not None)
+    assert prober.live()
+    assert prober.state['reasons'] == ['catalog not loaded']
+
+
+def test_a_running_prober_is_not_started_twice(prober):
+    prober.ensure_started()
+    thread = prober.thread
+
+    prober.ensure_started()
+
+    assert prober.thread is thread
+
+
+def test_a_stopped_prober_stays_stopped(prober):
+    prober.ensure_started()
+    prober.stop()
+    assert wait_for(lambda: not prober.thread.is_alive())
+
+    prober.ensure_started()
+
+    assert not prober.thread.is_alive()
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import Ridge
+from sklearn.tree import DecisionTreeRegressor
+
+import mobile_spec
+
+MODELS_CONFIG = {
+    'ridge': {'model': Ridge(), 'scaler': 'standard'},
+    'decision_tree': {'model': DecisionTreeRegressor(random_state=42), 'scaler': 'standard'}
+}
+
+
+@pytest.fixture
+def search(matcher, monkeypatch):
+    monkeypatch.setattr(mobile_spec, 'HYPERPARAMETER_SPACE', {
+        'ridge': {'alpha': [0.01, 1.0, 100.0, 1000.0, 10000.0, 100000.0]},
+        'decision_tree': {'max_depth': [1, 2, 8], 'min_samples_leaf': [1, 50]}
+    })
+    monkeypatch.setattr(mobile_spec, 'SEARCH_MIN_RESOURCES', 100)
+    monkeypatch.setattr(mobile_spec, 'SEARCH_N_JOBS', 1)
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(1500, 4))
+    y = X @ np.array([30.0, -20.0, 10.0, 5.0]) + 500 + rng.normal(scale=1.0, size=len(X))
+    return lambda: matcher.search_hyperparameters(MODELS_CONFIG, X, y)
+
+
+def test_each_rung_keeps_a_third_of_each_family_on_three_times_the_rows(search):
+    params, info = search()
+
+    rungs = [(rung['n_samples'], len(rung['candidates'])) for rung in info['trace']]
+    # 1200 fitting rows: 100, 300 then 900; 6 + 6 candidates, then 2 + 2, then 1 + 1
+    assert rungs == [(100, 12), (300, 4), (900, 2)]
+    assert not info['budget_exhausted']
+    assert info['configurations'] == 12
+    assert set(params) == {'ridge', 'decision_tree'}
+
+
+def test_the_best_scoring_configuration_of_each_family_is_selected(search):
+    params, info = search()
+
+    # The target is linear with little noise, so the weakest regularization wins
+    assert params['ridge'] == {'alpha': 0.01}
+    assert params['decision_tree']['max_depth'] == 8
+    final_rung = info['trace'][-1]['candidates']
+    for name, selected in info['selected'].items():
+        # Candidates dropped on fewer rows may have scored higher there
+        assert selected['validation_r2'] == max(c['score'] for c in final_rung if c['model'] == name)
+
+
+def test_an_exhausted_budget_keeps_the_scores_so_far(search, monkeypatch):
+    monkeypatch.setattr(mobile_spec, 'SEARCH_BUDGET_SECONDS', 0)
+
+    params, info = search()
+
+    assert info['budget_exhausted']
+    assert params == {}
+    assert len(info['trace']) == 1
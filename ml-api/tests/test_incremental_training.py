@@ -0,0 +1,87 @@
+import mobile_spec
+
+
+def test_without_training_state_a_full_retrain_runs(matcher):
+    assert matcher.train_incremental()
+
+    assert matcher.model_info['training_mode'] == 'full'
+    assert matcher.training_state['incremental_updates'] == 0
+
+
+def test_changed_and_new_rows_update_the_models_in_place(trained_matcher, catalog_rows):
+    full_models = dict(trained_matcher.models)
+    first = next(iter(catalog_rows))
+    catalog_rows[first] = dict(catalog_rows[first], price=catalog_rows[first]['price'] + 40)
+    added = dict(catalog_rows[first], id='00000000-0000-0000-0000-000000009999')
+    catalog_rows[added['id']] = added
+
+    assert trained_matcher.train_incremental()
+
+    info = trained_matcher.model_info['incremental']
+    assert trained_matcher.model_info['training_mode'] == 'incremental'
+    assert (info['changed_rows'], info['removed_rows'], info['updates_since_full']) == (2, 0, 1)
+    assert added['id'] in trained_matcher.training_state['row_ids']
+    # Copies were trained and swapped in; the previous models were left untouched
+    assert all(trained_matcher.models[name] is not model for name, model in full_models.items())
+    assert trained_matcher.model is trained_matcher.models[trained_matcher.best_model_name]
+
+
+def test_removed_rows_leave_the_stored_matrix(trained_matcher, catalog_rows):
+    removed = next(iter(catalog_rows))
+    del catalog_rows[removed]
+
+    assert trained_matcher.train_incremental()
+
+    assert trained_matcher.model_info['incremental']['removed_rows'] == 1
+    assert removed not in trained_matcher.training_state['row_ids']
+
+
+def test_no_changes_keep_the_models(trained_matcher):
+    models = trained_matcher.models
+
+    assert trained_matcher.train_incremental()
+    assert trained_matcher.models is models
+    assert trained_matcher.model_info['training_mode'] == 'full'
+
+
+def test_large_catalog_changes_fall_back_to_a_full_retrain(trained_matcher, catalog_rows):
+    for row_id in list(catalog_rows)[:100]:
+        catalog_rows[row_id] = dict(catalog_rows[row_id], price=catalog_rows[row_id]['price'] * 2)
+
+    assert trained_matcher.train_incremental()
+
+    assert trained_matcher.model_info['training_mode'] == 'full'
+    assert trained_matcher.training_state['incremental_updates'] == 0
+
+
+def test_update_limit_forces_a_full_retrain(trained_matcher, catalog_rows, monkeypatch):
+    monkeypatch.setattr(mobile_spec, 'INCREMENTAL_MAX_UPDATES', 1)
+    rows = list(catalog_rows)
+
+    catalog_rows[rows[0]] = dict(catalog_rows[rows[0]], price=catalog_rows[rows[0]]['price'] + 40)
+    assert trained_matcher.train_incremental()
+    assert trained_matcher.model_info['training_mode'] == 'incremental'
+
+    catalog_rows[rows[1]] = dict(catalog_rows[rows[1]], price=catalog_rows[rows[1]]['price'] + 40)
+    assert trained_matcher.train_incremental()
+    assert trained_matcher.model_info['training_mode'] == 'full'
+
+
+def test_memory_stages_are_those_of_the_incremental_run(trained_matcher, catalog_rows):
+    trained_matcher.memory.start()
+    try:
+        # Stages left over from an earlier run on this thread
+        trained_matcher.memory.begin_run()
+        with trained_matcher.memory.stage('earlier'):
+            pass
+        first = next(iter(catalog_rows))
+        catalog_rows[first] = dict(catalog_rows[first], price=catalog_rows[first]['price'] + 40)
+
+        assert trained_matcher.train_incremental()
+    finally:
+        trained_matcher.memory.stop()
+
+    stages = trained_matcher.model_info['memory']
+    assert 'earlier' not in stages
+    assert 'preprocess_features' in stages
+    assert any(stage.startswith('fit:') for stage in stages)
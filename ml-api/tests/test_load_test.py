@@ -0,0 +1,66 @@
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import load_test
+
+
+@pytest.fixture
+def products_server():
+    """A stand-in /api/products serving 7 ids in pages of the requested size"""
+    ids = [f'id-{number}' for number in range(7)]
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(self.path).query))
+            requests.append(query)
+            page, limit = int(query['page']), int(query['limit'])
+            body = json.dumps({
+                'products': [{'id': product_id} for product_id in ids[(page - 1) * limit:page * limit]],
+                'pagination': {'page': page, 'limit': limit, 'total_pages': (len(ids) + limit - 1) // limit}
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('localhost', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://localhost:{server.server_port}", ids, requests
+    server.shutdown()
+    server.server_close()
+
+
+def test_product_ids_are_read_from_every_page(products_server, monkeypatch):
+    base_url, ids, requests = products_server
+    monkeypatch.setattr(load_test, 'PRODUCT_ID_PAGE_SIZE', 3)
+
+    assert load_test.fetch_product_ids(base_url) == ids
+    assert [query['page'] for query in requests] == ['1', '2', '3']
+    assert all(query['fields'] == 'id' for query in requests)
+
+
+def test_every_traffic_class_reports_its_statuses():
+    samples = {'search': [(0.01, True, 200), (0.02, False, 503)], 'suggest': []}
+
+    report = load_test.summarize(samples, duration=1, concurrency=2)
+
+    assert report['endpoints']['search']['statuses'] == {'200': 1, '503': 1}
+    assert report['endpoints']['suggest']['statuses'] == {}
+    assert report['overall']['error_rate'] == 0.5
+
+
+def test_a_local_server_needs_a_trained_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(load_test, 'MODEL_PATH', str(tmp_path / 'missing.joblib'))
+    monkeypatch.delenv('MODEL_BUNDLE_DIR', raising=False)
+
+    with pytest.raises(RuntimeError, match='trained model'):
+        load_test.start_server(5055, None)
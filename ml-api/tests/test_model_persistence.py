@@ -0,0 +1,69 @@
+import json
+import os
+
+import pytest
+
+import mobile_spec
+from model_bundle import latest_version, read_bundle, write_bundle
+
+SPECS = {
+    'brand': 'Nokia', 'display_size': '6.1"', 'processor': 'Snapdragon 8 Gen 2',
+    'ram': '8GB', 'storage': '128GB', 'camera': '50MP', 'battery': '5000mAh'
+}
+
+
+@pytest.fixture
+def restarted(trained_matcher):
+    """Returns a second matcher in the same directory, as a restarted process would build it"""
+    return lambda: mobile_spec.AdvancedMobileSpecificationMatcher()
+
+
+def test_brand_popularity_is_restored_with_the_models(trained_matcher, restarted):
+    popularity = trained_matcher.brand_popularity_map
+    assert set(popularity) == {'samsung', 'apple', 'xiaomi', 'google', 'nokia'}
+    prediction = trained_matcher.predict_price(SPECS)
+    trained_matcher.save_models()
+
+    matcher = restarted()
+    assert matcher.load_model()
+
+    assert matcher.brand_popularity_map == popularity
+    assert matcher.predict_price(SPECS) == prediction
+
+
+def test_models_saved_before_brand_popularity_was_kept_still_load(trained_matcher, restarted):
+    os.remove(mobile_spec.BRAND_POPULARITY_PATH)
+
+    matcher = restarted()
+    assert matcher.load_model()
+
+    assert matcher.brand_popularity_map is None
+    assert matcher.predict_price(SPECS)['predicted_price'] >= 0
+
+
+def test_a_published_bundle_serves_the_same_predictions(trained_matcher, restarted, tmp_path):
+    bundles = str(tmp_path / 'bundles')
+    trained_matcher.load_training_state()
+    prediction = trained_matcher.predict_price(SPECS)
+
+    version = trained_matcher.publish_bundle(bundles)
+
+    assert latest_version(bundles) == version
+    with open(os.path.join(bundles, version, 'model_info.json')) as f:
+        assert json.load(f)['bundle_version'] == version
+
+    matcher = restarted()
+    matcher.apply_bundle(version, read_bundle(bundles, version))
+
+    assert matcher.brand_popularity_map == trained_matcher.brand_popularity_map
+    assert list(matcher.training_state['row_ids']) == list(trained_matcher.training_state['row_ids'])
+    assert matcher.model is matcher.models[trained_matcher.best_model_name]
+    assert matcher.predict_price(SPECS) == dict(prediction, model_version=version)
+
+
+def test_pruning_keeps_the_newest_bundles(tmp_path):
+    bundles = str(tmp_path / 'bundles')
+    versions = [write_bundle(bundles, {'number': number}, {}, keep=2) for number in range(4)]
+
+    assert sorted(name for name in os.listdir(bundles) if name != 'LATEST') == sorted(versions[-2:])
+    assert read_bundle(bundles, latest_version(bundles)) == {'number': 3}
@@ -0,0 +1,72 @@
+import pytest
+
+import mobile_spec
+from queries import PREPARED_STATEMENTS
+
+
+@pytest.fixture
+def database(pg_schema, monkeypatch):
+    """A DatabaseManager on the throwaway schema with a small products table"""
+    psycopg2 = pytest.importorskip('psycopg2')
+    monkeypatch.setattr(mobile_spec, 'DATABASE_CONFIG', pg_schema)
+    monkeypatch.setattr(mobile_spec, 'PREPARED_STATEMENTS', dict(
+        PREPARED_STATEMENTS,
+        quotient=(['integer'], "SELECT 60 / $1 AS quotient"),
+        broken=([], "SELECT missing_column FROM products")
+    ))
+    with psycopg2.connect(**pg_schema) as connection, connection.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE products (brand TEXT);
+            INSERT INTO products VALUES ('Xiaomi'), ('Apple'), ('Apple')
+        """)
+    database = mobile_spec.DatabaseManager()
+    yield database
+    database.disconnect()
+
+
+def server_statements(database):
+    with database.connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM pg_prepared_statements ORDER BY name")
+        return [row[0] for row in cursor.fetchall()]
+
+
+def test_statements_are_prepared_once_per_connection(database):
+    assert [row['brand'] for row in database.execute_prepared('brands')] == ['Apple', 'Xiaomi']
+    assert database.execute_prepared('quotient', (4,))[0]['quotient'] == 15
+    assert database.execute_prepared('quotient', (2,))[0]['quotient'] == 30
+
+    assert database.prepared == {'brands', 'quotient'}
+    assert server_statements(database) == ['brands', 'quotient']
+
+
+def test_a_failed_prepare_leaves_nothing_behind(database):
+    assert database.execute_prepared('brands') is not None
+
+    assert database.execute_prepared('broken') is None
+
+    assert database.prepared == {'brands'}
+    assert server_statements(database) == ['brands']
+    # The aborted transaction was rolled back, so the connection keeps working
+    assert len(database.execute_prepared('brands')) == 2
+
+
+def test_a_failed_execute_keeps_the_statement(database):
+    assert database.execute_prepared('quotient', (0,)) is None
+
+    assert 'quotient' in database.prepared
+    assert database.execute_prepared('quotient', (5,))[0]['quotient'] == 12
+
+
+def test_a_lost_connection_is_replaced_and_statements_prepared_again(database, pg_schema):
+    psycopg2 = pytest.importorskip('psycopg2')
+    database.execute_prepared('brands')
+    lost = database.connection
+    with psycopg2.connect(**pg_schema) as admin, admin.cursor() as cursor:
+        cursor.execute("SELECT pg_terminate_backend(%s)", (lost.get_backend_pid(),))
+
+    assert database.execute_prepared('brands') is None
+    assert database.connection is None and database.prepared == set()
+
+    assert len(database.execute_prepared('brands')) == 2
+    assert database.connection is not lost
+    assert server_statements(database) == ['brands']
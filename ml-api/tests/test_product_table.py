@@ -0,0 +1,80 @@
+import pytest
+
+import product_table
+from product_table import PRODUCT_FIELDS, ProductTable
+
+
+def test_rows_read_back_as_products(make_product):
+    products = [make_product(0, features=['5G', 'NFC']), make_product(1, brand='apple', price=999.0)]
+    table = ProductTable.from_products(products)
+
+    assert len(table) == 2
+    assert list(table.row(0)) == PRODUCT_FIELDS
+    for row, product in enumerate(products):
+        for field, value in product.items():
+            assert table.value(row, field) == value
+    assert table.row(1)['specifications'].startswith('apple Phone 1 with')
+
+
+def test_deleted_rows_keep_row_ids_stable(make_product):
+    table = ProductTable.from_products([make_product(number) for number in range(3)])
+    row = table.append(make_product(3, brand='google'))
+    table.delete_row(1)
+    table.delete_row(1)
+
+    assert row == 3
+    assert len(table) == 3
+    assert table.alive_rows().tolist() == [0, 2, 3]
+    assert table.row(3)['brand'] == 'google'
+    assert table.column('brand').tolist() == ['samsung', 'samsung', 'google']
+
+
+def test_update_row_encodes_new_values(make_product):
+    table = ProductTable.from_products([make_product(0)])
+    table.update_row(0, make_product(0, brand='nokia', price=150.0))
+
+    assert table.row(0)['brand'] == 'nokia'
+    assert table.row(0)['price'] == 150.0
+
+
+def test_concat_reencodes_dictionaries(make_product):
+    left = ProductTable.from_products([make_product(0, brand='samsung'), make_product(1, brand='apple')])
+    right = ProductTable.from_products([make_product(2, brand='apple'), make_product(3, brand='google')])
+    left.delete_row(0)
+
+    table = left.concat(right)
+
+    assert len(table) == 3
+    assert table.column('brand').tolist() == ['apple', 'apple', 'google']
+    assert table.column('id').tolist() == [make_product(number)['id'] for number in (1, 2, 3)]
+
+
+def test_snapshot_round_trip_keeps_missing_values(tmp_path, make_product):
+    products = [
+        make_product(0, features=['5G', 'NFC'], description=None),
+        make_product(1, brand='apple', processor=None, image_url=None),
+        make_product(2, features=[])
+    ]
+    table = ProductTable.from_products(products)
+    table.delete_row(2)
+    path = tmp_path / 'catalog.npz'
+
+    header = table.save_snapshot(path, {'catalog_version': 7})
+    loaded, loaded_header = ProductTable.load_snapshot(path)
+
+    assert loaded_header == header
+    assert loaded_header['rows'] == 2
+    for row in range(2):
+        assert loaded.row(row).to_dict() == table.row(row).to_dict()
+    assert loaded.row(0)['description'] is None
+    assert loaded.row(1)['processor'] is None
+    assert loaded.row(0)['features'] == ['5G', 'NFC']
+
+
+def test_snapshot_of_another_schema_version_is_rejected(tmp_path, make_product, monkeypatch):
+    path = tmp_path / 'catalog.npz'
+    ProductTable.from_products([make_product(0)]).save_snapshot(path)
+    monkeypatch.setattr(product_table, 'SNAPSHOT_SCHEMA_VERSION', product_table.SNAPSHOT_SCHEMA_VERSION + 1)
+
+    with pytest.raises(ValueError):
+        ProductTable.load_snapshot(path)
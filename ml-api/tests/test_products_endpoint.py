@@ -0,0 +1,38 @@
+import pytest
+
+import mobile_spec
+
+
+@pytest.fixture
+def client(matcher, monkeypatch):
+    monkeypatch.setattr(mobile_spec, 'matcher', matcher)
+    return mobile_spec.app.test_client()
+
+
+def test_without_a_limit_every_product_is_returned(client, catalog_rows):
+    body = client.get('/api/products?fields=id').get_json()
+
+    assert body['total_products'] == len(body['products']) == len(catalog_rows)
+    assert body['pagination'] == {'page': 1, 'limit': None, 'total_pages': 1}
+
+
+def test_a_limit_pages_through_the_products(client, catalog_rows):
+    pages = [client.get(f'/api/products?fields=id&limit=120&page={page}').get_json() for page in (1, 2, 3)]
+
+    assert [len(page['products']) for page in pages] == [120, 120, len(catalog_rows) - 240]
+    assert pages[0]['pagination'] == {'page': 1, 'limit': 120, 'total_pages': 3}
+    ids = [product['id'] for page in pages for product in page['products']]
+    assert sorted(ids) == sorted(catalog_rows)
+
+
+def test_brand_counts_leave_the_brand_filter_out(client, catalog_rows):
+    body = client.get('/api/products?brand=apple&q=1').get_json()
+    everything = client.get('/api/products?q=1').get_json()
+
+    assert {product['brand'] for product in body['products']} == {'apple'}
+    # Model numbers with a 1 in them, from every brand; the other brands
+    # still show how many products choosing them would list
+    assert body['facets']['brand'] == everything['facets']['brand']
+    assert len(body['facets']['brand']) == 5
+    assert body['facets']['brand']['apple'] == body['total_products']
+    assert sum(body['facets']['price_bucket'].values()) == body['total_products']
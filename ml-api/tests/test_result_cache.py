@@ -0,0 +1,45 @@
+from result_cache import ResultCache
+
+
+def test_hit_and_miss():
+    cache = ResultCache()
+    assert cache.get(1, 'query') is None
+    cache.put(1, 'query', {'results': [1, 2]})
+
+    assert cache.get(1, 'query') == {'results': [1, 2]}
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_new_catalog_version_drops_every_entry():
+    cache = ResultCache()
+    cache.put(1, 'a', 'first')
+    cache.put(1, 'b', 'second')
+
+    assert cache.get(2, 'a') is None
+    assert cache.stats()['entries'] == 0
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_entries=2)
+    cache.put(1, 'a', 'first')
+    cache.put(1, 'b', 'second')
+    cache.get(1, 'a')
+    cache.put(1, 'c', 'third')
+
+    assert cache.get(1, 'b') is None
+    assert cache.get(1, 'a') == 'first'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_byte_budget():
+    cache = ResultCache(max_bytes=100)
+    cache.put(1, 'huge', 'x' * 200)
+    cache.put(1, 'a', 'x' * 40)
+    cache.put(1, 'b', 'x' * 40)
+    cache.put(1, 'c', 'x' * 40)
+
+    assert cache.get(1, 'huge') is None
+    assert cache.get(1, 'a') is None
+    assert cache.stats()['bytes'] <= 100
@@ -0,0 +1,53 @@
+import gzip
+
+import pytest
+
+import serialization
+from serialization import json_response, negotiate_encoding
+
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    # Negotiation only checks that brotli imported
+    monkeypatch.setattr(serialization, 'brotli', object())
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip, deflate, br', 'br'),
+    ('br;q=0.5, gzip', 'gzip'),
+    ('br;q=0, gzip', 'gzip'),
+    ('BR;Q=0.8, gzip;q=0.8', 'br'),
+    ('*', 'br'),
+    ('*;q=0', None),
+    ('*;q=0, gzip', 'gzip'),
+    ('gzip;q=0, *', 'br'),
+    ('br;q=0, gzip;q=0, *', None),
+    ('identity', None),
+    ('gzip;q=abc', None),
+    ('', None),
+    (None, None),
+])
+def test_codings_are_chosen_by_weight(with_brotli, header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('br, gzip', 'gzip'),
+    ('br', None),
+    ('*', 'gzip'),
+    ('*;q=0.1, gzip;q=0', None),
+])
+def test_without_brotli_only_gzip_is_offered(monkeypatch, header, expected):
+    monkeypatch.setattr(serialization, 'brotli', None)
+
+    assert negotiate_encoding(header) == expected
+
+
+def test_refused_gzip_is_sent_uncompressed(monkeypatch):
+    monkeypatch.setattr(serialization, 'brotli', None)
+    payload = {'products': ['phone'] * 500}
+
+    assert json_response(payload, accept_encoding='gzip;q=0').headers.get('Content-Encoding') is None
+    response = json_response(payload, accept_encoding='gzip;q=0.5')
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == serialization.dumps(payload)
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+import mobile_spec
+from conftest import make_matcher
+from product_table import ProductTable
+from shard_search import ShardCoordinator, partition_snapshot
+
+NUM_SHARDS = 3
+
+
+@pytest.fixture
+def sharded(matcher, catalog_rows, tmp_path, monkeypatch):
+    """A coordinator over brand shards of the catalog, each shard scored by its own matcher"""
+    snapshot = str(tmp_path / 'catalog.npz')
+    ProductTable.from_products(matcher.build_product(row) for row in catalog_rows.values()).save_snapshot(snapshot)
+    manifest = partition_snapshot(snapshot, str(tmp_path / 'shards'), NUM_SHARDS, by='brand')
+
+    shard_matchers = []
+    for shard in range(NUM_SHARDS):
+        rows = {
+            row_id: row for row_id, row in catalog_rows.items()
+            if manifest['brands'][matcher.build_product(row)['brand']] == shard
+        }
+        shard_matchers.append(make_matcher(rows, tmp_path, monkeypatch))
+
+    def query_shard(shard, body):
+        # What a shard's /api/search returns, without the HTTP round trip
+        request = json.loads(body)
+        filters, _ = mobile_spec.parse_filters(request['filters'])
+        matches, facets = shard_matchers[shard].find_matching_phones(
+            request['specification'], request['top_k'], request['prefilter'], request['min_candidates'],
+            filters, with_facets=True
+        )
+        results = [dict(match['phone'].to_dict(), similarity_score=match['similarity_score']) for match in matches]
+        return {'results': results, 'facets': facets}
+
+    coordinator = ShardCoordinator(
+        [f"http://shard-{shard}" for shard in range(NUM_SHARDS)], manifest=manifest,
+        min_candidates=mobile_spec.SEARCH_MIN_CANDIDATES
+    )
+    coordinator.query_shard = query_shard
+    yield coordinator, manifest
+    coordinator.executor.shutdown()
+
+
+def search_both(matcher, coordinator, query, top_k=5, min_candidates=None, filters=None):
+    parsed_spec = matcher.parser.parse_specification(query)
+    unsharded = matcher.find_matching_phones(query, top_k, True, min_candidates, filters)
+    results, _, status = coordinator.search(query, parsed_spec, top_k, True, min_candidates, filters)
+    return unsharded, results, status
+
+
+def assert_same_results(unsharded, results):
+    expected = [match['similarity_score'] for match in unsharded]
+    assert [phone['similarity_score'] for phone in results] == expected
+    # Equal scores may merge in another order; ids must agree above the last score
+    cut = expected[-1] if expected else None
+    assert {phone['id'] for phone in results if phone['similarity_score'] > cut} == \
+        {match['phone']['id'] for match in unsharded if match['similarity_score'] > cut}
+
+
+def test_a_brand_with_enough_rows_is_searched_on_its_shard(matcher, sharded):
+    coordinator, manifest = sharded
+    assert manifest['brand_rows']['samsung'] >= mobile_spec.SEARCH_MIN_CANDIDATES
+
+    unsharded, results, status = search_both(matcher, coordinator, 'Samsung 8GB RAM 128GB storage')
+
+    assert status['queried'] == [manifest['brands']['samsung']]
+    assert_same_results(unsharded, results)
+
+
+@pytest.mark.parametrize('widen', ['top_k', 'min_candidates'])
+def test_a_widened_prefilter_is_scattered_to_every_shard(matcher, sharded, widen):
+    coordinator, manifest = sharded
+    # More results or candidates than the brand has rows
+    options = {widen: manifest['brand_rows']['samsung'] + 5}
+
+    unsharded, results, status = search_both(matcher, coordinator, 'Samsung 8GB RAM 128GB storage', **options)
+
+    assert status['queried'] == list(range(NUM_SHARDS))
+    assert_same_results(unsharded, results)
+    if widen == 'top_k':
+        # The unsharded pre-filter fell back to the whole catalog, so other brands fill the list
+        assert {phone['brand'] for phone in results} != {'samsung'}
+
+
+def test_explicit_filters_are_scattered_to_every_shard(matcher, sharded):
+    coordinator, _ = sharded
+    filters = {'brand': ['apple', 'nokia']}
+
+    unsharded, results, status = search_both(matcher, coordinator, 'Samsung 8GB RAM 128GB storage', filters=filters)
+
+    assert status['queried'] == list(range(NUM_SHARDS))
+    assert {phone['brand'] for phone in results} <= {'apple', 'nokia'}
+    assert_same_results(unsharded, results)
+
+
+def test_manifests_without_brand_sizes_scatter(matcher, sharded):
+    coordinator, manifest = sharded
+    del manifest['brand_rows']
+
+    assert coordinator.route({'brand': 'samsung'}, prefilter=True) == list(range(NUM_SHARDS))
@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import CoalescingTimeout, SingleFlight
+
+
+def start_call(flight, key, function, outcomes):
+    """Run a call in a thread, appending its result or error to outcomes"""
+    def call():
+        try:
+            outcomes.append(flight.do(key, function))
+        except Exception as e:
+            outcomes.append(e)
+    thread = threading.Thread(target=call)
+    thread.start()
+    return thread
+
+
+def wait_for_waiters(flight, count):
+    while flight.stats()['coalesced'] < count:
+        time.sleep(0.001)
+
+
+def test_concurrent_identical_calls_run_once():
+    flight = SingleFlight('search')
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def search():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return ['result']
+
+    outcomes = []
+    threads = [start_call(flight, 'query', search, outcomes)]
+    started.wait(5)
+    threads += [start_call(flight, 'query', search, outcomes) for _ in range(3)]
+    wait_for_waiters(flight, 3)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert outcomes == [['result']] * 4
+    assert flight.stats()['executed'] == 1
+    assert flight.stats()['max_waiters'] == 3
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_waiters_share_the_error():
+    flight = SingleFlight('search')
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError('database down')
+
+    outcomes = []
+    threads = [start_call(flight, 'query', failing, outcomes)]
+    started.wait(5)
+    threads.append(start_call(flight, 'query', failing, outcomes))
+    wait_for_waiters(flight, 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert [str(e) for e in outcomes] == ['database down'] * 2
+    assert flight.stats()['errors'] == 1
+
+
+def test_waiter_gives_up_after_the_timeout():
+    flight = SingleFlight('search', timeout=0.05)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 'late'
+
+    outcomes = []
+    leader = start_call(flight, 'query', slow, outcomes)
+    started.wait(5)
+    with pytest.raises(CoalescingTimeout):
+        flight.do('query', slow)
+    release.set()
+    leader.join(5)
+
+    assert outcomes == ['late']
+    assert flight.stats()['timeouts'] == 1
+
+
+def test_later_calls_run_again():
+    flight = SingleFlight('search')
+
+    assert flight.do('query', lambda: 1) == 1
+    assert flight.do('query', lambda: 2) == 2
+    assert flight.stats()['executed'] == 2
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import SGDRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from streaming_training import StandardizedTargetRegressor, StreamingRegressionMetrics, chunk_bounds, holdout_mask
+
+
+def test_chunks_cover_every_row_once_and_mix_real_with_synthetic():
+    bounds = chunk_bounds(real_count=103, total_count=1000, chunk_size=256)
+
+    assert len(bounds) == 4
+    assert [start for start, _, _, _ in bounds[1:]] == [end for _, end, _, _ in bounds[:-1]]
+    assert [start for _, _, start, _ in bounds[1:]] == [end for _, _, _, end in bounds[:-1]]
+    assert (bounds[0][0], bounds[-1][1]) == (0, 103)
+    assert (bounds[0][2], bounds[-1][3]) == (0, 897)
+    assert all(real_end > real_start for real_start, real_end, _, _ in bounds)
+
+
+def test_a_small_catalog_is_one_chunk():
+    assert chunk_bounds(real_count=5, total_count=8, chunk_size=256) == [(0, 5, 0, 3)]
+
+
+def test_holdout_rows_are_the_same_on_every_pass():
+    first = holdout_mask(2000, 0.2, seed=42, chunk=3)
+
+    assert np.array_equal(first, holdout_mask(2000, 0.2, seed=42, chunk=3))
+    assert not np.array_equal(first, holdout_mask(2000, 0.2, seed=42, chunk=4))
+    assert first.mean() == pytest.approx(0.2, abs=0.03)
+
+
+def test_standardized_target_predicts_in_price_units():
+    rng = np.random.RandomState(0)
+    X = rng.normal(size=(500, 3))
+    y = 800 + X @ np.array([150.0, -60.0, 30.0])
+    model = StandardizedTargetRegressor(SGDRegressor(random_state=0), y.mean(), y.std())
+
+    for _ in range(20):
+        model.partial_fit(X, y)
+
+    assert np.abs(model.regressor.predict(X)).max() < 5
+    assert np.abs(model.predict(X) - y).mean() < 10
+
+
+def test_a_constant_target_is_not_divided_by_zero():
+    model = StandardizedTargetRegressor(SGDRegressor(), 500.0, 0.0)
+
+    assert model.std == 1.0
+
+
+def test_chunked_metrics_match_the_whole_test_set():
+    rng = np.random.RandomState(1)
+    y_true = rng.uniform(100, 1500, size=1000)
+    y_pred = y_true + rng.normal(scale=80, size=1000)
+    metrics = StreamingRegressionMetrics()
+
+    for chunk in np.array_split(np.arange(1000), [10, 11, 400, 400, 730]):
+        metrics.update(y_true[chunk], y_pred[chunk])
+
+    assert metrics.result() == pytest.approx({
+        'test_r2': r2_score(y_true, y_pred),
+        'test_mae': mean_absolute_error(y_true, y_pred),
+        'test_rmse': np.sqrt(mean_squared_error(y_true, y_pred)),
+        'test_mape': np.mean(np.abs((y_true - y_pred) / y_true)) * 100
+    })
+
+
+def test_metrics_without_rows():
+    metrics = StreamingRegressionMetrics()
+    assert metrics.result() is None
+
+    metrics.update(np.array([300.0, 300.0]), np.array([280.0, 320.0]))
+
+    # Every held-out price the same: no variance to explain
+    assert metrics.result()['test_r2'] == 0.0
+    assert metrics.result()['test_mae'] == 20.0
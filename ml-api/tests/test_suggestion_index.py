@@ -0,0 +1,44 @@
+from search_index import SuggestionIndex
+
+ENTRIES = [
+    ('Galaxy S24 Ultra', 'model', 9.0, {'brand': 'samsung'}),
+    ('Galaxy S23', 'model', 7.0, {'brand': 'samsung'}),
+    ('Samsung', 'brand', 8.0, {}),
+    ('Pixel 8 Pro', 'model', 6.0, {'brand': 'google'}),
+    ('Snapdragon 8 Gen 2', 'processor', 5.0, {})
+]
+
+
+def texts(suggestions):
+    return [suggestion['text'] for suggestion in suggestions]
+
+
+def test_prefix_matches_rank_by_score():
+    index = SuggestionIndex(ENTRIES)
+
+    assert texts(index.suggest('gal')) == ['Galaxy S24 Ultra', 'Galaxy S23']
+    assert texts(index.suggest('s', limit=3)) == ['Galaxy S24 Ultra', 'Samsung', 'Galaxy S23']
+
+
+def test_word_suffixes_are_indexed():
+    index = SuggestionIndex(ENTRIES)
+
+    assert texts(index.suggest('s24')) == ['Galaxy S24 Ultra']
+    assert texts(index.suggest('8 pro')) == ['Pixel 8 Pro']
+
+
+def test_precomputed_and_scanned_prefixes_agree():
+    precomputed = SuggestionIndex(ENTRIES)
+    scanned = SuggestionIndex(ENTRIES, precomputed_prefix_length=0)
+
+    for prefix in ['g', 'ga', 'gal', 's', 'sn', 'p', '8']:
+        assert precomputed.suggest(prefix, 3) == scanned.suggest(prefix, 3)
+
+
+def test_suggestions_carry_type_and_extra_fields():
+    index = SuggestionIndex(ENTRIES)
+
+    assert index.suggest('pixel') == [{'brand': 'google', 'text': 'Pixel 8 Pro', 'type': 'model', 'score': 6.0}]
+    assert index.suggest('  ') == []
+    assert index.suggest('nokia') == []
+    assert len(index) == len(ENTRIES)
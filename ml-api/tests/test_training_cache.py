@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+
+import mobile_spec
+from product_table import ProductTable
+
+
+def catalog(matcher, rows):
+    return ProductTable.from_products(matcher.build_product(row) for row in rows)
+
+
+def test_key_covers_the_catalog_but_not_its_order(matcher, catalog_rows, monkeypatch):
+    rows = list(catalog_rows.values())
+    key = matcher.training_cache_key(catalog(matcher, rows))
+
+    assert matcher.training_cache_key(catalog(matcher, rows[::-1])) == key
+    changed = [dict(rows[0], ram='16GB')] + rows[1:]
+    assert matcher.training_cache_key(catalog(matcher, changed)) != key
+    monkeypatch.setattr(mobile_spec, 'FEATURE_CODE_VERSION', 'next')
+    assert matcher.training_cache_key(catalog(matcher, rows)) != key
+
+
+def test_a_hit_returns_the_matrix_and_encoders_of_the_miss(matcher, catalog_rows):
+    products = catalog(matcher, catalog_rows.values())
+
+    built = matcher.prepare_training_data(products)
+    cached = matcher.prepare_training_data(products)
+
+    assert (built['cache_hit'], cached['cache_hit']) == (False, True)
+    assert cached['cache_key'] == built['cache_key']
+    for name in ['X', 'y', 'row_ids', 'train_rows', 'test_rows']:
+        np.testing.assert_array_equal(cached[name], built[name])
+    assert list(cached['encoders']['brand'].classes_) == list(built['encoders']['brand'].classes_)
+    assert cached['brand_popularity'] == built['brand_popularity']
+    # Preparing data never touches the encoders being served
+    assert matcher.encoders == {}
+
+
+def test_an_unreadable_entry_is_rebuilt(matcher, catalog_rows):
+    products = catalog(matcher, catalog_rows.values())
+    key = matcher.prepare_training_data(products)['cache_key']
+    os.remove(os.path.join(mobile_spec.TRAINING_CACHE_DIR, key, 'X.npy'))
+
+    assert not matcher.prepare_training_data(products)['cache_hit']
+    assert matcher.prepare_training_data(products)['cache_hit']
+
+
+def test_eviction_keeps_the_most_recently_used_entries(matcher):
+    for age, name in enumerate(['newest', 'middle', 'oldest']):
+        path = os.path.join(mobile_spec.TRAINING_CACHE_DIR, name)
+        os.makedirs(path)
+        os.utime(path, (1000 - age, 1000 - age))
+    os.makedirs(os.path.join(mobile_spec.TRAINING_CACHE_DIR, 'writing.tmp'))
+
+    matcher.evict_training_cache(keep=2)
+
+    assert sorted(os.listdir(mobile_spec.TRAINING_CACHE_DIR)) == ['middle', 'newest', 'writing.tmp']
@@ -0,0 +1,37 @@
+def open_run(matcher):
+    return getattr(matcher.telemetry.runs, 'current', None)
+
+
+def test_a_full_run_without_products_is_closed_as_failed(matcher):
+    assert not matcher.train_multiple_models(base_products=[])
+
+    assert open_run(matcher) is None
+    assert matcher.model_info['last_failed_run']['mode'] == 'full'
+    assert 'telemetry' not in matcher.model_info
+
+
+def test_a_streaming_run_with_too_few_rows_records_where_it_stopped(matcher, catalog_rows):
+    assert not matcher.train_streaming(target_count=500, chunk_size=100)
+
+    assert open_run(matcher) is None
+    failed = matcher.model_info['last_failed_run']
+    assert failed['mode'] == 'streaming'
+    assert list(failed['by_stage']) == ['preprocess_features', 'stream:statistics']
+
+
+def test_a_raising_stage_still_closes_the_run(matcher, monkeypatch):
+    def broken(*args, **kwargs):
+        raise ValueError('feature matrix')
+    monkeypatch.setattr(matcher, 'prepare_training_data', broken)
+
+    assert not matcher.train_multiple_models()
+
+    assert open_run(matcher) is None
+    assert matcher.model_info['last_failed_run']['mode'] == 'full'
+
+
+def test_an_up_to_date_incremental_run_is_not_a_failure(trained_matcher):
+    assert trained_matcher.train_incremental()
+
+    assert open_run(trained_matcher) is None
+    assert 'last_failed_run' not in trained_matcher.model_info
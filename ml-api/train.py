@@ -0,0 +1,69 @@
+"""Offline trainer publishing versioned model bundles for the serving processes.
+
+Runs on a dedicated box so training never competes with live traffic:
+
+    python train.py --bundle-dir /shared/models
+    python train.py --bundle-dir /shared/models --snapshot data/catalog_snapshot.npz --search --jobs 32
+    python train.py --bundle-dir /shared/models --streaming --samples 50000000 --chunk-size 100000
+
+Serving processes started with MODEL_BUNDLE_DIR=/shared/models load the newest
+bundle at startup and switch to each one published later without a restart.
+"""
+import argparse
+import logging
+import os
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the ml-api models and publish a model bundle')
+    parser.add_argument('--bundle-dir', default=os.getenv('MODEL_BUNDLE_DIR'), help='Shared bundle directory')
+    parser.add_argument('--snapshot', help='Train from a catalog snapshot instead of the database')
+    parser.add_argument('--search', action='store_true', help='Run the hyperparameter search')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='Parallel jobs for the search')
+    parser.add_argument('--streaming', action='store_true', help='Train out of core with incremental models')
+    parser.add_argument('--samples', type=int, help='Rows in a streaming run, real plus synthetic')
+    parser.add_argument('--chunk-size', type=int, help='Rows held in memory at once in a streaming run')
+    parser.add_argument('--epochs', type=int, help='Passes over the stream in a streaming run')
+    args = parser.parse_args()
+
+    if not args.bundle_dir:
+        parser.error('--bundle-dir or MODEL_BUNDLE_DIR is required')
+    if args.search and args.streaming:
+        parser.error('--search only applies to full training runs')
+
+    # Settings are read when mobile_spec is imported, so they go in first; the
+    # trainer never follows the bundle directory itself
+    os.environ['SEARCH_N_JOBS'] = str(args.jobs)
+    for name, value in [('STREAM_TRAINING_SAMPLES', args.samples), ('STREAM_TRAINING_CHUNK_SIZE', args.chunk_size),
+                        ('STREAM_TRAINING_EPOCHS', args.epochs)]:
+        if value is not None:
+            os.environ[name] = str(value)
+    os.environ.pop('MODEL_BUNDLE_DIR', None)
+
+    import mobile_spec
+    from product_table import ProductTable
+
+    logger = logging.getLogger('train')
+    matcher = mobile_spec.matcher
+
+    base_products = None
+    if args.snapshot:
+        base_products, header = ProductTable.load_snapshot(args.snapshot)
+        logger.info(f"Training from snapshot {args.snapshot} exported at {header.get('exported_at')}")
+
+    if args.streaming:
+        trained = matcher.train_streaming(base_products=base_products)
+    else:
+        trained = matcher.train_multiple_models(search=args.search, base_products=base_products)
+    if not trained:
+        logger.error("Training failed, no bundle published")
+        return 1
+
+    version = matcher.publish_bundle(args.bundle_dir)
+    print(version)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from memory_profile import rss_peak_mb
+
+
+class TrainingTelemetry:
+    """Always-on wall clock and CPU time of each stage of a training run"""
+
+    def __init__(self):
+        self.runs = threading.local()  # the run open on each thread
+
+    def begin_run(self, mode):
+        self.runs.current = {
+            'mode': mode,
+            'started': time.perf_counter(),
+            'cpu_started': time.process_time(),
+            'stages': []
+        }
+
+    @contextmanager
+    def stage(self, name, model=None):
+        """Time the enclosed block; yields the record so callers can attach details"""
+        run = getattr(self.runs, 'current', None)
+        if run is None:
+            # Outside a training run, e.g. a catalog reload fetching products
+            yield {}
+            return
+
+        record = {'stage': name, 'model': model}
+        start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record.update({
+                'offset_seconds': round(start - run['started'], 4),
+                'seconds': round(time.perf_counter() - start, 4),
+                # Process-wide, so it includes worker threads of n_jobs models
+                'cpu_seconds': round(time.process_time() - cpu_start, 4),
+                'rss_peak_mb': rss_peak_mb()
+            })
+            run['stages'].append(record)
+
+    def end_run(self):
+        """Close the run of this thread and summarize it; None when no run is open"""
+        run = getattr(self.runs, 'current', None)
+        if run is None:
+            return None
+        self.runs.current = None
+
+        by_stage, by_model = {}, {}
+        for record in run['stages']:
+            by_stage[record['stage']] = round(by_stage.get(record['stage'], 0.0) + record['seconds'], 4)
+            if record['model']:
+                by_model[record['model']] = round(by_model.get(record['model'], 0.0) + record['seconds'], 4)
+
+        return {
+            'mode': run['mode'],
+            'finished_at': datetime.now().isoformat(),
+            'total_seconds': round(time.perf_counter() - run['started'], 4),
+            'cpu_seconds': round(time.process_time() - run['cpu_started'], 4),
+            'rss_peak_mb': rss_peak_mb(),
+            'by_stage': by_stage,
+            'by_model': by_model,
+            'stages': run['stages']
+        }
+
+
+def history_entry(summary):
+    """The totals of a run kept for comparing later runs against"""
+    return {name: summary[name] for name in ('mode', 'finished_at', 'total_seconds', 'cpu_seconds', 'by_stage', 'by_model')}
+
+
+def compare_runs(current, previous):
+    """Per-stage seconds of two runs and how much slower (positive) or faster the current one is"""
+    if not current or not previous:
+        return None
+
+    def changes(now, before):
+        return {
+            name: {
+                'seconds': now.get(name),
+                'previous_seconds': before.get(name),
+                'change_seconds': round(now[name] - before[name], 4) if name in now and name in before else None
+            }
+            for name in sorted(set(now) | set(before))
+        }
+
+    return {
+        'previous_finished_at': previous['finished_at'],
+        'previous_mode': previous['mode'],
+        'total_change_seconds': round(current['total_seconds'] - previous['total_seconds'], 4),
+        'by_stage': changes(current['by_stage'], previous['by_stage']),
+        'by_model': changes(current['by_model'], previous['by_model'])
+    }
+
+
+def compare_latest(history):
+    """Compare the newest run with the previous run of the same mode"""
+    if not history:
+        return None
+    latest = history[-1]
+    previous = next((run for run in reversed(history[:-1]) if run['mode'] == latest['mode']), None)
+    return compare_runs(latest, previous)
@@ -0,0 +1,84 @@
+-- Product change notifications for the ML API catalog
+-- Lets the ML API apply admin edits row by row instead of reloading the whole catalog
+
+-- Every product write records the id of its transaction. The delta query
+-- asks for changes from transactions at or after the oldest one still running
+-- at the previous delta, so a long transaction committing late is still seen,
+-- which an updated_at watermark cannot guarantee
+ALTER TABLE products ADD COLUMN IF NOT EXISTS change_txid BIGINT;
+
+-- Deleted products are recorded so the delta query can see removals
+CREATE TABLE IF NOT EXISTS product_deletions (
+    product_id UUID PRIMARY KEY,
+    deleted_at TIMESTAMP WITH TIME ZONE DEFAULT clock_timestamp(),
+    change_txid BIGINT NOT NULL DEFAULT txid_current()
+);
+
+CREATE INDEX IF NOT EXISTS idx_products_change_txid ON products(change_txid);
+CREATE INDEX IF NOT EXISTS idx_product_deletions_change_txid ON product_deletions(change_txid);
+
+CREATE OR REPLACE FUNCTION stamp_product_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.change_txid = txid_current();
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+-- Notify listeners on the product_changes channel with the affected product id
+CREATE OR REPLACE FUNCTION notify_product_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed_id UUID;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed_id = OLD.id;
+        INSERT INTO product_deletions (product_id, deleted_at, change_txid)
+        VALUES (OLD.id, clock_timestamp(), txid_current())
+        ON CONFLICT (product_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at, change_txid = EXCLUDED.change_txid;
+    ELSE
+        changed_id = NEW.id;
+        DELETE FROM product_deletions WHERE product_id = NEW.id;
+    END IF;
+
+    PERFORM pg_notify('product_changes', json_build_object(
+        'table', TG_TABLE_NAME,
+        'op', TG_OP,
+        'product_id', changed_id
+    )::text);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Spec and feature edits touch the parent product, which in turn fires the
+-- products notification and stamps its change_txid for the delta query
+CREATE OR REPLACE FUNCTION touch_parent_product()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        UPDATE products SET updated_at = clock_timestamp() WHERE id = OLD.product_id;
+    ELSE
+        UPDATE products SET updated_at = clock_timestamp() WHERE id = NEW.product_id;
+        IF TG_OP = 'UPDATE' AND OLD.product_id IS DISTINCT FROM NEW.product_id THEN
+            UPDATE products SET updated_at = clock_timestamp() WHERE id = OLD.product_id;
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS stamp_products_change ON products;
+CREATE TRIGGER stamp_products_change BEFORE INSERT OR UPDATE ON products
+    FOR EACH ROW EXECUTE FUNCTION stamp_product_change();
+
+DROP TRIGGER IF EXISTS notify_products_change ON products;
+CREATE TRIGGER notify_products_change AFTER INSERT OR UPDATE OR DELETE ON products
+    FOR EACH ROW EXECUTE FUNCTION notify_product_change();
+
+DROP TRIGGER IF EXISTS touch_product_specs_change ON product_specs;
+CREATE TRIGGER touch_product_specs_change AFTER INSERT OR UPDATE OR DELETE ON product_specs
+    FOR EACH ROW EXECUTE FUNCTION touch_parent_product();
+
+DROP TRIGGER IF EXISTS touch_product_features_change ON product_features;
+CREATE TRIGGER touch_product_features_change AFTER INSERT OR UPDATE OR DELETE ON product_features
+    FOR EACH ROW EXECUTE FUNCTION touch_parent_product();
@@ -0,0 +1,26 @@
+-- Near-duplicate product clusters found by the ML API dedupe job (ml-api/dedupe.py)
+-- Each run replaces the pending clusters; reviewed clusters are kept for history
+
+CREATE TABLE IF NOT EXISTS duplicate_clusters (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    run_id UUID NOT NULL,
+    brand VARCHAR(100) NOT NULL,
+    canonical_product_id UUID REFERENCES products(id) ON DELETE CASCADE,
+    size INTEGER NOT NULL,
+    min_similarity REAL,
+    max_similarity REAL,
+    status VARCHAR(20) DEFAULT 'pending' CHECK (status IN ('pending', 'confirmed', 'rejected')),
+    reviewed_by UUID REFERENCES users(id) ON DELETE SET NULL,
+    reviewed_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS duplicate_cluster_members (
+    cluster_id UUID REFERENCES duplicate_clusters(id) ON DELETE CASCADE,
+    product_id UUID REFERENCES products(id) ON DELETE CASCADE,
+    similarity REAL,  -- best similarity to another member
+    PRIMARY KEY (cluster_id, product_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_duplicate_clusters_status ON duplicate_clusters(status, max_similarity DESC);
+CREATE INDEX IF NOT EXISTS idx_duplicate_cluster_members_product_id ON duplicate_cluster_members(product_id);